@@ -0,0 +1,126 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+"""Measure how many devices a MetricCollector can poll and archive.
+
+Runs the 10 s ticks of a MetricCollector against in-process fake devices:
+every tick, each device's MetricStream polls the 10 new samples of each
+metric with one ``get_values_as_table`` call, and the result is appended
+to a MetricArchive, with a thread pool like MetricCollector. The ticks
+follow each other at once on a simulated clock, so the load per tick does
+not depend on how long the previous one took. Poll and append are timed
+one after the other over all devices; together they must stay below the
+10 s interval. The fake devices answer in the same process, and the CPU
+time they take is reported and left out of the poll time: a real device
+does that work on its own CPU. Ticks cross minute boundaries, so the
+1 min rollups are written as well.
+
+The first ticks read the whole stream window and create the files (a
+one-off cost at the first start) and are left out of the figures.
+
+Usage:
+    python benchmarks/bench_archive.py [devices] [metrics] [measured ticks]
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import jsonrpcdevice
+from jsonrpcdevice_fake import FakeDevice
+
+WARMUP = 3
+WINDOW = 30
+INTERVAL = 10
+
+
+class TimedFake(FakeDevice):
+    """
+    Fake device with every slot filled, whatever the local time, that adds
+    the CPU time of its answers to :attr:`busy`. The tables are built once
+    for all devices.
+    """
+
+    answers = {}
+    busy = 0.0
+    lock = threading.Lock()
+
+    def handle(self, method, path, headers, chunks, failure=None):
+        start = time.thread_time()
+        try:
+            return super().handle(method, path, headers, chunks, failure)
+        finally:
+            with self.lock:
+                TimedFake.busy += time.thread_time() - start
+
+    def _get_values_as_table(self, sid, params):
+        key = (params["from"], params["to"], tuple(params["metrics"]))
+        answer = self.answers.get(key)
+        if answer is None:
+            answer = {"result": {metric: [{"ts": ts, "val": float((ts * (i + 1)) % 1000)}
+                                          for ts in range(params["from"], params["to"] + 1)]
+                                 for i, metric in enumerate(params["metrics"])}}
+            self.answers.clear()
+            self.answers[key] = answer
+        return answer
+
+
+def run(names, metric_names, ticks):
+    directory = tempfile.mkdtemp(prefix="bench_archive_")
+    archive = jsonrpcdevice.MetricArchive(directory)
+    streams = {}
+    for name in names:
+        fake = TimedFake()
+        fake.metrics = metric_names
+        dev = jsonrpcdevice.AdstecJSONRPCDevice(name, "admin", "admin", transport=fake)
+        streams[name] = jsonrpcdevice.MetricStream(dev, metric_names, window=WINDOW)
+    clock = int(time.time()) // 60 * 60
+    timings = []
+    try:
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            for tick in range(ticks):
+                now = clock + tick * INTERVAL
+                TimedFake.busy = 0.0
+                begin = time.perf_counter()
+                polled = dict(zip(names, executor.map(lambda name: streams[name].poll(now), names)))
+                middle = time.perf_counter()
+                written = sum(executor.map(
+                    lambda name: archive.append(name, polled[name]), names))
+                end = time.perf_counter()
+                poll = middle - begin - TimedFake.busy
+                timings.append((poll, end - middle, TimedFake.busy))
+                print(f"  tick {tick}: {written} samples, poll {poll:.2f} s "
+                      f"(+ {TimedFake.busy:.2f} s fake devices), append {end - middle:.2f} s",
+                      flush=True)
+        size = sum(os.path.getsize(os.path.join(root, f))
+                   for root, _, files in os.walk(directory) for f in files)
+    finally:
+        shutil.rmtree(directory)
+    steady = timings[WARMUP:] or timings
+    poll, append, fake = (sum(t[i] for t in steady) / len(steady) for i in range(3))
+    worst = max(t[0] + t[1] for t in steady)
+    return poll, append, fake, worst, size
+
+
+def main():
+    devices = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    metrics = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    ticks = WARMUP + (int(sys.argv[3]) if len(sys.argv) > 3 else 12)
+    names = [f"10.{d // 250}.{d % 250}.1" for d in range(devices)]
+    metric_names = [f"ETH{m // 4}.{('rx', 'tx')[m % 2]}_{('bytes', 'packets')[m // 2 % 2]}"
+                    for m in range(metrics)]
+    poll, append, fake, worst, size = run(names, metric_names, ticks)
+    print(f"devices x metrics: {devices} x {metrics}, poll interval {INTERVAL} s")
+    print(f"mean tick time:    {poll + append:.2f} s (poll {poll:.2f} s, append {append:.2f} s, "
+          f"max {worst:.2f} s)")
+    print(f"fake devices:      {fake:.2f} s per tick, not included")
+    print(f"throughput:        {devices * metrics * INTERVAL / (poll + append):,.0f} samples/s")
+    print(f"disk used:         {size / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+"""Compare replacing a large packet filter with applying only its changes.
+
+The mock device holds a packet filter of N rules in ``serv_Protocols``;
+the desired filter differs in three rules (one changed, one removed, one
+added). "replace" flushes the table and inserts every rule with one
+``import_config`` call, like examples/packet_filter_import.py; "apply"
+uses ``config_apply``, which reads the table with ``export_pages`` and
+sends only the three changed rows.
+
+Usage:
+    python benchmarks/bench_config_apply.py [rules]
+"""
+
+import sys
+import os
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import jsonrpcdevice
+from mockserver import MockDevice
+
+TABLE = "serv_Protocols"
+
+
+def make_rules(columns, count):
+    rules = []
+    for i in range(count):
+        row = {column: "" for column in columns}
+        row.update({"id": str(1000 + i), "service_id": "1000", "protocol": "TCP",
+                    "action_id": "2", "log_active": "0", "alarm_active": "0",
+                    "description": f"rule{i}", "position": str(i + 1),
+                    "src_ip_add": "*", "des_ip_add": "*", "des_port": str(1024 + i),
+                    "audit_active": "0"})
+        rules.append(row)
+    return rules
+
+
+def run(mock, columns, current, desired, replace):
+    mock.tables[TABLE] = [dict(r) for r in current]
+    dev = jsonrpcdevice.AdstecJSONRPCDevice(mock.target, "admin", "admin")
+    dev.get_sid()
+    mock.calls.clear()
+    mock.device.received = 0
+    start = time.perf_counter()
+    if replace:
+        dev.call("config", "import_config", jsondata={
+            "tableflush": [{"tablename": TABLE}],
+            "tableinsert": [{"tablename": TABLE, "data": desired}]})
+        operations = 1 + len(desired)
+    else:
+        operations = dev.config_apply({"tables": {TABLE: desired}}).operations
+    elapsed = time.perf_counter() - start
+    dev.close()
+    return elapsed, operations, sum(mock.calls.values()), mock.received
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    schema = jsonrpcdevice.SchemaRegistry().get("IRF3821")
+    columns = schema.columns(TABLE)
+    current = make_rules(columns, count)
+    desired = [dict(r) for r in current]
+    desired[10]["des_port"] = "8080"
+    del desired[20]
+    desired.append(dict(make_rules(columns, count + 1)[-1]))
+
+    with MockDevice("IRF3821") as mock:
+        # time the client, not the validation in the mock
+        mock.device.validator = None
+        print(f"{count} rules, 3 differ")
+        print(f"{'mode':<8s} {'ms':>8s} {'operations':>11s} {'RPCs':>5s} {'sent KB':>8s}")
+        for name, replace in (("replace", True), ("apply", False)):
+            elapsed, operations, calls, sent = run(mock, columns, current, desired, replace)
+            print(f"{name:<8s} {elapsed * 1000:8.1f} {operations:11d} {calls:5d} {sent / 1024:8.1f}")
+            rows = sorted(mock.tables[TABLE], key=lambda r: int(r["id"]))
+            if rows != sorted(desired, key=lambda r: int(r["id"])):
+                print(f"  {name}: device table does not match the desired rules")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+"""Compare RPC throughput with and without connection reuse.
+
+"per-request" sends every call through the module-level ``requests.post``
+(new TCP connection and TLS handshake per RPC, as the client did before it
+owned a connection pool); "pooled" uses ``AdstecJSONRPCDevice.call``.
+
+Usage:
+    python benchmarks/bench_connection_pool.py [calls]
+"""
+
+import sys
+import os
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import requests
+import jsonrpcdevice
+from mockserver import MockDevice
+
+
+def per_request(dev, calls):
+    url = f"https://{dev.target}/rpc"
+    for _ in range(calls):
+        payload = {"id": "req-1", "jsonrpc": "2.0", "method": "call",
+                   "params": [dev.sid, "status", "get",
+                              {"function": "boot_finished", "parameters": ["", ""]}]}
+        response = requests.post(url, json=payload, timeout=dev.timeout, verify=False)
+        response.raise_for_status()
+        response.json()
+
+
+def pooled(dev, calls):
+    for _ in range(calls):
+        dev.status("boot_finished")
+
+
+def measure(func, dev, calls):
+    start = time.perf_counter()
+    func(dev, calls)
+    return calls / (time.perf_counter() - start)
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    with MockDevice() as mock:
+        with jsonrpcdevice.AdstecJSONRPCDevice(mock.target, "admin", "admin") as dev:
+            dev.get_sid()
+            before = measure(per_request, dev, calls)
+            after = measure(pooled, dev, calls)
+    print(f"{'mode':<12s} {'RPC/s':>10s}")
+    print(f"{'per-request':<12s} {before:10.1f}")
+    print(f"{'pooled':<12s} {after:10.1f}")
+    print(f"speedup: {after / before:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
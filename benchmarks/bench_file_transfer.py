@@ -0,0 +1,73 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+"""Compare memory and throughput of the file upload paths.
+
+"file-naive" reads the whole file, Base64-encodes it and sends it with
+``dev.call("file", "write", ...)``; "file_write" streams the Base64 request
+with ``dev.file_write``; "upload_file" streams multipart/form-data to
+upload.php.  Each mode runs in its own process against a mock device in a
+further process, so the peak RSS shown belongs to the client alone.
+
+Usage:
+    python benchmarks/bench_file_transfer.py [size_mb]
+"""
+
+import sys
+import os
+import base64
+import resource
+import subprocess
+import tempfile
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import jsonrpcdevice
+from mockserver import MockDeviceProcess
+
+MODES = ("file-naive", "file_write", "upload_file")
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+def run(mode, filename):
+    with MockDeviceProcess() as mock:
+        dev = jsonrpcdevice.AdstecJSONRPCDevice(mock.target, "admin", "admin")
+        dev.get_sid()
+        baseline = peak_rss_mb()
+        start = time.perf_counter()
+        if mode == "file-naive":
+            with open(filename, "rb") as f:
+                data = base64.b64encode(f.read()).decode()
+            dev.call("file", "write", path="/tmp/upsettigs", data=data)
+            del data
+        elif mode == "file_write":
+            dev.file_write("/tmp/upsettigs", filename)
+        else:
+            dev.upload_file("settings", filename)
+        elapsed = time.perf_counter() - start
+    size_mb = os.path.getsize(filename) / 1048576
+    print(f"{mode:<12s} {peak_rss_mb() - baseline:10.1f} {size_mb / elapsed:9.1f}")
+
+
+def main():
+    if len(sys.argv) > 2:
+        run(sys.argv[1], sys.argv[2])
+        return
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "settings.cf2")
+        with open(filename, "wb") as f:
+            for _ in range(size_mb):
+                f.write(os.urandom(1048576))
+        print(f"transfer of {size_mb} MB")
+        print(f"{'mode':<12s} {'growth MB':>10s} {'MB/s':>9s}")
+        for mode in MODES:
+            subprocess.run([sys.executable, __file__, mode, filename], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+"""Compare how quickly the phases of a reboot are noticed.
+
+Every mock device stays up for a random moment, goes down for a random
+time, comes back and reports ``boot_finished`` "no" for a while before
+"yes". "sleep-poll" is the loop
+``wait_for_reboot`` used before: an HTTPS GET of ``/`` every 3 s and a new
+device object per ``boot_finished`` check one second apart, one thread per
+device. "waiter-1s" is ``RebootWaiter`` with the schedule it had first,
+backing off to one probe a second while a device is up; "waiter" is
+``RebootWaiter.wait_all`` as it is. The lag of a phase is the time from the
+device going down, accepting connections again or reporting
+"boot_finished = yes" until the caller noticed.
+
+Usage:
+    python benchmarks/bench_reboot_wait.py [devices]
+"""
+
+import sys
+import os
+import heapq
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import jsonrpcdevice
+from mockserver import MockDevice
+
+UP, DOWN, BOOTING = (0.2, 3.0), (4.0, 8.0), 1.0
+PHASES = ("offline", "online", "booted")
+
+
+def reboot(mock, events, rng):
+    time.sleep(rng.uniform(*UP))
+    mock.stop()
+    events[mock.target, "offline"] = time.monotonic()
+    time.sleep(rng.uniform(*DOWN))
+    mock.status["boot_finished"] = "no"
+    mock.start()
+    events[mock.target, "online"] = time.monotonic()
+    time.sleep(BOOTING)
+    mock.status["boot_finished"] = "yes"
+    events[mock.target, "booted"] = time.monotonic()
+
+
+def sleep_poll(dev, seen):
+    previous = None
+    while True:
+        online, _ = jsonrpcdevice.check_host(dev.target)
+        if previous and not online:
+            seen[dev.target, "offline"] = time.monotonic()
+        if previous is not None and online and not previous:
+            seen[dev.target, "online"] = time.monotonic()
+            while True:
+                fresh = jsonrpcdevice.AdstecJSONRPCDevice(dev.target, "admin", "admin", timeout=5)
+                try:
+                    if fresh.status("boot_finished") == "yes":
+                        seen[dev.target, "booted"] = time.monotonic()
+                        return fresh
+                except Exception:
+                    pass
+                time.sleep(1)
+        previous = online
+        time.sleep(3)
+
+
+class CappedWaiter(jsonrpcdevice.RebootWaiter):
+    """
+    The first schedule of :class:`RebootWaiter`: the pause grows while
+    nothing changes, to one second at most while the device is up.
+    """
+
+    def _schedule(self, state, heap, grow=None):
+        delay = 0.0
+        if grow is not None:
+            limit = self.max_interval if state.phase == "down" else min(self.max_interval, 1.0)
+            state.interval = min(state.interval * 1.5, limit) if grow else self.min_interval
+            delay = state.interval
+        heapq.heappush(heap, (time.monotonic() + delay, state.index))
+
+
+def run(mocks, wait):
+    events = {}
+    rng = random.Random(1)
+    threads = [threading.Thread(target=reboot, args=(mock, events, random.Random(rng.random())))
+               for mock in mocks]
+    devices = [jsonrpcdevice.AdstecJSONRPCDevice(mock.target, "admin", "admin", timeout=5)
+               for mock in mocks]
+    for thread in threads:
+        thread.start()
+    seen = wait(devices)
+    for thread in threads:
+        thread.join()
+    lags = {}
+    for phase in PHASES:
+        phase_lags = [seen[key] - events[key] for key in events if key[1] == phase and key in seen]
+        lags[phase] = (sum(phase_lags) / len(phase_lags), max(phase_lags)) if phase_lags else None
+    return lags
+
+
+def wait_sleep_poll(devices):
+    seen = {}
+    with ThreadPoolExecutor(max_workers=len(devices)) as executor:
+        list(executor.map(lambda dev: sleep_poll(dev, seen), devices))
+    return seen
+
+
+def wait_waiter(devices, cls=jsonrpcdevice.RebootWaiter):
+    seen = {}
+    waiter = cls(timeout=60, on_phase=lambda name, phase, elapsed:
+                 seen.__setitem__((name, phase), time.monotonic()))
+    results = waiter.wait_all(devices)
+    assert all(r.ok for r in results.values())
+    return seen
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    mocks = [MockDevice().start() for _ in range(count)]
+    try:
+        print(f"{count} devices: up {UP[0]}-{UP[1]}s, down {DOWN[0]}-{DOWN[1]}s, "
+              f"booting {BOOTING}s")
+        print("lag in seconds from the change until it was noticed, mean (max)")
+        print(f"{'mode':<12s}" + "".join(f" {phase:>16s}" for phase in PHASES))
+        modes = (("sleep-poll", wait_sleep_poll),
+                 ("waiter-1s", lambda devices: wait_waiter(devices, CappedWaiter)),
+                 ("waiter", wait_waiter))
+        for name, wait in modes:
+            lags = run(mocks, wait)
+            print(f"{name:<12s}" + "".join(
+                f" {'-':>16s}" if lags[phase] is None else
+                f" {lags[phase][0]:7.2f} ({lags[phase][1]:5.2f})" for phase in PHASES))
+    finally:
+        for mock in mocks:
+            mock.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+"""Measure a staged firmware rollout over mock devices.
+
+Every mock device "flashes" the uploaded image: it goes down shortly after
+the upload and comes back with a new ``imageversion``. The rollout runs a
+canary, then all other devices, with a fixed number of parallel uploads
+and a shared bandwidth budget. Reported are the wall time, the upload rate
+reached compared to the budget and the time spent per device.
+
+Usage:
+    python benchmarks/bench_rollout.py [devices] [image MB] [budget MB/s]
+"""
+
+import sys
+import os
+import tempfile
+import threading
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import jsonrpcdevice
+from mockserver import MockDevice
+
+FLASH, DOWN = 0.5, 2.0
+
+
+def flasher(mock):
+    def reboot():
+        time.sleep(FLASH)
+        mock.stop()
+        time.sleep(DOWN)
+        mock.status["imageversion"] = "2.2.6 SVN R63743.B"
+        mock.start()
+
+    return lambda size: threading.Thread(target=reboot).start()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    size = int(float(sys.argv[2]) * 1e6) if len(sys.argv) > 2 else 4000000
+    budget = float(sys.argv[3]) * 1e6 if len(sys.argv) > 3 else 40e6
+    mocks = [MockDevice().start() for _ in range(count)]
+    with tempfile.TemporaryDirectory() as tmp:
+        image = os.path.join(tmp, "firmware.bin")
+        with open(image, "wb") as f:
+            f.write(os.urandom(size))
+        for mock in mocks:
+            mock.status.update(product="IRF3821", imageversion="2.2.5 SVN R60000.B")
+            mock.on_upload = flasher(mock)
+        fleet = jsonrpcdevice.Fleet([{"host": m.target, "user": "admin", "password": "admin"}
+                                     for m in mocks], timeout=10.0)
+        rollout = jsonrpcdevice.FirmwareRollout(
+            fleet, {"IRF3": (image, "2.2.6")}, state_file=os.path.join(tmp, "state.json"),
+            waves=(1, 1.0), parallel=4, bandwidth=budget)
+        start = time.perf_counter()
+        try:
+            summary = rollout.run()
+        finally:
+            elapsed = time.perf_counter() - start
+            for mock in mocks:
+                mock.stop()
+    # the canary uploads alone; the others share the budget four at a time
+    records = [rollout.devices[m.target] for m in mocks]
+    upload = sum(r["upload"] for r in records[1:]) / (count - 1)
+    print(f"{count} devices, {size / 1e6:.1f} MB image, budget {budget / 1e6:.1f} MB/s, "
+          f"4 parallel uploads")
+    print(f"steps: {summary['steps']}")
+    print(f"{'wall time s':<24s} {elapsed:8.2f}")
+    print(f"{'mean upload s':<24s} {upload:8.2f}")
+    print(f"{'upload MB/s, 4 at once':<24s} {4 * size / upload / 1e6:8.2f}")
+    print(f"{'mean booted s':<24s} {sum(r['booted'] for r in records) / count:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+"""Measure the start-up cost of loading configdb product schemas.
+
+Each case starts from a fresh SchemaRegistry, as a new script would:
+
+    cold json     json.load() of the schema file
+    json validate ConfigValidator built from the JSON file, checking 3 values
+    first run     registry without a cache file: parse and write the cache
+    warm cache    all sections from the binary cache
+    lazy          only ``properties`` from the binary cache
+    validate      lazy, plus checking 3 values (compiles 3 patterns)
+
+The same cases are repeated for all product schemas at once. The ``re``
+module's own pattern cache is emptied before every round.
+
+Usage:
+    python benchmarks/bench_schema_load.py [product] [rounds]
+"""
+
+import sys
+import os
+import json
+import re
+import shutil
+import tempfile
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import jsonrpcdevice
+
+VALUES = {"comsrv": "enabled", "comsrv_baudrate": "115200", "ntp_service": "enabled"}
+
+
+def best(func, rounds):
+    times = []
+    for _ in range(rounds):
+        re.purge()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def cold_json(products):
+    for product in products:
+        with open(os.path.join(jsonrpcdevice.SchemaRegistry.schema_dir,
+                               f"{product}.schema.json"), "r", encoding="utf-8") as f:
+            json.load(f)
+
+
+def json_validate(products):
+    for product in products:
+        path = os.path.join(jsonrpcdevice.SchemaRegistry.schema_dir, f"{product}.schema.json")
+        jsonrpcdevice.ConfigValidator(path).validate_config(VALUES)
+
+
+def first_run(products):
+    cache_dir = tempfile.mkdtemp(prefix="bench_schema_")
+    try:
+        registry = jsonrpcdevice.SchemaRegistry(cache_dir=cache_dir)
+        for product in products:
+            registry.get(product).properties
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+def warm_cache(products, cache_dir):
+    registry = jsonrpcdevice.SchemaRegistry(cache_dir=cache_dir)
+    for product in products:
+        schema = registry.get(product)
+        schema.meta, schema.properties, schema.tables, schema.pages
+
+
+def lazy(products, cache_dir):
+    registry = jsonrpcdevice.SchemaRegistry(cache_dir=cache_dir)
+    for product in products:
+        registry.get(product).properties
+
+
+def validate(products, cache_dir):
+    registry = jsonrpcdevice.SchemaRegistry(cache_dir=cache_dir)
+    for product in products:
+        registry.validator(product).validate_config(VALUES)
+
+
+def main():
+    product = sys.argv[1] if len(sys.argv) > 1 else "IRF3821"
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    cache_dir = tempfile.mkdtemp(prefix="bench_schema_")
+    try:
+        everything = jsonrpcdevice.SchemaRegistry(cache_dir=cache_dir).products()
+        warm_cache(everything, cache_dir)
+        print(f"{'case':<14s} {product + ' ms':>12s} {'all ' + str(len(everything)) + ' ms':>12s}")
+        for name, func, needs_cache in (("cold json", cold_json, False),
+                                        ("json validate", json_validate, False),
+                                        ("first run", first_run, False),
+                                        ("warm cache", warm_cache, True),
+                                        ("lazy", lazy, True),
+                                        ("validate", validate, True)):
+            args = (cache_dir,) if needs_cache else ()
+            one = best(lambda: func([product], *args), rounds)
+            every = best(lambda: func(everything, *args), rounds)
+            print(f"{name:<14s} {one:12.2f} {every:12.2f}")
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+if __name__ == "__main__":
+    main()
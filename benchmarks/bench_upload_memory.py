@@ -0,0 +1,69 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+"""Measure peak RSS while uploading a large synthetic file to upload.php.
+
+"requests-files" posts with ``requests.post(files=...)``, which encodes the
+whole multipart body in memory (the previous ``upload_file``); "streaming"
+uses ``AdstecJSONRPCDevice.upload_file``.  Each mode runs in its own
+process so the peak RSS values do not mask each other.
+
+Usage:
+    python benchmarks/bench_upload_memory.py [size_mb]
+"""
+
+import sys
+import os
+import resource
+import subprocess
+import tempfile
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import requests
+import jsonrpcdevice
+from mockserver import MockDevice
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+def run(mode, filename):
+    with MockDevice() as mock:
+        dev = jsonrpcdevice.AdstecJSONRPCDevice(mock.target, "admin", "admin")
+        dev.get_sid()
+        baseline = peak_rss_mb()
+        start = time.perf_counter()
+        if mode == "streaming":
+            dev.upload_file("firmware", filename)
+        else:
+            with open(filename, "rb") as f:
+                requests.post(f"https://{mock.target}/priv/script/php_rpc/upload.php",
+                              files={"firmware": f}, cookies={"ads_sid": dev.sid},
+                              verify=False).raise_for_status()
+        elapsed = time.perf_counter() - start
+    size_mb = os.path.getsize(filename) / 1048576
+    print(f"{mode:<15s} {peak_rss_mb():9.1f} {peak_rss_mb() - baseline:9.1f} "
+          f"{size_mb / elapsed:9.1f}")
+
+
+def main():
+    if len(sys.argv) > 2:
+        run(sys.argv[1], sys.argv[2])
+        return
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "firmware.bin")
+        with open(filename, "wb") as f:
+            for _ in range(size_mb):
+                f.write(os.urandom(1048576))
+        print(f"upload of {size_mb} MB")
+        print(f"{'mode':<15s} {'peak MB':>9s} {'growth MB':>9s} {'MB/s':>9s}")
+        for mode in ("requests-files", "streaming"):
+            subprocess.run([sys.executable, __file__, mode, filename], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+"""Measure how fast ConfigValidator checks a large import_config payload.
+
+The payload sets every configuration variable of the product to its schema
+default and inserts port forwarding rules until it holds about 10,000
+values. "uncompiled" checks the same payload with ``re.search(pattern,
+value)`` straight from the schema, which overflows the ``re`` module's
+pattern cache and recompiles most patterns on every call.
+
+Usage:
+    python benchmarks/bench_validator.py [product] [values]
+"""
+
+import sys
+import os
+import json
+import re
+import time
+import warnings
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import jsonrpcdevice
+
+ROUNDS = 5
+
+
+def build_payload(schema, values):
+    configdata = {key: spec.get("default", "") for key, spec in schema["properties"].items()}
+    rows = [["lan", "tcp", "", str(1000 + i), f"192.168.0.{i % 250 + 1}", "80",
+             "disabled", "", f"rule {i}", "enabled", "disabled"]
+            for i in range((values - len(configdata)) // 11)]
+    return {"configdata": configdata,
+            "tableinsert": [{"tablename": "forwarding", "data": rows}]}
+
+
+def uncompiled(schema, jsondata):
+    issues = 0
+    properties = schema["properties"]
+    for key, value in jsondata["configdata"].items():
+        if not re.search(properties[key]["pattern"], value):
+            issues += 1
+    columns = schema["definitions"]["tables"]["forwarding"]["items"]["properties"]
+    for entry in jsondata["tableinsert"]:
+        for row in entry["data"]:
+            for spec, value in zip(columns.values(), row):
+                if not re.search(spec["pattern"], value):
+                    issues += 1
+    return issues
+
+
+def best(func):
+    times = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    product = sys.argv[1] if len(sys.argv) > 1 else "IRF3821"
+    values = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    path = os.path.join(jsonrpcdevice.SchemaRegistry.schema_dir, f"{product}.schema.json")
+    with open(path, "r", encoding="utf-8") as f:
+        schema = json.load(f)
+    jsondata = build_payload(schema, values)
+    count = len(jsondata["configdata"]) + sum(len(r) for r in jsondata["tableinsert"][0]["data"])
+
+    start = time.perf_counter()
+    validator = jsonrpcdevice.ConfigValidator(path)
+    load = time.perf_counter() - start
+    compiled, issues = best(lambda: validator.validate_import(jsondata))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)
+        plain, plain_issues = best(lambda: uncompiled(schema, jsondata))
+
+    print(f"product:           {product}, {count} values, {len(issues)} invalid")
+    print(f"load:              {load * 1000:.1f} ms")
+    print(f"{'mode':<12s} {'ms':>8s} {'values/s':>12s}")
+    print(f"{'uncompiled':<12s} {plain * 1000:8.1f} {count / plain:12,.0f}")
+    print(f"{'validator':<12s} {compiled * 1000:8.1f} {count / compiled:12,.0f}")
+    print(f"speedup: {plain / compiled:.1f}x")
+    if plain_issues != len(issues):
+        print(f"warning: uncompiled check found {plain_issues} invalid values")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+"""Local stand-in for the HTTPS endpoints of an ads-tec device.
+
+Serves the requests of a :class:`jsonrpcdevice_fake.FakeDevice` (``/rpc``,
+``upload.php``, ``download.php`` and ``/``) over HTTP/1.1 keep-alive with a
+throw-away self-signed certificate, so the benchmarks can measure the
+client, its connection pool and TLS without a real IRF/AWT device.  The
+certificate is generated with the ``openssl`` command line tool.
+
+Usage from a benchmark:
+
+    with MockDevice() as mock:
+        dev = jsonrpcdevice.AdstecJSONRPCDevice(mock.target, "admin", "admin")
+"""
+
+import multiprocessing
+import os
+import shutil
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from jsonrpcdevice_fake import FakeDevice
+
+
+def make_certificate(directory):
+    """Create a self-signed certificate/key pair and return their paths."""
+    cert = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+         "-keyout", key, "-out", cert, "-days", "1", "-subj", "/CN=127.0.0.1"],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    return cert, key
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.answer(None)
+
+    def do_POST(self):
+        self.answer(int(self.headers.get("Content-Length", 0)))
+
+    def body(self, length):
+        # hand the body on in pieces, like PHP spooling an upload to disk
+        while length > 0:
+            chunk = self.rfile.read(min(length, 1 << 16))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+    def answer(self, length):
+        mock = self.server.mock
+        chunks = self.body(length or 0)
+        status, headers, content = mock.device.handle(self.command, self.path, self.headers, chunks)
+        for _ in chunks:
+            pass    # keep the connection usable if the body was not read
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if "Content-Length" not in headers:
+            self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        view = memoryview(content)
+        for offset in range(0, len(view), 1 << 16):
+            self.wfile.write(view[offset:offset + (1 << 16)])
+        if status == 200 and self.path.endswith("/upload.php") and mock.on_upload:
+            mock.on_upload(mock.device.uploads[-1][1])
+
+
+class MockDevice:
+    """
+    Threaded HTTPS server in front of a :class:`jsonrpcdevice_fake.FakeDevice`.
+
+    The state of the device is that of ``mock.device``; its attributes can
+    also be read from the mock, e.g. ``mock.files``, ``mock.config``,
+    ``mock.status``, ``mock.tables`` or ``mock.calls``. With a ``product``
+    the variables and tables come from its configdb schema.
+    ``mock.on_upload(size)`` is called after every upload. ``stop()`` and
+    ``start()`` again keep the port, like a device rebooting.
+    """
+
+    def __init__(self, product=None, tls=True, port=0):
+        self.device = FakeDevice(product)
+        self.tls = tls
+        self.port = port
+        self.on_upload = None
+        self.server = None
+        self._tmpdir = None
+
+    def __getattr__(self, name):
+        # only called for attributes the mock does not have itself
+        if name == "device":
+            raise AttributeError(name)
+        return getattr(self.device, name)
+
+    @property
+    def target(self):
+        host, port = self.server.server_address[:2]
+        return f"{host}:{port}"
+
+    def start(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", self.port), MockHandler)
+        self.port = self.server.server_address[1]
+        self.server.daemon_threads = True
+        self.server.mock = self
+        if self.tls:
+            self._tmpdir = tempfile.mkdtemp()
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(*make_certificate(self._tmpdir))
+            self.server.socket = context.wrap_socket(self.server.socket, server_side=True)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._tmpdir:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+class MockDeviceProcess:
+    """
+    :class:`MockDevice` running in a child process, for benchmarks that
+    measure the memory of the client process only.
+    """
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.target = None
+        self._process = None
+
+    @staticmethod
+    def _serve(conn, kwargs):
+        with MockDevice(**kwargs) as mock:
+            conn.send(mock.target)
+            conn.recv()
+
+    def __enter__(self):
+        parent, child = multiprocessing.Pipe()
+        self._conn = parent
+        self._process = multiprocessing.Process(target=self._serve, args=(child, self.kwargs), daemon=True)
+        self._process.start()
+        self.target = parent.recv()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._conn.send("stop")
+        self._process.join(5)
+        if self._process.is_alive():
+            self._process.terminate()
@@ -0,0 +1,316 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+"""Benchmark suite for the hot paths of the client, with JSON results.
+
+Runs against the local mock device (``mockserver.py``) and writes one
+result per measurement, so runs can be kept and compared for regressions:
+
+    call        ``call()`` latency on a new connection (cold: TCP and TLS
+                handshake) and on a pooled one (warm), warm throughput, and
+                the client's own cost through ``FakeDevice`` (no network),
+                without and with ``CallMetrics``
+    json        encoding the ``import_config`` request of a packet filter
+                of N rules, like examples/packet_filter_import.py, and
+                decoding the same data as a response
+    table       decoding a ``get_values_as_table`` response of 600 s x 500
+                metrics, and converting it with ``to_columns``
+    transfer    upload.php and download.php throughput and the growth of
+                the peak RSS, each in a client process of its own
+    schema      loading each configdb product schema from the JSON file
+                (cold) and from the binary cache (cached)
+
+Times are medians over several rounds. ``--output`` writes the results
+as JSON; ``--compare`` reads such a file and exits with status 1 if a
+result got worse by more than ``--threshold`` (default 0.25, i.e. 25%).
+``--quick`` uses smaller sizes and fewer rounds, e.g. for CI.
+
+Usage:
+    python benchmarks/suite.py [--quick] [--only call,json,table,transfer,schema]
+        [--output results.json] [--compare baseline.json] [--threshold 0.25]
+"""
+
+import sys
+import os
+import json
+import platform
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import jsonrpcdevice
+from jsonrpcdevice_fake import FakeDevice
+from mockserver import MockDevice, MockDeviceProcess
+
+CASES = ("call", "json", "table", "transfer", "schema")
+SIZES = {
+    False: {"calls": 300, "cold": 50, "rules": 2000, "metrics": 500, "seconds": 600,
+            "transfer_mb": 64, "rounds": 7},
+    True: {"calls": 50, "cold": 10, "rules": 500, "metrics": 500, "seconds": 600,
+           "transfer_mb": 8, "rounds": 3},
+}
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def timed(func, rounds):
+    """Return the median time of ``func()`` in milliseconds."""
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return median(times) * 1000
+
+
+def latencies(func, count):
+    times = []
+    for _ in range(count):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+class Results:
+    """Measurements by name, each with its unit and the better direction."""
+
+    def __init__(self):
+        self.values = {}
+
+    def add(self, name, value, unit, better="lower"):
+        self.values[name] = {"value": round(value, 4), "unit": unit, "better": better}
+        print(f"{name:<36s} {value:12.3f} {unit}")
+
+
+def bench_call(results, sizes):
+    with MockDeviceProcess() as mock:
+        dev = jsonrpcdevice.AdstecJSONRPCDevice(mock.target, "admin", "admin", timeout=10)
+        dev.get_sid()
+
+        def cold():
+            dev.close()
+            dev.status("boot_finished")
+
+        times = latencies(cold, sizes["cold"])
+        results.add("call.cold.p50", median(times), "ms")
+        results.add("call.cold.p95", percentile(times, 0.95), "ms")
+        dev.status("boot_finished")
+        times = latencies(lambda: dev.status("boot_finished"), sizes["calls"])
+        results.add("call.warm.p50", median(times), "ms")
+        results.add("call.warm.p95", percentile(times, 0.95), "ms")
+        results.add("call.warm.throughput", 1000 * len(times) / sum(times), "calls/s", "higher")
+        dev.close()
+    fake = FakeDevice()
+    dev = jsonrpcdevice.AdstecJSONRPCDevice("fake", "admin", "admin", transport=fake)
+    dev.status("boot_finished")
+    times = latencies(lambda: dev.status("boot_finished"), sizes["calls"])
+    results.add("call.fake.p50", median(times) * 1000, "us")
+    dev.hooks.append(jsonrpcdevice.CallMetrics())
+    times = latencies(lambda: dev.status("boot_finished"), sizes["calls"])
+    results.add("call.fake.metrics.p50", median(times) * 1000, "us")
+
+
+def make_rules(columns, count):
+    rules = []
+    for i in range(count):
+        row = {column: "" for column in columns}
+        row.update({"id": str(1000 + i), "service_id": "1000", "protocol": "TCP",
+                    "action_id": "2", "log_active": "1", "alarm_active": "0",
+                    "description": f"drop port {1024 + i}", "position": str(i + 1),
+                    "src_ip_add": "*", "src_netmask": "255.255.255.255", "src_port": "*",
+                    "des_ip_add": "*", "des_netmask": "255.255.255.255",
+                    "des_port": str(1024 + i), "state_type_id": "1",
+                    "states": "NEW,RELATED,ESTABLISHED", "audit_active": "0"})
+        rules.append(row)
+    return rules
+
+
+def bench_json(results, sizes):
+    columns = jsonrpcdevice.SchemaRegistry.default().get("IRF3821").columns("serv_Protocols")
+    jsondata = {
+        "tableflush": [{"tablename": "serv_Protocols"}],
+        "tableinsert": [{"tablename": "serv_Protocols",
+                         "data": make_rules(columns, sizes["rules"])}],
+    }
+    payload = {"id": "req-1", "jsonrpc": "2.0", "method": "call",
+               "params": ["a1b2c3d4e5f6a1b2c3d4e5f6a1b2c3d4", "config", "import_config",
+                          {"jsondata": jsondata}]}
+    # what requests does with json=payload
+    body = json.dumps(payload, allow_nan=False).encode("utf-8")
+    response = json.dumps({"id": "req-1", "jsonrpc": "2.0",
+                           "result": [0, {"jsondata": jsondata}]}).encode("utf-8")
+    rounds = sizes["rounds"]
+    encode = timed(lambda: json.dumps(payload, allow_nan=False).encode("utf-8"), rounds)
+    decode = timed(lambda: json.loads(response), rounds)
+    results.add("json.import_config.size", len(body) / 1e6, "MB")
+    results.add("json.import_config.encode", encode, "ms")
+    results.add("json.import_config.decode", decode, "ms")
+    results.add("json.import_config.encode_rate", len(body) / 1e3 / encode, "MB/s", "higher")
+
+
+def bench_table(results, sizes):
+    end = 1771510200
+    table = {}
+    for i in range(sizes["metrics"]):
+        # the latest 10 s are not flushed yet and come back as null
+        table[f"metric.{i}"] = [{"ts": ts, "val": float((ts * (i + 1)) % 1000)
+                                 if end - ts >= 10 else None}
+                                for ts in range(end - sizes["seconds"] + 1, end + 1)]
+    body = json.dumps({"id": "req-1", "jsonrpc": "2.0",
+                       "result": [0, {"result": table}]}).encode("utf-8")
+    rounds = sizes["rounds"]
+    results.add("table.size", len(body) / 1e6, "MB")
+    results.add("table.decode", timed(lambda: json.loads(body), rounds), "ms")
+    if jsonrpcdevice.np is not None:
+        decoded = json.loads(body)["result"][1]
+        results.add("table.to_columns", timed(lambda: jsonrpcdevice.to_columns(decoded), rounds), "ms")
+
+
+def transfer(mode, target, filename):
+    """Run one transfer in this process and print its figures as JSON."""
+    dev = jsonrpcdevice.AdstecJSONRPCDevice(target, "admin", "admin", timeout=60)
+    dev.get_sid()
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    if mode == "upload":
+        dev.upload_file("firmware", filename)
+    else:
+        dev.download_file("diag.tar.gz", filename)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"seconds": elapsed, "rss_mb": peak_rss_mb() - baseline}))
+
+
+def bench_transfer(results, sizes):
+    size = sizes["transfer_mb"] * 1048576
+    tmp = tempfile.mkdtemp(prefix="bench_suite_")
+    try:
+        image = os.path.join(tmp, "firmware.bin")
+        with open(image, "wb") as f:
+            for _ in range(sizes["transfer_mb"]):
+                f.write(os.urandom(1048576))
+        with MockDevice() as mock:
+            mock.files["diag.tar.gz"] = os.urandom(size)
+            for mode, filename in (("upload", image), ("download", os.path.join(tmp, "diag"))):
+                output = subprocess.run(
+                    [sys.executable, __file__, "--transfer", mode, mock.target, filename],
+                    check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+                figures = json.loads(output.splitlines()[-1])
+                results.add(f"transfer.{mode}.rate", size / 1048576 / figures["seconds"],
+                            "MB/s", "higher")
+                results.add(f"transfer.{mode}.rss_growth", figures["rss_mb"], "MB")
+    finally:
+        shutil.rmtree(tmp)
+
+
+def bench_schema(results, sizes):
+    cache_dir = tempfile.mkdtemp(prefix="bench_suite_")
+    try:
+        products = jsonrpcdevice.SchemaRegistry(cache_dir=False).products()
+        jsonrpcdevice.SchemaRegistry(cache_dir=cache_dir).get(products[0]).properties
+        for product in products:
+            # a fresh registry per round, as in a new script
+            cold = timed(lambda: jsonrpcdevice.SchemaRegistry(cache_dir=False)
+                         .get(product).properties, sizes["rounds"])
+            jsonrpcdevice.SchemaRegistry(cache_dir=cache_dir).get(product).properties
+            cached = timed(lambda: jsonrpcdevice.SchemaRegistry(cache_dir=cache_dir)
+                           .get(product).properties, sizes["rounds"])
+            results.add(f"schema.{product}.cold", cold, "ms")
+            results.add(f"schema.{product}.cached", cached, "ms")
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+def compare(current, baseline, threshold):
+    """Print the change of every result and return the names of regressions."""
+    regressions = []
+    print(f"\n{'result':<36s} {'baseline':>12s} {'current':>12s} {'change':>8s}")
+    for name, result in current.items():
+        old = baseline.get(name)
+        if old is None or not old["value"]:
+            continue
+        change = result["value"] / old["value"] - 1
+        worse = change if result["better"] == "lower" else -change
+        flag = ""
+        if worse > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<36s} {old['value']:12.3f} {result['value']:12.3f} {change:+8.1%}{flag}")
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                              universal_newlines=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    args = sys.argv[1:]
+    if args[:1] == ["--transfer"]:
+        transfer(*args[1:4])
+        return
+    options = {"--only": ",".join(CASES), "--output": None, "--compare": None, "--threshold": "0.25"}
+    quick = "--quick" in args
+    if quick:
+        args.remove("--quick")
+    for option in options:
+        if option in args:
+            i = args.index(option)
+            options[option] = args[i + 1]
+            del args[i:i + 2]
+    cases = options["--only"].split(",")
+    if args or not set(cases) <= set(CASES):
+        print(__doc__)
+        sys.exit(1)
+
+    sizes = SIZES[quick]
+    results = Results()
+    benchmarks = {"call": bench_call, "json": bench_json, "table": bench_table,
+                  "transfer": bench_transfer, "schema": bench_schema}
+    for case in CASES:
+        if case in cases:
+            benchmarks[case](results, sizes)
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": quick,
+        "sizes": sizes,
+        "results": results.values,
+    }
+    if options["--output"]:
+        with open(options["--output"], "w") as f:
+            json.dump(report, f, indent=2)
+    if options["--compare"]:
+        with open(options["--compare"]) as f:
+            baseline = json.load(f)
+        regressions = compare(results.values, baseline["results"], float(options["--threshold"]))
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
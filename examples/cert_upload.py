@@ -19,7 +19,7 @@ def upload_cert(dev, cert_type, filename, overwrite_existing_cert=False):
         else:
             return
     upload_result = dev.upload_file("cert", filename)
-    print(f"upload_result: {upload_result}")
+    print(f"upload_result: {upload_result.text}")
     certs_after = dev.status(cert_type)
     if filename in certs_after:
         print(f"cert succefully uploaded")
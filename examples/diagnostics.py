@@ -9,14 +9,18 @@ from datetime import datetime
 if __name__ == "__main__":
     dev = jsonrpcdevice.AdstecJSONRPCDevice("192.168.0.254", "admin", "admin")
 
-    system_name = dev.status("system_name")
-    print(f"system_name: {system_name}")
-
-    imageversion = dev.status("imageversion")
-    print(f"imageversion: {imageversion}")
+    # read all status properties in a single round trip
+    with dev.batch() as b:
+        system_name = b.status("system_name")
+        imageversion = b.status("imageversion")
+        cpustat = b.status("cpustat")
+        redbootserial = b.status("redbootserial")
+        redbootproduct = b.status("redbootproduct")
+    system_name = system_name.result()
 
-    cpustat = dev.status("cpustat")
-    print(f"cpustat: {cpustat}")
+    print(f"system_name: {system_name}")
+    print(f"imageversion: {imageversion.result()}")
+    print(f"cpustat: {cpustat.result()}")
 
     # download diag which contains system information like cpu, memory, network, temperature
     dev.config_set_commit({"generate_diag_now": "1"})
@@ -26,10 +30,7 @@ if __name__ == "__main__":
     dev.download_file("diag.tar.gz", output_filename)
     print(f"Diag download complete: {output_filename}")
 
-    redbootserial = dev.status("redbootserial")
-    print(f"serial: {redbootserial}")
-
-    redbootproduct = dev.status("redbootproduct")
-    print(f"hardware revision: {redbootproduct}")
+    print(f"serial: {redbootserial.result()}")
+    print(f"hardware revision: {redbootproduct.result()}")
 
     dev.logout()
\ No newline at end of file
@@ -79,32 +79,22 @@ def main():
     print(f"Polling every {POLL_INTERVAL}s. Press Ctrl+C to stop.\n")
 
     prev_values = {}
+    # only fetches the samples that arrived since the previous poll
+    stream = jsonrpcdevice.MetricStream(dev, ruleset_metrics, window=30)
 
     try:
         while True:
-            now = int(time.time())
             try:
-                raw = dev.call("datacollection", "get_values_as_table",
-                               metrics=ruleset_metrics,
-                               **{"from": now - 30, "to": now,
-                                  "resolution": 1})
+                stream.poll()
             except Exception as e:
                 print(f"Query error: {e}")
-                time.sleep(POLL_INTERVAL)
+                time.sleep(POLL_INTERVAL - time.time() % POLL_INTERVAL)
                 continue
 
-            data = raw.get("result", {})
             ts_str = time.strftime("%H:%M:%S")
 
             for metric in ruleset_metrics:
-                points = data.get(metric, [])
-                # use the latest non-null value
-                current = None
-                for p in reversed(points):
-                    if p["val"] is not None:
-                        current = p["val"]
-                        break
-
+                current = stream.latest(metric)
                 if current is None:
                     continue
 
@@ -117,7 +107,8 @@ def main():
                     print(f"[{ts_str}] {label:40s}  "
                           f"bytes={current:>10.0f}  delta={delta:>+10.0f}")
 
-            time.sleep(POLL_INTERVAL)
+            # wait for the next multiple of the interval, so the cycle does not drift
+            time.sleep(POLL_INTERVAL - time.time() % POLL_INTERVAL)
 
     except KeyboardInterrupt:
         print("\nStopped.")
@@ -0,0 +1,76 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+"""Update the firmware of all devices of an inventory in waves.
+
+The first device is a canary; when it is updated, 10 devices follow, then
+the rest. The rollout stops if the canary or more than 2% of the devices
+fail. Progress is kept in the state file: after an interruption, run the
+same command again to continue.
+
+The inventory is a CSV file with the header line
+``host,user,password,product`` or a JSON list of such objects. Images are
+given per product family as ``family=image`` or ``family=image@version``.
+
+Usage:
+    python fleet_firmware_rollout.py <inventory.csv> <state.json> <family=image[@version]> ...
+        [--parallel N] [--mbps M]
+
+Examples:
+    python fleet_firmware_rollout.py plant.csv rollout.json \\
+        IRF3=Ads-tec-IRF3xxx-2.2.6-SVN-R63743.B-181926.bin@2.2.6 --parallel 8 --mbps 100
+"""
+
+import sys
+import os
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import jsonrpcdevice
+
+
+def main():
+    args = sys.argv[1:]
+    parallel, mbps = 4, None
+    if "--parallel" in args:
+        i = args.index("--parallel")
+        parallel = int(args[i + 1])
+        del args[i:i + 2]
+    if "--mbps" in args:
+        i = args.index("--mbps")
+        mbps = float(args[i + 1])
+        del args[i:i + 2]
+    if len(args) < 3:
+        print(__doc__)
+        sys.exit(1)
+
+    images = {}
+    for arg in args[2:]:
+        family, image = arg.split("=", 1)
+        path, _, version = image.partition("@")
+        images[family] = (path, version or None)
+
+    def show(host, step, record):
+        print(f"{time.strftime('%H:%M:%S')}  {host:<20s} {step}"
+              + (f": {record['error']}" if step == "failed" else ""))
+
+    def next_wave(wave, summary):
+        print(f"wave {wave} finished: {summary['steps']}")
+        return True
+
+    fleet = jsonrpcdevice.Fleet.from_file(args[0], timeout=60.0)
+    rollout = jsonrpcdevice.FirmwareRollout(
+        fleet, images, state_file=args[1], waves=(1, 10, 1.0), max_failures=0.02,
+        parallel=parallel, bandwidth=mbps * 125000 if mbps else None,
+        between_waves=next_wave, on_step=show)
+    try:
+        summary = rollout.run()
+    finally:
+        fleet.logout()
+    print(f"\n{summary['steps']}")
+    if summary["aborted"]:
+        print(f"Aborted: {summary['aborted']}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
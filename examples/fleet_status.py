@@ -0,0 +1,49 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+"""Query the firmware version of every device in an inventory in parallel.
+
+The inventory is a CSV file with the header line
+``host,user,password,product`` or a JSON list of such objects.
+
+Usage:
+    python fleet_status.py <inventory.csv> [workers]
+
+Examples:
+    python fleet_status.py sites.csv 64
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import jsonrpcdevice
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    fleet = jsonrpcdevice.Fleet.from_file(sys.argv[1], max_workers=workers,
+                                          timeout=20.0, retries=2)
+
+    try:
+        # results are printed as soon as each device answers
+        for r in fleet.run(lambda dev: dev.status("imageversion"), idempotent=True):
+            if r.ok:
+                print(f"{r.host:<20s} {r.value:<40s} {r.elapsed:6.2f}s")
+            else:
+                print(f"{r.host:<20s} FAILED after {r.attempts} attempt(s): {r.error}")
+    finally:
+        fleet.logout()
+
+    summary = fleet.summary()
+    print(f"\n{summary['succeeded']}/{summary['total']} devices succeeded")
+    if "latency" in summary:
+        lat = summary["latency"]
+        print(f"latency: median {lat['median']:.2f}s, p95 {lat['p95']:.2f}s, max {lat['max']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+"""Archive datacollection metrics of many devices beyond the device's
+10-minute buffer, and query the archive.
+
+The inventory is a CSV file with the header line
+``host,user,password,product`` or a JSON list of such objects.
+Only metrics starting with one of the given prefixes are archived
+(default: all). Requires numpy.
+
+Usage:
+    python metric_archiver.py collect <inventory.csv> <directory> [prefix ...]
+    python metric_archiver.py query <directory> <host> <metric> [hours]
+
+Examples:
+    python metric_archiver.py collect sites.csv /var/lib/adstec-metrics system. ETH
+    python metric_archiver.py query /var/lib/adstec-metrics 10.0.0.1 system.cpu 24
+"""
+
+import sys
+import os
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import jsonrpcdevice
+
+
+def collect(inventory, directory, prefixes):
+    fleet = jsonrpcdevice.Fleet.from_file(inventory, timeout=20.0)
+    archive = jsonrpcdevice.MetricArchive(directory)
+    # each device reports its own metrics; keep those with a wanted prefix
+    wanted = (lambda m: m.startswith(tuple(prefixes))) if prefixes else None
+    collector = jsonrpcdevice.MetricCollector(archive, fleet, metrics=wanted)
+
+    print(f"Archiving {len(collector.devices)} devices to {directory}. Press Ctrl+C to stop.")
+    try:
+        collector.run()
+    except KeyboardInterrupt:
+        print("\nStopped.")
+    finally:
+        fleet.logout()
+    for host, error in sorted(collector.errors.items()):
+        print(f"{host:<20s} last poll failed: {error}")
+    print(f"{collector.samples} samples archived in {collector.polls} polls")
+
+
+def query(directory, host, metric, hours):
+    archive = jsonrpcdevice.MetricArchive(directory)
+    ts, values = archive.query(host, metric, start=time.time() - hours * 3600)
+    if not len(ts):
+        print("No data.")
+        return
+    step = int(ts[1] - ts[0]) if len(ts) > 1 else 1
+    print(f"{len(ts)} values, about {step}s apart")
+    for t, v in list(zip(ts, values))[-20:]:
+        print(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(int(t)))}  {v:12.2f}")
+
+
+def main():
+    if len(sys.argv) >= 4 and sys.argv[1] == "collect":
+        collect(sys.argv[2], sys.argv[3], sys.argv[4:])
+    elif len(sys.argv) >= 5 and sys.argv[1] == "query":
+        hours = float(sys.argv[5]) if len(sys.argv) > 5 else 1.0
+        query(sys.argv[2], sys.argv[3], sys.argv[4], hours)
+    else:
+        print(__doc__)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+"""Watch CPU and memory usage of all devices of an inventory at once.
+
+Every device is polled every 10 s on a fixed time grid; devices are spread
+over the interval so they are not all asked at the same moment. A device
+that is still busy with its previous poll skips a tick. The table shows the
+latest values and how late the last poll of each device started.
+
+The inventory is a CSV file with the header line
+``host,user,password,product`` or a JSON list of such objects.
+
+Usage:
+    python plant_monitor.py <inventory.csv> [workers]
+
+Examples:
+    python plant_monitor.py plant.csv 64
+"""
+
+import sys
+import os
+import threading
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import jsonrpcdevice
+
+POLL_INTERVAL = 10  # seconds (data arrives every ~10s)
+METRICS = ["system.cpu", "system.memory.used", "system.memory.total"]
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    fleet = jsonrpcdevice.Fleet.from_file(sys.argv[1], timeout=POLL_INTERVAL)
+    streams = {}
+
+    def poll(name, dev):
+        stream = streams.get(name)
+        if stream is None:
+            stream = streams[name] = jsonrpcdevice.MetricStream(dev, METRICS, window=60)
+        stream.poll()
+
+    scheduler = jsonrpcdevice.PollScheduler(fleet, poll, interval=POLL_INTERVAL,
+                                            max_workers=workers)
+    thread = threading.Thread(target=scheduler.run, daemon=True)
+    thread.start()
+    print(f"Monitoring {len(scheduler.devices)} devices. Press Ctrl+C to stop.\n")
+
+    try:
+        while True:
+            time.sleep(POLL_INTERVAL - time.time() % POLL_INTERVAL)
+            print(f"{time.strftime('%H:%M:%S')}  {'host':<20s} {'CPU%':>6s} {'MEM%':>6s} "
+                  f"{'lag':>6s} {'skipped':>8s} {'errors':>7s}")
+            for name, st in sorted(scheduler.stats().items()):
+                stream = streams.get(name)
+                cpu = stream.latest("system.cpu") if stream else None
+                used = stream.latest("system.memory.used") if stream else None
+                total = stream.latest("system.memory.total") if stream else None
+                cpu_str = f"{cpu:6.1f}" if cpu is not None else f"{'-':>6s}"
+                mem_str = f"{used / total * 100:6.1f}" if used is not None and total else f"{'-':>6s}"
+                print(f"{'':10s}{name:<20s} {cpu_str} {mem_str} {st.lag:5.2f}s "
+                      f"{st.skipped:8d} {st.errors:7d}")
+            print()
+    except KeyboardInterrupt:
+        print("\nStopped.")
+    finally:
+        scheduler.stop()
+        thread.join()
+        fleet.logout()
+
+
+if __name__ == "__main__":
+    main()
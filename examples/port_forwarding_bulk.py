@@ -0,0 +1,49 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+"""Load many port forwarding rules from a CSV file with one import request.
+
+Each line holds the columns of the ``forwarding`` table in schema order:
+fwifname, fwproto, fwlocalip, fwlocalport, fwtargetip, fwtargetport,
+fwsnat, fwsrcnet, fwcomment, fwenabled, fwrsnat. Lines starting with
+``#`` are skipped. Existing rules with the same comment are replaced.
+
+Usage:
+    python port_forwarding_bulk.py <rules.csv>
+
+Examples:
+    python port_forwarding_bulk.py plant_rules.csv
+"""
+
+import csv
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import jsonrpcdevice
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    with open(sys.argv[1], newline="") as f:
+        rules = [row for row in csv.reader(f) if row and not row[0].startswith("#")]
+
+    dev = jsonrpcdevice.AdstecJSONRPCDevice("192.168.0.254", "admin", "admin")
+    # check every rule locally before anything is sent
+    dev.validator = dev.product_schema().validator()
+    comment = dev.product_schema().columns("forwarding").index("fwcomment")
+
+    dev.table_bulk(
+        "forwarding",
+        deletes=[{"fwcomment": rule[comment]} for rule in rules],
+        inserts=rules,
+    )
+    print(f"Loaded {len(rules)} forwarding rules")
+
+    dev.logout()
+
+
+if __name__ == "__main__":
+    main()
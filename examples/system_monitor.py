@@ -30,15 +30,6 @@ def discover_system_metrics(dev):
     return sorted(m for m in raw.get("result", []) if m.startswith("system."))
 
 
-def latest_value(data, metric):
-    """Return the most recent non-null value for a metric, or None."""
-    points = data.get(metric, [])
-    for p in reversed(points):
-        if p["val"] is not None:
-            return p["val"]
-    return None
-
-
 def format_uptime(seconds):
     """Format uptime seconds as 'Xd Yh Zm'."""
     if seconds is None:
@@ -83,34 +74,32 @@ def main():
           f"{'LD1':>5s}  {'LD5':>5s}  {'LD15':>5s}  {'Uptime':>10s}")
     print("-" * (50 + len(cpu_cores) * 5))
 
+    # only fetches the samples that arrived since the previous poll
+    stream = jsonrpcdevice.MetricStream(dev, system_metrics, window=30)
+
     try:
         while True:
-            now = int(time.time())
             try:
-                raw = dev.call("datacollection", "get_values_as_table",
-                               metrics=system_metrics,
-                               **{"from": now - 30, "to": now,
-                                  "resolution": 1})
+                stream.poll()
             except Exception as e:
                 print(f"Query error: {e}")
-                time.sleep(POLL_INTERVAL)
+                time.sleep(POLL_INTERVAL - time.time() % POLL_INTERVAL)
                 continue
 
-            data = raw.get("result", {})
             ts = time.strftime("%H:%M:%S")
 
-            cpu = latest_value(data, "system.cpu")
-            mem_used = latest_value(data, "system.memory.used")
-            mem_total = latest_value(data, "system.memory.total")
-            load1 = latest_value(data, "system.load.1")
-            load5 = latest_value(data, "system.load.5")
-            load15 = latest_value(data, "system.load.15")
-            uptime = latest_value(data, "system.uptime")
+            cpu = stream.latest("system.cpu")
+            mem_used = stream.latest("system.memory.used")
+            mem_total = stream.latest("system.memory.total")
+            load1 = stream.latest("system.load.1")
+            load5 = stream.latest("system.load.5")
+            load15 = stream.latest("system.load.15")
+            uptime = stream.latest("system.uptime")
 
             # per-core CPU
             core_vals = []
             for m in cpu_cores:
-                val = latest_value(data, m)
+                val = stream.latest(m)
                 core_vals.append(f"{val:4.0f}" if val is not None else "   -")
 
             # memory percentage
@@ -141,7 +130,8 @@ def main():
             )
             print(f"{format_uptime(uptime):>10s}")
 
-            time.sleep(POLL_INTERVAL)
+            # wait for the next multiple of the interval, so the cycle does not drift
+            time.sleep(POLL_INTERVAL - time.time() % POLL_INTERVAL)
 
     except KeyboardInterrupt:
         print("\nStopped.")
@@ -21,7 +21,6 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 import jsonrpcdevice
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
-from collections import defaultdict, deque
 
 WINDOW = 600          # seconds of data visible on the chart
 POLL_INTERVAL = 10000  # milliseconds between updates (data arrives every ~10s)
@@ -59,8 +58,10 @@ def main():
     tx_metrics = [f"{iface}.tx_bytes" for iface in interfaces]
     all_metrics = rx_metrics + tx_metrics
 
-    # rolling data store: {metric: deque of (timestamp, value)}
-    history = defaultdict(lambda: deque(maxlen=WINDOW))
+    # rolling data store: {metric: deque of (timestamp, value)}, filled
+    # incrementally with only the samples that arrived since the last poll
+    stream = jsonrpcdevice.MetricStream(dev, all_metrics, window=WINDOW)
+    history = stream.history
 
     # set up the plot
     fig, (ax_rx, ax_tx) = plt.subplots(2, 1, figsize=(10, 6), sharex=True)
@@ -86,21 +87,11 @@ def main():
     def update(_frame):
         now = int(time.time())
         try:
-            result = dev.call("datacollection", "get_values_as_table",
-                              metrics=all_metrics,
-                              **{"from": now - WINDOW, "to": now,
-                                 "resolution": 1})
+            stream.poll(now)
         except Exception as e:
             print(f"Query error: {e}")
             return
 
-        data = result.get("result", result)
-        for metric, points in data.items():
-            history[metric].clear()
-            for p in points:
-                if p["val"] is not None:
-                    history[metric].append((p["ts"], p["val"]))
-
         for iface in interfaces:
             rx_key = f"{iface}.rx_bytes"
             tx_key = f"{iface}.tx_bytes"
@@ -40,43 +40,437 @@ import os
 import requests
 import urllib3
 import time
-from urllib.parse import quote
+import asyncio
+import collections
+import base64
+import bisect
+import csv
+import errno
+import hashlib
+import heapq
+import io
+import itertools
+import json
+import marshal
+import operator
+import random
+import re
+import selectors
+import socket
+import ssl
+import struct
+import sys
+import threading
+import warnings
+import weakref
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from urllib.parse import quote, unquote
+
+try:
+    import fcntl
+except ImportError:
+    # not available on Windows; the SID cache then works without locking
+    fcntl = None
+
+try:
+    import httpx
+except ImportError:
+    # only needed by AsyncAdstecJSONRPCDevice
+    httpx = None
+
+try:
+    import numpy as np
+except ImportError:
+    # only needed by TimeSeriesStore and to_columns
+    np = None
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+
+class DeviceError(Exception):
+    """
+    Error reported by a device or raised while talking to it.
+
+    ``code`` is the numeric status: the JSON-RPC error code (e.g. -32002),
+    the ubus return code of the ``result`` array (e.g. 2) or the HTTP
+    status, depending on where the call failed. ``method`` names the call
+    as ``object.method`` and ``response`` keeps the raw response; neither
+    is formatted until the exception is printed.
+    """
+
+    def __init__(self, message, code=None, method=None, response=None):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+        self.method = method
+        self.response = response
+
+    def __str__(self):
+        text = self.message if self.code is None else f"{self.message} (code {self.code})"
+        return f"{self.method}: {text}" if self.method else text
+
+
+class AuthError(DeviceError):
+    """
+    Login failed or the session may not call the method.
+    """
+
+
+class SessionExpired(AuthError):
+    """
+    The device does not know the SID (any more). :meth:`AdstecJSONRPCDevice.call`
+    logs in again once before raising this.
+    """
+
+
+class ValidationError(DeviceError, ValueError):
+    """
+    Configuration values were rejected, by the device or by a
+    :class:`ConfigValidator`. ``errors`` maps each rejected key to its
+    message, as far as the device reports them (``verbose=True``);
+    ``issues`` holds the :class:`ValidationIssue` list of a local check.
+    """
+
+    def __init__(self, message, code=None, method=None, response=None, errors=None, issues=None):
+        super().__init__(message, code, method, response)
+        self.errors = errors or {}
+        self.issues = issues or []
+
+
+class TransportError(DeviceError):
+    """
+    The request did not get a usable answer: connection error, timeout,
+    HTTP error status (``code``) or a body that is not JSON. The original
+    exception is the ``__cause__``.
+    """
+
+    def __init__(self, message, code=None, method=None, response=None, timeout=False,
+                 connect=False):
+        super().__init__(message, code, method, response)
+        #: True if the request timed out.
+        self.timeout = timeout
+        #: True if no connection to the device could be made, so the
+        #: request was never sent.
+        self.connect = connect
+
+
+class DeviceBusy(DeviceError):
+    """
+    The device could not handle the request in time (ubus timeout, HTTP
+    503); worth another attempt after a pause.
+    """
+
+
+#: ubus return codes in the ``result`` array and their meaning.
+UBUS_STATUS = {
+    1: "Invalid command", 2: "Invalid argument", 3: "Method not found", 4: "Not found",
+    5: "No data", 6: "Permission denied", 7: "Request timed out", 8: "Not supported",
+    9: "Unknown error", 10: "Connection failed",
+}
+
+# exception classes by JSON-RPC error code and by ubus return code
+_RPC_ERRORS = {-32001: SessionExpired, -32002: SessionExpired, -32003: DeviceBusy}
+_UBUS_ERRORS = {2: ValidationError, 6: AuthError, 7: DeviceBusy}
+
+
+def _device_error(response, method=None):
+    """
+    Build the exception for an unsuccessful JSON/RPC response.
+    """
+    if not isinstance(response, dict):
+        return TransportError("Invalid response", method=method, response=response)
+    if "exception" in response:
+        # set by AdstecJSONRPCDevice._send_single for a failed single request
+        return response["exception"]
+    error = response.get("error")
+    if error:
+        code = error.get("code")
+        return _RPC_ERRORS.get(code, DeviceError)(
+            error.get("message") or "Error", code, method, response)
+    result = response.get("result") or [None]
+    code = result[0]
+    cls = _UBUS_ERRORS.get(code, DeviceError)
+    message = UBUS_STATUS.get(code, "Error")
+    if cls is ValidationError:
+        data = result[1] if len(result) > 1 else None
+        errors = data.get("errors", data) if isinstance(data, dict) else None
+        return ValidationError(message, code, method, response,
+                               errors=errors if isinstance(errors, dict) else None)
+    return cls(message, code, method, response)
+
+
+def _http_error(response, method=None):
+    """
+    Build the exception for an HTTP error status: :class:`AuthError` for
+    401/403, :class:`DeviceBusy` for 503, :class:`TransportError` for other
+    5xx and :class:`DeviceError` for the rest.
+    """
+    status = response.status_code
+    if status in (401, 403):
+        cls = AuthError
+    elif status == 503:
+        cls = DeviceBusy
+    elif status >= 500:
+        cls = TransportError
+    else:
+        cls = DeviceError
+    return cls(f"HTTP error {status}", status, method)
+
+
+def _raise_for_status(response, method=None):
+    """
+    Raise :func:`_http_error` unless the HTTP status is a success.
+    """
+    if response.status_code >= 400:
+        raise _http_error(response, method)
+
+
+def _connect_failed(error):
+    """
+    Tell whether an exception of requests, urllib3 or httpx was raised
+    while connecting (TCP connect, name lookup, TLS handshake), i.e. before
+    any byte of the request reached the device.
+    """
+    while error is not None:
+        if isinstance(error, TransportError):
+            return error.connect
+        if isinstance(error, (requests.exceptions.ConnectTimeout, requests.exceptions.SSLError,
+                              urllib3.exceptions.NewConnectionError,
+                              urllib3.exceptions.ConnectTimeoutError, ConnectionRefusedError)):
+            return True
+        if httpx is not None and isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout)):
+            return True
+        if isinstance(error, urllib3.exceptions.MaxRetryError):
+            error = error.reason
+        elif isinstance(error, requests.exceptions.RequestException) and error.args:
+            # requests wraps the urllib3 exception as its first argument
+            error = error.args[0] if isinstance(error.args[0], BaseException) else None
+        else:
+            error = error.__cause__
+    return False
+
+
+def _transport_error(error, method=None):
+    """
+    Wrap an exception of requests or httpx in a :class:`TransportError`;
+    raise it ``from`` the original to keep the cause.
+    """
+    timeout = isinstance(error, (requests.exceptions.Timeout, TimeoutError))
+    if httpx is not None and isinstance(error, httpx.TimeoutException):
+        timeout = True
+    return TransportError(str(error) or type(error).__name__, method=method, timeout=timeout,
+                          connect=_connect_failed(error))
+
+
 class AdstecJSONRPCDevice:
-    def __init__(self, target, user, pw, timeout=120.0, verify=False):
+    upload_file_types_default = frozenset({"firmware", "bootlogo", "settings", "customer_settings", "cert", "wwan_update"})
+    download_file_types_default = frozenset({"diag.tar.gz", "settings.cf2"})
+
+    #: Errors after which a file transfer is worth another attempt.
+    transient_errors = (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                        requests.exceptions.ChunkedEncodingError, TimeoutError,
+                        TransportError, DeviceBusy)
+
+    NULL_SID = "00000000000000000000000000000000"
+
+    def __init__(self, target, user, pw, timeout=120.0, verify=False,
+                 pool_maxsize=4, keepalive_expiry=30.0, session_timeout=600,
+                 sid_cache=None, cache=None, validator=None, transport=None, hooks=None):
+        """
+        :param target: Hostname or IP address of the device.
+        :param user: Username for authentication.
+        :param pw: Password for authentication.
+        :param timeout: Request timeout in seconds (default: 120.0).
+        :param verify: Verify the device's TLS certificate (default: False).
+        :param pool_maxsize: Maximum number of keep-alive connections kept
+                             open to the device (default: 4).
+        :param keepalive_expiry: Drop pooled connections that have been idle for
+                                 longer than this many seconds; None keeps them
+                                 until the device closes them (default: 30.0).
+        :param session_timeout: Idle timeout in seconds requested for the SID
+                                with session.create (default: 600).
+        :param sid_cache: :class:`SIDCache` to share SIDs with other processes,
+                          True for the default cache file, or None (default).
+        :param cache: :class:`ConfigCache` for configuration and status reads,
+                      True for one with default lifetimes, or None (default).
+        :param validator: :class:`ConfigValidator` that checks written values
+                          before they are sent, or None (default).
+        :param transport: ``requests`` transport adapter that carries the
+                          requests, e.g. a ``jsonrpcdevice_fake.FakeDevice``; None for HTTPS
+                          to the device (default).
+        :param hooks: List of :class:`CallHooks`, e.g. a :class:`CallMetrics`,
+                      called around every JSON/RPC request (default: none).
+        """
         self.target = target
         self.username = user
         self.password = pw
         self.sid = None
+        self.sid_expires = 0.0
+        self.session_timeout = session_timeout
+        self.sid_cache = SIDCache() if sid_cache is True else sid_cache
+        self.cache = ConfigCache() if cache is True else cache
+        self.validator = validator
+        self._sid_verified = False
         self.timeout = timeout
         self.verify = verify
-        self.upload_file_types = {"firmware", "bootlogo", "settings", "customer_settings", "cert", "wwan_update"}
-        self.download_file_types = {"diag.tar.gz", "settings.cf2"}
+        self.pool_maxsize = pool_maxsize
+        self.keepalive_expiry = keepalive_expiry
+        self.transport = transport
+        #: :class:`CallHooks` called around every JSON/RPC request; without
+        #: hooks, requests are not timed.
+        self.hooks = list(hooks or [])
+        self.upload_file_types = set(self.upload_file_types_default)
+        self.download_file_types = set(self.download_file_types_default)
+        self._session = None
+        self._last_used = 0.0
+        self._request_ids = itertools.count(1)
+        self._sid_lock = threading.Lock()
+        # the batch fallback and Fleet use the session from several threads
+        self._session_lock = threading.Lock()
+        # None until the first batch tells us whether the firmware accepts arrays
+        self.batch_supported = None
+        self._product_schema = None
+        # TableView objects following this device's table writes
+        self._table_views = weakref.WeakSet()
 
-    def get_sid(self):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def session(self):
         """
-        Authenticate and acquire a session ID (SID).
+        The keep-alive HTTP session shared by all requests to the device.
+
+        The session is created on first use. Connections that were idle for
+        longer than ``keepalive_expiry`` are dropped before the next request,
+        because NAT gateways on cellular links silently discard idle TCP
+        flows and a request on such a connection would hang until timeout.
+        Requests go through ``transport`` if one was given, otherwise through
+        an ``HTTPAdapter`` pooling up to ``pool_maxsize`` connections, which
+        records connect and TLS times for :attr:`hooks`.
+        """
+        with self._session_lock:
+            now = time.monotonic()
+            if (self._session is not None and self.keepalive_expiry is not None
+                    and now - self._last_used > self.keepalive_expiry):
+                self._session.close()
+                self._session = None
+            if self._session is None:
+                self._session = requests.Session()
+                self._session.verify = self.verify
+                adapter = self.transport or _TimedHTTPAdapter(
+                    pool_connections=1, pool_maxsize=self.pool_maxsize)
+                self._session.mount("https://", adapter)
+                self._session.mount("http://", adapter)
+            self._last_used = now
+            return self._session
+
+    def close(self):
+        """
+        Close all pooled connections to the device.
+
+        The session ID is kept, so the object can still be used afterwards;
+        a new connection is opened on the next request. With a SID cache, the
+        SID's current idle deadline is written back for the next process.
         """
-        auth_payload = {
+        if self.sid_cache is not None and self.sid and not self.sid_expired():
+            self.sid_cache.store(self.target, self.username, self.sid,
+                                 time.time() + self.sid_expires - time.monotonic())
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def _auth_payload(self):
+        params = {"user": self.username, "password": self.password}
+        if self.session_timeout:
+            params["timeout"] = self.session_timeout
+        return {
             "id": "req-1",
             "jsonrpc": "2.0",
             "method": "call",
-            "params": [
-                "00000000000000000000000000000000",
-                "session",
-                "create",
-                {"user": self.username, "password": self.password},
-            ],
+            "params": [self.NULL_SID, "session", "create", params],
         }
-        response = self.send_request(auth_payload)
-        try:
-            self.sid = response.get("result", [{}])[1].get("sid")
-            if not self.sid:
-                raise Exception("Failed to acquire SID. Check username/password.")
-        except:
-            raise Exception("Failed to acquire SID. Check username/password.")
+
+    def get_sid(self):
+        """
+        Authenticate and acquire a session ID (SID).
+        """
+        self.sid = self._login_sid(self.send_request(self._auth_payload()))
+        self._touch_sid()
+        self._sid_verified = True
+        if self.sid_cache is not None:
+            self.sid_cache.store(self.target, self.username, self.sid,
+                                 time.time() + (self.session_timeout or 600))
+
+    def ensure_sid(self, verified=False):
+        """
+        Acquire a new SID if there is none or its idle deadline has passed.
+
+        A SID taken from the SID cache is used optimistically: if the device
+        rejects it, :meth:`call` logs in and replays the call. Requests that
+        cannot be replayed cheaply (file transfers) pass ``verified=True`` to
+        check a cached SID with a small status query first.
+
+        :param verified: Make sure the device has accepted the SID.
+        """
+        if not self.sid or self.sid_expired():
+            with self._sid_lock:
+                if not self.sid or self.sid_expired():
+                    if not self._load_cached_sid():
+                        self.get_sid()
+        if verified and not self._sid_verified:
+            self.status("boot_finished")
+
+    def _load_cached_sid(self):
+        if self.sid_cache is None:
+            return False
+        entry = self.sid_cache.get(self.target, self.username)
+        if entry is None:
+            return False
+        self.sid, expires = entry
+        self.sid_expires = time.monotonic() + expires - time.time()
+        self._sid_verified = False
+        return True
+
+    def sid_expired(self):
+        """
+        Return True if the device has dropped the SID for inactivity.
+
+        The device restarts the idle timer on every call, so the deadline is
+        pushed forward after each successful request. A second of slack
+        covers the request latency.
+        """
+        return bool(self.session_timeout) and time.monotonic() > self.sid_expires - 1.0
+
+    def _touch_sid(self):
+        if self.session_timeout:
+            self.sid_expires = time.monotonic() + self.session_timeout
+
+    @staticmethod
+    def _login_sid(response):
+        """
+        Return the SID of a ``session.create`` response or raise :class:`AuthError`.
+        """
+        result = response.get("result") if isinstance(response, dict) else None
+        data = result[1] if isinstance(result, list) and len(result) > 1 else None
+        sid = data.get("sid") if isinstance(data, dict) else None
+        if not sid:
+            error = _device_error(response, "session.create")
+            raise AuthError("Failed to acquire SID. Check username/password.",
+                            error.code, "session.create", response)
+        return sid
+
+    @staticmethod
+    def _session_expired(response):
+        # rpcd answers an unknown or expired SID with "Session not found"
+        # or "Access denied", both decoded as SessionExpired
+        error = response.get("error") if isinstance(response, dict) else None
+        return bool(error) and _RPC_ERRORS.get(error.get("code")) is SessionExpired
 
     def set_target(self, target):
         """
@@ -88,70 +482,483 @@ class AdstecJSONRPCDevice:
     def call(self, obj, method, **params):
         """
         Make a JSON/RPC call.
+
+        If the device reports that the SID has expired, a new SID is acquired
+        and the call is sent once more. This is safe because reads are
+        idempotent and writes only take effect with ``sess_commit``.
+
+        With a :attr:`validator`, invalid configuration values raise
+        ValueError before anything is sent.
         """
-        if not self.sid:
+        if self.validator is not None and obj == "config":
+            self.validator.check(method, params)
+        self.ensure_sid()
+
+        response = self.send_request(self._envelope(obj, method, params))
+        if self._session_expired(response):
             self.get_sid()
+            response = self.send_request(self._envelope(obj, method, params))
+        self._touch_sid()
+        self._sid_verified = True
+        result = self._unpack(response, f"{obj}.{method}")
+        if obj == "config":
+            self._track(method, params)
+        return result
 
-        payload = {
-            "id": "req-1",
+    def _track(self, method, params):
+        """
+        Let the read cache and table views follow a successful ``config`` call.
+        """
+        if self.cache is not None:
+            self.cache.track(method, params)
+        for view in list(self._table_views):
+            view.track(method, params)
+
+    def _envelope(self, obj, method, params):
+        """
+        Build a JSON/RPC request envelope with a request id unique to this device.
+        """
+        return {
+            "id": f"req-{next(self._request_ids)}",
             "jsonrpc": "2.0",
             "method": "call",
             "params": [self.sid, obj, method, params],
         }
-        response = self.send_request(payload)
-        result = response.get("result", [])
-        if result and result[0] != 0:
-            raise Exception(f"API call error: {response}")
+
+    @staticmethod
+    def _unpack(response, method=None):
+        """
+        Return the result data of a JSON/RPC response or raise the matching
+        :class:`DeviceError` on error.
+        """
+        result = response.get("result", []) if "error" not in response else None
+        if result is None or result and result[0] != 0:
+            raise _device_error(response, method)
         return result[1] if len(result) > 1 else {}
 
+    def batch(self):
+        """
+        Collect several calls and send them in a single HTTP round trip.
+
+        Calls on the returned :class:`Batch` return futures that are resolved
+        when the ``with`` block exits::
+
+            with dev.batch() as b:
+                version = b.status("imageversion")
+                lan = b.config_get(["lan_ipaddr"])
+            print(version.result(), lan.result())
+
+        :return: A new :class:`Batch` bound to this device.
+        """
+        return Batch(self)
+
+    def send_batch(self, payloads):
+        """
+        Send several JSON/RPC request envelopes and return their responses.
+
+        The envelopes are sent as one JSON-RPC 2.0 array. If the firmware
+        rejects arrays (HTTP 400, or a single error envelope in reply), they
+        are sent as single requests over the pooled connections instead, and
+        later batches skip the array attempt. Other errors, such as a busy
+        device, are raised and do not change :attr:`batch_supported`.
+
+        :param payloads: List of request envelopes with unique ids.
+        :return: List of response envelopes in the order of ``payloads``.
+        """
+        if not payloads:
+            return []
+        if self.batch_supported is not False:
+            try:
+                responses = self.send_request(payloads)
+            except (AuthError, DeviceBusy, TransportError):
+                raise
+            except DeviceError as e:
+                # HTTP 400: the device rejected the array itself
+                if e.code != 400:
+                    raise
+                responses = None
+            if isinstance(responses, list):
+                self.batch_supported = True
+                by_id = {r.get("id"): r for r in responses if isinstance(r, dict)}
+                missing = {"error": {"code": -32603, "message": "No response in batch"}}
+                return [by_id.get(p["id"], missing) for p in payloads]
+            # older firmware answers an array with a single error envelope
+            if responses is not None and not (isinstance(responses, dict) and "error" in responses):
+                raise TransportError("Unexpected response to a batch request", method="batch")
+            self.batch_supported = False
+        with ThreadPoolExecutor(max_workers=min(self.pool_maxsize, len(payloads))) as executor:
+            return list(executor.map(self._send_single, payloads))
+
+    def _send_single(self, payload):
+        try:
+            return self.send_request(payload)
+        except DeviceError as e:
+            return {"id": payload["id"], "error": {"code": -32603, "message": str(e)}, "exception": e}
+
     def send_request(self, payload):
         """
         Send a JSON/RPC request to the target device.
+
+        :raises TransportError: The device was not reached, answered with an
+                                HTTP 5xx status or sent no JSON.
         """
-        url = f"https://{self.target}/rpc"
-        response = requests.post(
-            url,
-            json=payload,
-            timeout=self.timeout,
-            verify=self.verify,
-            headers={"Content-Type": "application/json"},
-        )
-        response.raise_for_status()
-        return response.json()
+        if self.hooks:
+            return self._send_hooked(payload)
+        return self._decode(self._post(payload))
+
+    def _post(self, payload):
+        """
+        POST a request envelope (or a list of them) to ``/rpc``.
+        """
+        try:
+            return self.session.post(
+                f"https://{self.target}/rpc",
+                json=payload,
+                timeout=self.timeout,
+                verify=self.verify,
+                headers={"Content-Type": "application/json"},
+            )
+        except requests.exceptions.RequestException as e:
+            raise _transport_error(e) from e
+
+    @staticmethod
+    def _decode(response):
+        """
+        Check the HTTP status of a ``/rpc`` response and decode its JSON.
+        """
+        _raise_for_status(response)
+        try:
+            return response.json()
+        except ValueError as e:
+            raise TransportError("Invalid JSON in response", response.status_code) from e
+
+    def _send_hooked(self, payload):
+        """
+        :meth:`send_request` with timing, calling :attr:`hooks` once per call;
+        the calls of a batch share its timing, see :class:`CallHooks`.
+        """
+        calls = self._hooks_before(payload)
+        _connect_times.connect = _connect_times.tls = None
+        start = time.perf_counter()
+        response = None
+        decode = None
+        try:
+            response = self._post(payload)
+            decoding = time.perf_counter()
+            data = self._decode(response)
+            decode = time.perf_counter() - decoding
+        except DeviceError as e:
+            self._hooks_after(calls, payload, self._timing(start, response, decode), error=e)
+            raise
+        self._hooks_after(calls, payload, self._timing(start, response, decode), data)
+        return data
+
+    def _hooks_before(self, payload):
+        """
+        Call ``before_request`` of the hooks for every call of a request
+        envelope (or a list of them) and return the calls.
+        """
+        envelopes = payload if isinstance(payload, list) else [payload]
+        calls = [envelope["params"][1:] for envelope in envelopes]
+        for obj, method, params in calls:
+            for hook in self.hooks:
+                hook.before_request(self, obj, method, params)
+        return calls
+
+    def _hooks_after(self, calls, payload, timing, data=None, error=None):
+        """
+        Report the outcome of a request to the hooks, one call at a time:
+        ``on_error`` with ``error`` or ``after_response`` with the call's
+        envelope out of the decoded ``data``.
+        """
+        timing = self._share(timing, len(calls))
+        if error is not None:
+            for obj, method, params in calls:
+                for hook in self.hooks:
+                    hook.on_error(self, obj, method, params, error, timing)
+            return
+        if isinstance(payload, list):
+            by_id = {r.get("id"): r for r in data if isinstance(r, dict)} \
+                if isinstance(data, list) else {}
+            # an array rejected with a single envelope: every call gets that
+            responses = [by_id.get(envelope["id"], data if isinstance(data, dict) else None)
+                         for envelope in payload]
+        else:
+            responses = [data]
+        for (obj, method, params), result in zip(calls, responses):
+            for hook in self.hooks:
+                hook.after_response(self, obj, method, params, result, timing)
+
+    @staticmethod
+    def _share(timing, count):
+        """
+        Split the timing of a batch evenly over its ``count`` calls, so that
+        the sums over all calls stay those of the requests.
+        """
+        if count == 1:
+            return timing
+        return CallTiming(*(None if value is None else value / count for value in timing[:-1]),
+                          timing.status)
 
-    def upload_file(self, type, filename):
+    @staticmethod
+    def _timing(start, response, decode):
+        total = time.perf_counter() - start
+        connect, tls = _connect_times.connect, _connect_times.tls
+        if response is None:
+            return CallTiming(total, connect, tls, None, None, None, None, None)
+        body = response.request.body if response.request is not None else None
+        server = response.elapsed.total_seconds() - (connect or 0.0) - (tls or 0.0)
+        return CallTiming(total, connect, tls, max(server, 0.0), decode,
+                          len(body) if body is not None else None,
+                          len(response.content), response.status_code)
+
+    def upload_file(self, type, filename, progress=None, retries=2, backoff=2.0, min_rate=8192):
+        """
+        Upload a file to the device via upload.php.
+
+        The multipart body is streamed from disk, so even large firmware
+        images are never held in memory. On connection errors, timeouts and
+        5xx responses the upload is restarted from the beginning.
+
+        :param type: File type, one of ``upload_file_types``.
+        :param filename: Path of the file to upload.
+        :param progress: Optional callback ``progress(bytes_sent, bytes_total)``.
+        :param retries: Number of restarts after a transient failure (default: 2).
+        :param backoff: Delay in seconds before the first restart, doubled for
+                        each further one (default: 2.0).
+        :param min_rate: Slowest acceptable throughput in bytes per second. The
+                         upload is aborted when it takes longer than
+                         ``timeout + size / min_rate`` (default: 8192).
+        :return: :class:`UploadResult` of the successful attempt.
+        """
         if type not in self.upload_file_types:
             raise Exception(f"Invalid file type: {type}. Must be one of: {self.upload_file_types}.")
 
         if not os.path.exists(filename):
             raise Exception(f"Error: File '{filename}' does not exist.")
 
-        if not self.sid:
-            self.get_sid()
-        try:
-            url = f"https://{self.target}/priv/script/php_rpc/upload.php"
-            files = {type: open(filename, 'rb')}
-            cookies = {"ads_sid": self.sid}
-            response = requests.post(url, files=files, cookies=cookies, verify=self.verify)
-            return response.text
-        except Exception as e:
-            print(f"Error: {e}")
-        finally:
-            files[type].close()
+        url = f"https://{self.target}/priv/script/php_rpc/upload.php"
+        start = time.monotonic()
+        attempts = 0
+        while True:
+            attempts += 1
+            self.ensure_sid(verified=True)
+            body = MultipartFileEncoder(type, filename, progress=progress)
+            if min_rate:
+                body.deadline = time.monotonic() + self.timeout + len(body) / min_rate
+            try:
+                with body:
+                    response = self.session.post(
+                        url, data=body, cookies={"ads_sid": self.sid},
+                        headers={"Content-Type": body.content_type},
+                        timeout=self.timeout, verify=self.verify)
+                if response.status_code < 500:
+                    break
+                error = _http_error(response, "upload.php")
+            except self.transient_errors as e:
+                error = e
+            if attempts > retries:
+                if isinstance(error, DeviceError):
+                    raise error
+                raise _transport_error(error, "upload.php") from error
+            time.sleep(backoff * 2 ** (attempts - 1))
+        _raise_for_status(response, "upload.php")
+        self._touch_sid()
+        return UploadResult(response.status_code, response.text, body.bytes_sent,
+                            time.monotonic() - start, attempts)
+
+    def download_file(self, filename, output_filename, chunk_size=65536, progress=None,
+                      checksum=False, retries=2, backoff=2.0):
+        """
+        Download a file from the device via download.php.
+
+        The file is written to ``output_filename + ".part"`` and renamed when
+        complete, so an interrupted download never leaves a truncated file
+        under the final name. After a connection error or timeout the
+        download continues where it stopped with an HTTP Range request if the
+        device supports it, and starts over otherwise.
 
-    def download_file(self, filename, output_filename):
+        :param filename: File to download, one of ``download_file_types``.
+        :param output_filename: Local path to write the file to.
+        :param chunk_size: Bytes read from the connection at a time (default: 65536).
+        :param progress: Optional callback ``progress(bytes_received, bytes_total)``;
+                         ``bytes_total`` is None if the device sends no length.
+        :param checksum: Compute the SHA-256 of the file while downloading.
+        :param retries: Number of resumes after a transient failure (default: 2).
+        :param backoff: Delay in seconds before the first resume, doubled for
+                        each further one (default: 2.0).
+        :return: :class:`DownloadResult`.
+        """
         if filename not in self.download_file_types:
             raise Exception(f"Invalid file type: {filename}. Must be one of: {self.download_file_types}.")
-        if not self.sid:
-            self.get_sid()
         url = f"https://{self.target}/priv/script/php_rpc/download.php?file={quote(filename)}"
-        cookies = {"ads_sid": self.sid}
-        response = requests.get(url, cookies=cookies, verify=self.verify, stream=True)
-        if not response.ok:
-            raise Exception(f"HTTP error! Status: {response.status_code}")
-        with open(output_filename, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+        part = output_filename + ".part"
+        start = time.monotonic()
+        attempts = 0
+        received = 0
+        total = None
+        validator = None
+        digest = hashlib.sha256() if checksum else None
+        with open(part, "wb") as f:
+            while True:
+                attempts += 1
+                self.ensure_sid(verified=True)
+                headers = {}
+                if received:
+                    headers["Range"] = f"bytes={received}-"
+                    if validator:
+                        headers["If-Range"] = validator
+                try:
+                    response = self.session.get(
+                        url, cookies={"ads_sid": self.sid}, headers=headers,
+                        timeout=self.timeout, verify=self.verify, stream=True)
+                    with response:
+                        _raise_for_status(response, "download.php")
+                        if response.status_code != 206 and received:
+                            # no range support or the file changed: start over
+                            f.seek(0)
+                            f.truncate()
+                            received = 0
+                            digest = hashlib.sha256() if checksum else None
+                        if not received:
+                            validator = response.headers.get("ETag") or response.headers.get("Last-Modified")
+                            length = response.headers.get("Content-Length")
+                            total = int(length) if length is not None else None
+                        for chunk in response.iter_content(chunk_size=chunk_size):
+                            f.write(chunk)
+                            received += len(chunk)
+                            if digest is not None:
+                                digest.update(chunk)
+                            if progress is not None:
+                                progress(received, total)
+                    if total is not None and received < total:
+                        raise requests.exceptions.ChunkedEncodingError(
+                            f"Connection closed after {received} of {total} bytes")
+                    break
+                except self.transient_errors as e:
+                    if attempts > retries:
+                        f.close()
+                        os.remove(part)
+                        if isinstance(e, DeviceError):
+                            raise
+                        raise _transport_error(e, "download.php") from e
+                    time.sleep(backoff * 2 ** (attempts - 1))
+                except Exception:
+                    f.close()
+                    os.remove(part)
+                    raise
+        os.replace(part, output_filename)
+        self._touch_sid()
+        return DownloadResult(output_filename, received,
+                              digest.hexdigest() if digest is not None else None,
+                              time.monotonic() - start, attempts)
+
+    def file_write(self, path, src, progress=None):
+        """
+        Upload a local file with the ``file.write`` RPC.
+
+        The JSON request is streamed: the file is Base64-encoded piecewise
+        while it is sent, so neither the file nor its (33% larger) Base64 form
+        is ever held in memory as a whole.
+
+        :param path: Destination on the device, e.g. ``/tmp/upsettigs`` or ``/tmp/upcerts``.
+        :param src: Path of the local file.
+        :param progress: Optional callback ``progress(bytes_sent, bytes_total)``
+                         counting request bytes.
+        :return: :class:`FileTransferResult` with size and SHA-256 of the data sent.
+        """
+        url = f"https://{self.target}/rpc"
+        start = time.monotonic()
+        self.ensure_sid()
+        for attempt in (1, 2):
+            # the data value is spliced in between the two halves of the envelope
+            marker = os.urandom(16).hex()
+            envelope = json.dumps(self._envelope("file", "write", {"path": path, "data": marker}))
+            head, tail = (part.encode() for part in envelope.split(marker))
+            reader = Base64Reader(open(src, "rb"))
+            length = len(head) + Base64Reader.encoded_length(os.path.getsize(src)) + len(tail)
+            with StreamingBody([io.BytesIO(head), reader, io.BytesIO(tail)], length, progress) as body:
+                try:
+                    response = self.session.post(
+                        url, data=body, timeout=self.timeout, verify=self.verify,
+                        headers={"Content-Type": "application/json"})
+                except requests.exceptions.RequestException as e:
+                    raise _transport_error(e, "file.write") from e
+            _raise_for_status(response, "file.write")
+            try:
+                result = response.json()
+            except ValueError as e:
+                raise TransportError("Invalid JSON in response", response.status_code,
+                                     "file.write") from e
+            if not self._session_expired(result) or attempt == 2:
+                break
+            self.get_sid()
+        self._touch_sid()
+        self._unpack(result, "file.write")
+        return FileTransferResult(path, reader.size, reader.digest.hexdigest(),
+                                  time.monotonic() - start)
+
+    def file_read(self, path, dst, delete=False, expected_sha256=None, chunk_size=65536):
+        """
+        Download a file with the ``file.read`` RPC.
+
+        The response is parsed while it arrives and the Base64 data is
+        decoded straight into ``dst + ".part"``, which is renamed to ``dst``
+        when complete.
+
+        :param path: File on the device, e.g. ``/tmp/root/settings.cf2``.
+        :param dst: Local path to write the file to.
+        :param delete: Delete the file on the device afterwards with
+                       ``file.delete`` to free its RAM.
+        :param expected_sha256: Raise :class:`DeviceError` if the received data
+                                has another SHA-256.
+        :param chunk_size: Bytes read from the connection at a time (default: 65536).
+        :return: :class:`FileTransferResult` with size and SHA-256 of the data received.
+        """
+        url = f"https://{self.target}/rpc"
+        part = dst + ".part"
+        start = time.monotonic()
+        self.ensure_sid()
+        try:
+            for attempt in (1, 2):
+                with open(part, "wb") as f:
+                    decoder = Base64Decoder("data", f)
+                    response = self.session.post(
+                        url, json=self._envelope("file", "read", {"path": path}),
+                        timeout=self.timeout, verify=self.verify, stream=True,
+                        headers={"Content-Type": "application/json"})
+                    with response:
+                        _raise_for_status(response, "file.read")
+                        for chunk in response.iter_content(chunk_size=chunk_size):
+                            decoder.feed(chunk)
+                    result = decoder.close()
+                if not self._session_expired(result) or attempt == 2:
+                    break
+                self.get_sid()
+            self._touch_sid()
+            self._unpack(result, "file.read")
+            sha256 = decoder.digest.hexdigest()
+            if expected_sha256 is not None and sha256 != expected_sha256.lower():
+                raise DeviceError(f"SHA-256 mismatch for {path}: got {sha256}, "
+                                  f"expected {expected_sha256}", method="file.read")
+        except Exception as e:
+            os.remove(part)
+            if isinstance(e, requests.exceptions.RequestException):
+                raise _transport_error(e, "file.read") from e
+            raise
+        os.replace(part, dst)
+        if delete:
+            self.call("file", "delete", path=path)
+        return FileTransferResult(path, decoder.size, sha256, time.monotonic() - start)
+
+    def check_host(self, timeout=5):
+        """
+        Check if the device is online, reusing the pooled connection.
+
+        :param timeout: Request timeout in seconds (default: 5).
+        :return: A tuple (is_online, info), see :func:`check_host`.
+        """
+        return check_host(self.target, timeout=timeout, session=self.session)
 
     def sess_start(self):
         """
@@ -169,12 +976,20 @@ class AdstecJSONRPCDevice:
         """
         Get a row from a table.
         """
-        return self.call(
+        if self.cache is not None:
+            key = ("table", tablename, condition_key, json.dumps(condition_value))
+            found, value = self.cache.get(key)
+            if found:
+                return value
+        result = self.call(
             "config",
             "table_get",
             tablename=tablename,
             condition={condition_key: condition_value},
         )
+        if self.cache is not None:
+            self.cache.put(key, result)
+        return result
 
     def table_up(self, tablename, cfg_session_id, condition, values):
         """
@@ -213,6 +1028,84 @@ class AdstecJSONRPCDevice:
             condition=condition,
         )
 
+    def table_bulk(self, tablename, inserts=(), updates=(), deletes=(), flush=False,
+                   max_bytes=512 * 1024, split=False):
+        """
+        Insert many rows of a table with one ``import_config`` call instead of
+        one ``table_set`` per row, after deleting and updating rows::
+
+            dev.table_bulk("forwarding",
+                           inserts=rules,                                   # 500 rows, one request
+                           updates=[({"fwcomment": "RDP"}, {"fwenabled": "disabled"})],
+                           deletes=[{"fwcomment": "old rule"}])
+
+        Deletes and updates are sent as ``table_del`` and ``table_up`` calls
+        in one configuration session, which is committed before the rows are
+        inserted. With ``flush`` the table is emptied (``tableflush``) in the
+        same ``import_config`` call that inserts the rows.
+
+        Rows to insert may be dictionaries or lists in schema column order,
+        like :meth:`table_insert`; lists are turned into dictionaries with the
+        column names of the product schema. A payload larger than
+        ``max_bytes`` raises ValueError unless ``split`` is set; it is then
+        sent as several ``import_config`` calls, each applied on its own.
+
+        :param tablename: Name of the table.
+        :param inserts: Rows to insert.
+        :param updates: (condition, values) tuples or dicts with ``condition``
+                        and ``values``, as for :meth:`table_up`.
+        :param deletes: Conditions of rows to delete, as for :meth:`table_del`.
+        :param flush: Delete all rows of the table before inserting.
+        :param max_bytes: Upper bound of the JSON size of one payload
+                          (default: 512 KiB).
+        :param split: Split larger payloads instead of raising ValueError.
+        :return: List of results: the ``sess_commit`` result if rows were
+                 deleted or updated, then one per ``import_config`` call.
+        :raises ValueError: If the rows do not fit into ``max_bytes`` and
+                            ``split`` is not set.
+        """
+        rows, columns = [], None
+        for row in inserts:
+            if not isinstance(row, dict):
+                if columns is None:
+                    columns = self.product_schema().columns(tablename)
+                if len(row) != len(columns):
+                    raise ValueError(f"Row for {tablename!r} has {len(row)} values, "
+                                     f"expected {len(columns)}: {', '.join(columns)}")
+                row = dict(zip(columns, row))
+            rows.append(row)
+
+        chunks, chunk, size = [], [], 0
+        for row in rows:
+            row_size = len(json.dumps(row)) + 2
+            if chunk and size + row_size > max_bytes:
+                if not split:
+                    raise ValueError(f"{len(rows)} rows for {tablename!r} exceed max_bytes={max_bytes}; "
+                                     f"pass split=True to send them in several requests")
+                chunks.append(chunk)
+                chunk, size = [], 0
+            chunk.append(row)
+            size += row_size
+        if chunk or flush:
+            chunks.append(chunk)
+
+        results = []
+        updates = [(update["condition"], update["values"]) if isinstance(update, dict) else update
+                   for update in updates]
+        if deletes or updates:
+            # deletes do not depend on each other; updates may overlap and keep their order
+            results.append(self._session_calls(
+                [("table_del", {"tablename": tablename, "condition": condition})
+                 for condition in deletes],
+                [("table_up", {"tablename": tablename, "condition": condition, "values": values})
+                 for condition, values in updates]))
+        for index, chunk in enumerate(chunks):
+            jsondata = {"tableinsert": [{"tablename": tablename, "data": chunk}]}
+            if flush and index == 0:
+                jsondata["tableflush"] = [{"tablename": tablename}]
+            results.append(self.call("config", "import_config", jsondata=jsondata))
+        return results
+
     def config_get(self, keys):
         """
         Get the values of configuration variables.
@@ -220,7 +1113,21 @@ class AdstecJSONRPCDevice:
         :param keys: List of configuration keys to retrieve.
         :return: Dictionary of key-value pairs.
         """
-        return self.call("config", "get", keys=keys)
+        if self.cache is None:
+            return self.call("config", "get", keys=keys)
+        values, missing = {}, []
+        for key in keys:
+            found, value = self.cache.get(("config", key))
+            if found:
+                values[key] = value
+            elif key not in missing:
+                missing.append(key)
+        if missing:
+            for item in self.call("config", "get", keys=missing).get("result", []):
+                for key, value in item.items():
+                    values[key] = value
+                    self.cache.put(("config", key), value)
+        return {"result": [{key: values[key]} for key in keys if key in values]}
 
     def config_set(self, cfg_session_id, values):
         """
@@ -247,8 +1154,10 @@ class AdstecJSONRPCDevice:
     def config_set_commit_with_ip_change(self, values, new_ip):
         try:
             self.config_set_commit(values)
-        except requests.exceptions.Timeout:
-            # we expect this exception because the ip change
+        except TransportError as e:
+            # we expect a timeout because the ip change
+            if not e.timeout:
+                raise
             wait_for_host_is_online(new_ip)
             self.set_target(new_ip)
 
@@ -269,6 +1178,123 @@ class AdstecJSONRPCDevice:
             condition=condition,
         )
 
+    def product_schema(self, registry=None):
+        """
+        Return the :class:`ProductSchema` of the device, see
+        :meth:`SchemaRegistry.for_device`. It is looked up once per object.
+
+        :param registry: :class:`SchemaRegistry` to use (default: the shared one).
+        """
+        if self._product_schema is None:
+            self._product_schema = (registry or SchemaRegistry.default()).for_device(self)
+        return self._product_schema
+
+    def export_tables(self, tablenames):
+        """
+        Read complete tables with a single ``export_pages`` call. The pages
+        holding the tables are taken from the product schema.
+
+        :param tablenames: List of table names.
+        :return: Dictionary of table name and list of rows (dictionaries).
+        """
+        schema = self.product_schema()
+        pages = []
+        for name in tablenames:
+            if name not in schema.tables:
+                raise ValueError(f"Table {name!r} is not in the {schema.product} schema")
+            page = schema.tables[name].get("x-page")
+            if page not in pages:
+                pages.append(page)
+        export = self.call("config", "export_pages", pages=pages)
+        tables = _import_tables(export.get("jsondata", export).get("tableinsert"), "data")
+        return {name: tables.get(name, []) for name in tablenames}
+
+    def config_diff(self, desired, keys=None, ordered=True):
+        """
+        Compare a desired configuration with the device, see :func:`diff_config`.
+        Reads the variables with one ``get`` and the tables with one
+        ``export_pages`` call, always from the device, not from :attr:`cache`.
+
+        :param desired: Dictionary with ``configdata`` and ``tables``.
+        :param keys: Dictionary of table name and key column(s).
+        :param ordered: Tables whose row order is kept, see :func:`diff_config`.
+        :return: :class:`ConfigDelta`.
+        """
+        configdata = desired.get("configdata") or {}
+        tables = _import_tables(desired.get("tables") or desired.get("tableinsert"), "data")
+        current = {"configdata": {}, "tables": {}}
+        if configdata:
+            for item in self.call("config", "get", keys=list(configdata)).get("result", []):
+                current["configdata"].update(item)
+        columns = {}
+        if tables:
+            current["tables"] = self.export_tables(list(tables))
+            schema = self.product_schema()
+            columns = {name: schema.columns(name) for name in tables}
+        return diff_config(current, {"configdata": configdata, "tables": tables},
+                           keys=keys, columns=columns, ordered=ordered)
+
+    def config_apply(self, desired, keys=None, ordered=True):
+        """
+        Bring the device to a desired configuration, sending only what
+        differs: changed variables in one ``set``, and a ``table_del``,
+        ``table_up`` or ``table_set`` per changed row, all in one
+        configuration session and one batch::
+
+            delta = dev.config_apply({
+                "configdata": {"ntp_service": "enabled"},
+                "tables": {"serv_Protocols": rules},     # the complete table
+            })
+            print(delta.operations, "operations sent")
+
+        Tables listed in ``desired`` are replaced: device rows whose key is
+        not among the desired rows are deleted. Variables not listed are left
+        alone. Nothing is sent when the device already matches. Inserted rows
+        are sent one by one after the other operations, so they end up on the
+        device in the desired order.
+
+        :param desired: Dictionary with ``configdata`` and ``tables``, see
+                        :func:`diff_config`.
+        :param keys: Dictionary of table name and key column(s).
+        :param ordered: Tables whose row order is kept, see :func:`diff_config`.
+        :return: The :class:`ConfigDelta` that was applied.
+        """
+        delta = self.config_diff(desired, keys, ordered)
+        if not delta.operations:
+            return delta
+        calls = delta.calls()
+        # deletes and updates touch different rows and may run in any order,
+        # but table_set appends: inserts go one at a time, in order
+        self._session_calls([call for call in calls if call[0] != "table_set"],
+                            [call for call in calls if call[0] == "table_set"])
+        return delta
+
+    def _session_calls(self, batched, serial=()):
+        """
+        Send ``config`` calls in one configuration session and commit it.
+        ``batched`` calls go in one batch and must not depend on each other's
+        order; ``serial`` calls follow one at a time. The session is aborted
+        if a call fails.
+
+        :param batched: List of (method, params) without ``cfg_session_id``.
+        :param serial: List of (method, params) sent in this order.
+        :return: Result of ``sess_commit``.
+        """
+        cfg_session_id = self.sess_start()
+        try:
+            if batched:
+                with self.batch() as b:
+                    futures = [b.call("config", method, cfg_session_id=cfg_session_id, **params)
+                               for method, params in batched]
+                for future in futures:
+                    future.result()
+            for method, params in serial:
+                self.call("config", method, cfg_session_id=cfg_session_id, **params)
+        except Exception:
+            self.call("config", "sess_abort", cfg_session_id=cfg_session_id)
+            raise
+        return self.sess_commit(cfg_session_id)
+
     def status(self, property, param1="", param2=""):
         """
         Get system status information for a specific property with optional parameters.
@@ -278,19 +1304,33 @@ class AdstecJSONRPCDevice:
         :param param2: Second optional parameter (default: "").
         :return: The status value for the specified property.
         """
+        if self.cache is not None:
+            key = ("status", property, param1, param2)
+            found, value = self.cache.get(key)
+            if found:
+                return value
         response = self.call(
             "status",
             "get",
             function=property,
             parameters=[param1, param2],
         )
-        return response.get(property, None)
+        value = response.get(property, None)
+        if self.cache is not None:
+            self.cache.put(key, value)
+        return value
 
     def logout(self):
         response = self.call(
             "session",
             "destroy",
         )
+        if self.sid_cache is not None:
+            self.sid_cache.remove(self.target, self.username)
+        if self.cache is not None:
+            self.cache.clear()
+        self.sid = None
+        self.sid_expires = 0.0
         return response
 
     def convert_to_ifname(self, interfaces_arr):
@@ -313,83 +1353,4026 @@ class AdstecJSONRPCDevice:
 
         return interfaces_str
 
-def check_host(host, timeout=5):
-    """
-    Check if a host is online by making an HTTPS request.
+UploadResult = collections.namedtuple(
+    "UploadResult", ["status_code", "text", "bytes_sent", "elapsed", "attempts"])
+UploadResult.__doc__ = """
+Result of :meth:`AdstecJSONRPCDevice.upload_file`: HTTP status and body of
+the device's answer, request body size, total seconds and number of attempts.
+"""
+
+
+DownloadResult = collections.namedtuple(
+    "DownloadResult", ["filename", "size", "sha256", "elapsed", "attempts"])
+DownloadResult.__doc__ = """
+Result of :meth:`AdstecJSONRPCDevice.download_file`: local file name, size
+in bytes, SHA-256 hex digest (None unless requested), total seconds and
+number of attempts.
+"""
 
-    :param host: Hostname or IP address.
-    :param timeout: Request timeout in seconds (default: 5).
-    :return: A tuple (is_online, info).
-             is_online: Boolean indicating if the host is reachable.
-             info: Status code if online, or error message if offline.
-    """
-    url = f"https://{host}/"
-    try:
-        # We use verify=False because the device might have a self-signed certificate
-        response = requests.get(url, timeout=timeout, verify=False)
-        return True, response.status_code
-    except requests.exceptions.RequestException as e:
-        return False, str(e)
+
+FileTransferResult = collections.namedtuple(
+    "FileTransferResult", ["path", "size", "sha256", "elapsed"])
+FileTransferResult.__doc__ = """
+Result of :meth:`AdstecJSONRPCDevice.file_write` and
+:meth:`AdstecJSONRPCDevice.file_read`: device path, size in bytes and
+SHA-256 hex digest of the file data, and total seconds.
+"""
 
 
-def wait_for_reboot(host, username, password, check_interval=3):
+class StreamingBody:
     """
-    Wait for a device to reboot and finish its boot process.
+    File-like request body assembled from several file-like parts.
 
-    :param host: Hostname or IP address of the device.
-    :param username: Username for authentication.
-    :param password: Password for authentication.
-    :param check_interval: Time to wait between checks in seconds (default: 3).
-    :return: An instance of AdstecJSONRPCDevice once the device is ready.
+    The body knows its length, so requests sends it with a Content-Length
+    header and reads it piecewise instead of building it in memory.
     """
-    previous_state = None
-    while True:
-        is_online, info = check_host(host)
-        if previous_state is None:
-            status = "ONLINE" if is_online else "OFFLINE"
-            print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Initial state: {status}")
-            if is_online:
-                print(f"  Status code: {info}")
-            else:
-                print(f"  Error: {info}")
-        elif previous_state != is_online:
-            if is_online:
-                print(f"\n[{time.strftime('%Y-%m-%d %H:%M:%S')}] ✓ Host came ONLINE")
-                while True:
-                    dev = AdstecJSONRPCDevice(host, username, password)
-                    try:
-                        boot_finished = dev.status("boot_finished")
-                        if boot_finished == "yes":
-                            return dev
-                        else:
-                            print("Boot in progress, waiting for boot_finished")
-                    except Exception as e:
-                        print(f"Error checking boot status: {e}")
-                    time.sleep(1)
-            else:
-                print(f"\n[{time.strftime('%Y-%m-%d %H:%M:%S')}] ✗ Host went OFFLINE")
 
-        previous_state = is_online
-        time.sleep(check_interval)
+    def __init__(self, parts, length, progress=None, deadline=None):
+        """
+        :param parts: File-like objects read one after the other.
+        :param length: Total number of bytes the parts yield.
+        :param progress: Optional callback ``progress(bytes_sent, bytes_total)``.
+        :param deadline: ``time.monotonic()`` value after which reading raises
+                         TimeoutError, or None.
+        """
+        self._parts = list(parts)
+        self._length = length
+        self.progress = progress
+        self.deadline = deadline
+        self.bytes_sent = 0
 
+    def __len__(self):
+        return self._length
 
-def wait_for_host_is_online(host, timeout=300, interval=5):
-    """
-    Wait for a host to become online by checking its HTTPS URL.
+    def __enter__(self):
+        return self
 
-    :param host: Hostname or IP address.
-    :param timeout: Maximum time to wait in seconds (default: 300).
-    :param interval: Time to wait between checks in seconds (default: 5).
-    """
-    start_time = time.time()
-    print(f"Waiting for {host} to be online...")
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
-    while time.time() - start_time < timeout:
-        is_online, info = check_host(host)
+    def read(self, size=-1):
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise TimeoutError("Upload is slower than the minimum transfer rate")
+        out = b""
+        while self._parts and (size is None or size < 0 or len(out) < size):
+            chunk = self._parts[0].read(-1 if size is None or size < 0 else size - len(out))
+            if not chunk:
+                self._parts.pop(0).close()
+                continue
+            out += chunk
+        self.bytes_sent += len(out)
+        if self.progress is not None and out:
+            self.progress(self.bytes_sent, self._length)
+        return out
+
+    def close(self):
+        for part in self._parts:
+            part.close()
+        self._parts = []
+
+
+class MultipartFileEncoder(StreamingBody):
+    """
+    Streaming ``multipart/form-data`` body with a single file field.
+    """
+
+    def __init__(self, field, filename, progress=None, deadline=None):
+        """
+        :param field: Form field name of the file.
+        :param filename: Path of the file to send.
+        :param progress: Optional callback ``progress(bytes_sent, bytes_total)``.
+        :param deadline: ``time.monotonic()`` value after which reading raises
+                         TimeoutError, or None.
+        """
+        boundary = os.urandom(16).hex()
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        head = (f'--{boundary}\r\n'
+                f'Content-Disposition: form-data; name="{field}"; '
+                f'filename="{os.path.basename(filename)}"\r\n'
+                f'Content-Type: application/octet-stream\r\n\r\n').encode()
+        tail = f"\r\n--{boundary}--\r\n".encode()
+        length = len(head) + os.path.getsize(filename) + len(tail)
+        super().__init__([io.BytesIO(head), open(filename, "rb"), io.BytesIO(tail)],
+                         length, progress, deadline)
+
+
+class Base64Reader:
+    """
+    File-like view of a binary file as its Base64 encoding.
+
+    Reads are aligned to 3-byte groups, so the concatenated output is the
+    Base64 encoding of the whole file. Size and SHA-256 of the raw data are
+    accumulated on the way.
+    """
+
+    def __init__(self, fileobj):
+        self._file = fileobj
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    @staticmethod
+    def encoded_length(size):
+        return (size + 2) // 3 * 4
+
+    def read(self, size=-1):
+        data = self._file.read(-1 if size is None or size < 0 else max(3, size // 4 * 3))
+        self.digest.update(data)
+        self.size += len(data)
+        return base64.b64encode(data)
+
+    def close(self):
+        self._file.close()
+
+
+class Base64Decoder:
+    """
+    Incremental decoder for the Base64 string value of one field in a JSON
+    document that arrives in chunks.
+
+    Decoded bytes go to ``fileobj`` as soon as whole 4-character groups are
+    available; the rest of the document (with the field value left empty)
+    is kept in ``document`` for regular JSON parsing.
+    """
+
+    def __init__(self, field, fileobj):
+        self._marker = re.compile(rb'"' + re.escape(field.encode()) + rb'"\s*:\s*"')
+        self._file = fileobj
+        self._pending = b""
+        self._state = "head"
+        self.document = b""
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def feed(self, chunk):
+        if self._state == "head":
+            self.document += chunk
+            match = self._marker.search(self.document)
+            if match is None:
+                return
+            chunk = self.document[match.end():]
+            self.document = self.document[:match.end()]
+            self._state = "value"
+        if self._state == "value":
+            end = chunk.find(b'"')
+            value = chunk if end < 0 else chunk[:end]
+            # JSON encoders may escape "/" as "\/"; base64 has no other escapes
+            self._pending += value.replace(b"\\", b"")
+            usable = len(self._pending) // 4 * 4
+            if usable:
+                try:
+                    data = base64.b64decode(self._pending[:usable], validate=True)
+                except ValueError as e:
+                    raise TransportError("Invalid Base64 data in response") from e
+                self._write(data)
+                self._pending = self._pending[usable:]
+            if end < 0:
+                return
+            chunk = chunk[end:]
+            self._state = "tail"
+        self.document += chunk
+
+    def _write(self, data):
+        self._file.write(data)
+        self.digest.update(data)
+        self.size += len(data)
+
+    def close(self):
+        """
+        Finish decoding and return the JSON document without the field value.
+        Raise :class:`TransportError` if the document is incomplete.
+        """
+        if self._state == "value" or self._pending:
+            raise TransportError("Truncated Base64 data in response")
+        try:
+            return json.loads(self.document)
+        except ValueError as e:
+            raise TransportError("Invalid JSON in response") from e
+
+
+class SIDCache:
+    """
+    File-based cache of session IDs shared by processes and short-lived
+    scripts, keyed by (target, user).
+
+    The file is readable only by its owner and updated under an exclusive
+    lock, so concurrent cron jobs reuse one device session instead of each
+    creating (and leaving behind) their own::
+
+        dev = jsonrpcdevice.AdstecJSONRPCDevice(host, user, pw, sid_cache=True)
+        print(dev.status("imageversion"))
+        dev.close()    # not logout(), which ends the shared session
+    """
+
+    def __init__(self, filename=None):
+        """
+        :param filename: Cache file; defaults to ``adstec-jsonrpcdevice/sids.json``
+                         in ``$XDG_CACHE_HOME`` or ``~/.cache``.
+        """
+        if filename is None:
+            base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+            filename = os.path.join(base, "adstec-jsonrpcdevice", "sids.json")
+        self.filename = filename
+
+    @staticmethod
+    def _key(target, user):
+        return f"{user}@{target}"
+
+    def _locked(self):
+        directory = os.path.dirname(os.path.abspath(self.filename))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        lock = os.open(self.filename + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        return lock
+
+    def _unlock(self, lock):
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+        os.close(lock)
+
+    def _read(self):
+        try:
+            with open(self.filename) as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        now = time.time()
+        return {k: v for k, v in entries.items() if v.get("expires", 0) > now}
+
+    def _write(self, entries):
+        tmp = f"{self.filename}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp, self.filename)
+
+    def get(self, target, user):
+        """
+        Return ``(sid, expires)`` of a cached, not yet expired SID or None.
+        ``expires`` is a Unix timestamp.
+        """
+        lock = self._locked()
+        try:
+            entry = self._read().get(self._key(target, user))
+        finally:
+            self._unlock(lock)
+        if entry is None:
+            return None
+        return entry["sid"], entry["expires"]
+
+    def store(self, target, user, sid, expires):
+        """
+        Remember a SID until the Unix timestamp ``expires``.
+        """
+        lock = self._locked()
+        try:
+            entries = self._read()
+            entries[self._key(target, user)] = {"sid": sid, "expires": expires}
+            self._write(entries)
+        finally:
+            self._unlock(lock)
+
+    def remove(self, target, user):
+        """
+        Forget the SID of (target, user), e.g. after logout.
+        """
+        lock = self._locked()
+        try:
+            entries = self._read()
+            if entries.pop(self._key(target, user), None) is not None:
+                self._write(entries)
+        finally:
+            self._unlock(lock)
+
+
+class ConfigCache:
+    """
+    Read-through cache for :meth:`AdstecJSONRPCDevice.config_get`,
+    :meth:`~AdstecJSONRPCDevice.status` and :meth:`~AdstecJSONRPCDevice.table_get`.
+
+    Configuration values are kept for ``config_ttl`` seconds. Status values
+    change on their own and are not cached by default, except for the
+    properties in :attr:`static_status`, which are kept until the device
+    logs out. ``ttl`` overrides the lifetime per configuration key or status
+    property (None keeps the value, 0 disables caching)::
+
+        cache = jsonrpcdevice.ConfigCache(ttl={"uptime": 5})
+        dev = jsonrpcdevice.AdstecJSONRPCDevice(host, user, pw, cache=cache)
+        dev.convert_to_ifname(["wan", "lan"])    # reads the device
+        dev.convert_to_ifname(["wan", "lan"])    # served from the cache
+        print(cache.stats())
+
+    Keys written with ``config_set`` or ``table_*`` are dropped when their
+    configuration session is committed; ``import_config`` clears the cache.
+    """
+
+    #: Status properties that do not change while the device is running.
+    static_status = frozenset({
+        "product", "product_alias", "realproduct", "redbootproduct", "redbootserial",
+    })
+
+    def __init__(self, config_ttl=300.0, status_ttl=0, ttl=None):
+        """
+        :param config_ttl: Lifetime of configuration values and table rows in
+                           seconds, None for no expiry (default: 300.0).
+        :param status_ttl: Lifetime of non-static status values in seconds (default: 0).
+        :param ttl: Dictionary of lifetimes per configuration key or status property.
+        """
+        self.config_ttl = config_ttl
+        self.status_ttl = status_ttl
+        self.ttl = dict(ttl or {})
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def lifetime(self, key):
+        """
+        Return the lifetime in seconds of a cache key, None for no expiry.
+        """
+        kind, name = key[0], key[1]
+        if name in self.ttl:
+            return self.ttl[name]
+        if kind == "status":
+            return None if name in self.static_status else self.status_ttl
+        return self.config_ttl
+
+    def get(self, key):
+        """
+        Look up a key and count the hit or miss.
+
+        :return: A tuple (found, value).
+        """
+        if self.lifetime(key) == 0:
+            return False, None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] is None or entry[0] > time.monotonic()):
+                self.hits += 1
+                return True, entry[1]
+            self._entries.pop(key, None)
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        """
+        Store a value for the lifetime of its key.
+        """
+        lifetime = self.lifetime(key)
+        if lifetime == 0:
+            return
+        expires = None if lifetime is None else time.monotonic() + lifetime
+        with self._lock:
+            self._entries[key] = (expires, value)
+
+    def invalidate(self, keys=(), tables=()):
+        """
+        Drop configuration keys and all cached rows of tables.
+        """
+        tables = set(tables)
+        with self._lock:
+            for name in keys:
+                self._entries.pop(("config", name), None)
+            if tables:
+                for key in [k for k in self._entries if k[0] == "table" and k[1] in tables]:
+                    del self._entries[key]
+
+    def clear(self):
+        """
+        Drop all cached values and pending writes.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._pending.clear()
+
+    def track(self, method, params):
+        """
+        Follow a successful ``config`` call: remember what a configuration
+        session writes and invalidate it on ``sess_commit``.
+        """
+        session = params.get("cfg_session_id")
+        if method == "set":
+            with self._lock:
+                self._pending.setdefault(session, (set(), set()))[0].update(params.get("values", {}))
+        elif method in ("table_set", "table_up", "table_del"):
+            with self._lock:
+                pending = self._pending.setdefault(session, (set(), set()))
+                pending[1].add(params.get("tablename"))
+                if params.get("tablename") is None:
+                    # config_update() names no table and may change variables
+                    pending[0].update(params.get("values", {}))
+        elif method == "sess_commit":
+            with self._lock:
+                keys, tables = self._pending.pop(session, ((), ()))
+                if None in tables:
+                    tables = {key[1] for key in self._entries if key[0] == "table"}
+            self.invalidate(keys, tables)
+        elif method == "sess_abort":
+            with self._lock:
+                self._pending.pop(session, None)
+        elif method == "import_config":
+            self.clear()
+
+    def stats(self):
+        """
+        :return: Dictionary with hits, misses, hit_ratio and the number of entries.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+
+CallTiming = collections.namedtuple(
+    "CallTiming", ["total", "connect", "tls", "server", "decode", "sent", "received", "status"])
+CallTiming.__doc__ = """
+Timing of one JSON/RPC request, passed to :class:`CallHooks`.
+
+All times are in seconds. ``connect`` (TCP, including the DNS lookup) and
+``tls`` (handshake) are None when a pooled connection was reused.
+``server`` is the time from sending the request until the response
+headers arrived, less connecting: the device's RPC handler plus one round
+trip. ``decode`` is the JSON parsing of the response. ``sent`` and
+``received`` are the body sizes in bytes; fields that were not reached
+before an error are None.
+"""
+
+# connect and TLS times of the connection opened by the current request
+_connect_times = threading.local()
+
+
+class _TimedConnection:
+    def _new_conn(self):
+        start = time.perf_counter()
+        conn = super()._new_conn()
+        _connect_times.connect = time.perf_counter() - start
+        return conn
+
+
+class _TimedHTTPConnection(_TimedConnection, urllib3.connection.HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnection, urllib3.connection.HTTPSConnection):
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        connect = getattr(_connect_times, "connect", None) or 0.0
+        _connect_times.tls = time.perf_counter() - start - connect
+
+
+class _TimedHTTPConnectionPool(urllib3.HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(urllib3.HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedHTTPAdapter(requests.adapters.HTTPAdapter):
+    """
+    ``HTTPAdapter`` whose connections record how long connecting and the
+    TLS handshake took; costs two clock reads per new connection.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool, "https": _TimedHTTPSConnectionPool}
+
+
+class CallHooks:
+    """
+    Base class for objects in :attr:`AdstecJSONRPCDevice.hooks`, called
+    around every JSON/RPC request. Override the methods you need::
+
+        class SlowCalls(jsonrpcdevice.CallHooks):
+            def after_response(self, device, obj, method, params, response, timing):
+                if timing.total > 1.0:
+                    print(f"{device.target} {obj}.{method}: {timing}")
+
+        dev.hooks.append(SlowCalls())
+
+    The calls of a batch are reported one by one, each with its own response
+    envelope and an equal share of the batch's :class:`CallTiming` (times
+    and sizes divided by the number of calls). The hooks run in the thread
+    that makes the call and must not raise.
+    """
+
+    def before_request(self, device, obj, method, params):
+        """
+        Called before the request is sent.
+        """
+
+    def after_response(self, device, obj, method, params, response, timing):
+        """
+        Called with the decoded response envelope and its :class:`CallTiming`.
+        Responses with an RPC error or a non-zero status also end up here.
+        """
+
+    def on_error(self, device, obj, method, params, error, timing):
+        """
+        Called with the :class:`TransportError` (or other :class:`DeviceError`
+        for an HTTP error status) that is about to be raised.
+        """
+
+
+class CallMetrics(CallHooks):
+    """
+    Counters and histograms of JSON/RPC calls per object and method, for
+    finding out which calls are slow and where the time goes::
+
+        metrics = jsonrpcdevice.CallMetrics()
+        dev = jsonrpcdevice.AdstecJSONRPCDevice(host, user, pw, hooks=[metrics])
+        ...
+        print(metrics.prometheus())         # text exposition format
+        print(metrics.as_dict()["status.get[uptime]"]["seconds"]["server"])
+
+    For every call the total time and the phases ``connect``, ``tls``,
+    ``server`` and ``decode`` (see :class:`CallTiming`) go into one histogram
+    each, the request and response body sizes into byte histograms.
+    ``errors`` counts requests that raised, ``rpc_errors`` responses with a
+    JSON-RPC error or a non-zero ubus status. Call parameters named in
+    ``label_params`` are part of the key, so ``status.get`` is counted per
+    status property. One object can be shared by many devices (e.g. through
+    :class:`Fleet`); use one per firmware version to compare versions.
+    """
+
+    #: Upper bounds of the time histogram buckets in seconds.
+    default_buckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                       1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+    #: Upper bounds of the size histogram buckets in bytes.
+    default_byte_buckets = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+    _phases = ("total", "connect", "tls", "server", "decode")
+
+    def __init__(self, buckets=None, byte_buckets=None, label_params=("function",)):
+        """
+        :param buckets: Upper bounds of the time buckets in seconds
+                        (default: :attr:`default_buckets`).
+        :param byte_buckets: Upper bounds of the size buckets in bytes
+                             (default: :attr:`default_byte_buckets`).
+        :param label_params: Names of string call parameters added to the key
+                             (default: ``("function",)``, the status property).
+        """
+        self.buckets = tuple(sorted(buckets or self.default_buckets))
+        self.byte_buckets = tuple(sorted(byte_buckets or self.default_byte_buckets))
+        self.label_params = tuple(label_params)
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def key(self, obj, method, params):
+        """
+        Return the key of a call: ``(obj, method, labels)`` with ``labels``
+        a tuple of the ``label_params`` present as (name, value) pairs.
+        """
+        labels = ()
+        if self.label_params and isinstance(params, dict):
+            labels = tuple((name, params[name]) for name in self.label_params
+                           if isinstance(params.get(name), str))
+        return obj, method, labels
+
+    def _entry(self, key):
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = {
+                "calls": 0, "errors": 0, "rpc_errors": 0,
+                "seconds": {phase: [[0] * (len(self.buckets) + 1), 0.0]
+                            for phase in self._phases},
+                "bytes": {side: [[0] * (len(self.byte_buckets) + 1), 0]
+                          for side in ("sent", "received")},
+            }
+        return stats
+
+    def _observe(self, stats, timing):
+        for phase in self._phases:
+            value = getattr(timing, phase)
+            if value is not None:
+                histogram = stats["seconds"][phase]
+                histogram[0][bisect.bisect_left(self.buckets, value)] += 1
+                histogram[1] += value
+        for side in ("sent", "received"):
+            value = getattr(timing, side)
+            if value is not None:
+                histogram = stats["bytes"][side]
+                histogram[0][bisect.bisect_left(self.byte_buckets, value)] += 1
+                histogram[1] += value
+
+    def after_response(self, device, obj, method, params, response, timing):
+        failed = not isinstance(response, dict) or "error" in response \
+            or (response.get("result") or [0])[0] != 0
+        key = self.key(obj, method, params)
+        with self._lock:
+            stats = self._entry(key)
+            stats["calls"] += 1
+            stats["rpc_errors"] += failed
+            self._observe(stats, timing)
+
+    def on_error(self, device, obj, method, params, error, timing):
+        key = self.key(obj, method, params)
+        with self._lock:
+            stats = self._entry(key)
+            stats["calls"] += 1
+            stats["errors"] += 1
+            self._observe(stats, timing)
+
+    def reset(self):
+        """
+        Forget all counts.
+        """
+        with self._lock:
+            self._stats.clear()
+
+    @staticmethod
+    def _name(key):
+        obj, method, labels = key
+        return f"{obj}.{method}" + "".join(f"[{value}]" for _, value in labels)
+
+    @staticmethod
+    def _histogram(histogram, bounds):
+        counts, total = histogram
+        cumulative, buckets = 0, {}
+        for bound, count in zip(bounds + ("+Inf",), counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {"count": cumulative, "sum": total, "buckets": buckets}
+
+    def as_dict(self):
+        """
+        Return the counts as a JSON-serialisable dictionary keyed by
+        ``obj.method`` (with ``[value]`` per label parameter), each with
+        ``calls``, ``errors``, ``rpc_errors``, ``seconds`` and ``bytes``; a
+        histogram is ``{"count", "sum", "buckets": {upper bound: cumulative count}}``.
+        """
+        with self._lock:
+            return {self._name(key): {
+                "calls": stats["calls"], "errors": stats["errors"],
+                "rpc_errors": stats["rpc_errors"],
+                "seconds": {phase: self._histogram(histogram, self.buckets)
+                            for phase, histogram in stats["seconds"].items()},
+                "bytes": {side: self._histogram(histogram, self.byte_buckets)
+                          for side, histogram in stats["bytes"].items()},
+            } for key, stats in sorted(self._stats.items())}
+
+    def prometheus(self, prefix="adstec_jsonrpc"):
+        """
+        Return the counts in the Prometheus text exposition format, with the
+        labels ``object``, ``method`` and one per label parameter.
+
+        :param prefix: Prefix of the metric names.
+        """
+        def labels(key, **extra):
+            obj, method, params = key
+            pairs = [("object", obj), ("method", method)] + list(params) + list(extra.items())
+            return ",".join('{}="{}"'.format(
+                name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+                for name, value in pairs)
+
+        def histogram(lines, name, key, data, bounds, **extra):
+            counts, total = data
+            cumulative = 0
+            for bound, count in zip(bounds + ("+Inf",), counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{{{labels(key, le=bound, **extra)}}} {cumulative}")
+            lines.append(f"{name}_sum{{{labels(key, **extra)}}} {total}")
+            lines.append(f"{name}_count{{{labels(key, **extra)}}} {cumulative}")
+
+        with self._lock:
+            items = sorted(self._stats.items())
+            lines = []
+            for counter, help_text in (("calls", "JSON-RPC requests sent"),
+                                       ("errors", "JSON-RPC requests that failed to complete"),
+                                       ("rpc_errors", "JSON-RPC responses reporting an error")):
+                lines.append(f"# HELP {prefix}_{counter}_total {help_text}.")
+                lines.append(f"# TYPE {prefix}_{counter}_total counter")
+                lines.extend(f"{prefix}_{counter}_total{{{labels(key)}}} {stats[counter]}"
+                             for key, stats in items)
+            name = f"{prefix}_call_seconds"
+            lines.append(f"# HELP {name} Time of JSON-RPC requests by phase.")
+            lines.append(f"# TYPE {name} histogram")
+            for key, stats in items:
+                for phase, data in stats["seconds"].items():
+                    histogram(lines, name, key, data, self.buckets, phase=phase)
+            name = f"{prefix}_payload_bytes"
+            lines.append(f"# HELP {name} Size of JSON-RPC request and response bodies.")
+            lines.append(f"# TYPE {name} histogram")
+            for key, stats in items:
+                for side, data in stats["bytes"].items():
+                    histogram(lines, name, key, data, self.byte_buckets,
+                              direction="request" if side == "sent" else "response")
+        return "\n".join(lines) + "\n"
+
+
+class ProductSchema:
+    """
+    Configuration schema of one product, loaded section by section.
+
+    ``properties`` (configuration variables), ``tables`` (table definitions),
+    ``pages`` (web interface page titles) and ``rules`` (the compact form
+    used by :class:`ConfigValidator`) are read on first access. They come
+    from the registry's binary cache when it holds a copy of the current
+    schema file, otherwise the JSON file is parsed once and all sections
+    are cached. Created by :meth:`SchemaRegistry.get`.
+    """
+
+    _sections = ("meta", "properties", "tables", "pages", "rules")
+    _magic = b"ADSC"
+
+    def __init__(self, registry, product, path):
+        self.registry = registry
+        self.product = product
+        self.path = path
+        self._data = {}
+        self._blob = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<ProductSchema {self.product}>"
+
+    @property
+    def meta(self):
+        """
+        Top-level fields such as ``title``, ``x-version`` and ``x-generated``.
+        """
+        return self._section("meta")
+
+    @property
+    def properties(self):
+        """
+        Dictionary of configuration variables and their definitions.
+        """
+        return self._section("properties")
+
+    @property
+    def tables(self):
+        """
+        Dictionary of table definitions (``definitions.tables`` of the schema).
+        """
+        return self._section("tables")
+
+    @property
+    def pages(self):
+        """
+        Dictionary of web interface page IDs and titles (``x-pages``).
+        """
+        return self._section("pages")
+
+    @property
+    def rules(self):
+        """
+        Validation rules as a tuple (variable rules, table rules), see
+        :meth:`ConfigValidator.build_rules`.
+        """
+        return self._section("rules")
+
+    @property
+    def version(self):
+        return self.meta.get("x-version")
+
+    def columns(self, tablename):
+        """
+        Return the column names of a table in schema order.
+        """
+        return list(self.rules[1][tablename][0])
+
+    def validator(self, strict=False):
+        """
+        Create a :class:`ConfigValidator` sharing the registry's compiled patterns.
+        """
+        return ConfigValidator(self, strict=strict, patterns=self.registry.patterns)
+
+    def _section(self, name):
+        data = self._data.get(name)
+        if data is not None:
+            return data
+        with self._lock:
+            if name not in self._data:
+                self._load(name)
+            return self._data[name]
+
+    def _load(self, name):
+        """
+        Load one section from the cache, or all sections from the JSON file.
+        """
+        if self._blob is None:
+            self._blob = self._read_cache()
+            if self._blob is None:
+                self._parse()
+                return
+        index, blob, base = self._blob
+        offset, length = index[name]
+        self._data[name] = marshal.loads(blob[base + offset:base + offset + length])
+        if len(self._data) == len(self._sections):
+            self._blob = None
+
+    def _digest(self):
+        with open(self.path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def _read_cache(self):
+        """
+        Return (index, blob, header size) of a cache file that matches the
+        schema file, or None.
+
+        The cache is keyed by the SHA-256 of the schema file. The hash is
+        only computed when size or modification time differ from those
+        recorded in the cache, so an unchanged file costs a ``stat``.
+        """
+        cache_file = self.registry.cache_file(self.product)
+        if cache_file is None:
+            return None
+        try:
+            with open(cache_file, "rb") as f:
+                blob = f.read()
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        if blob[:4] != self._magic:
+            return None
+        size = struct.unpack_from("<I", blob, 4)[0]
+        try:
+            header = marshal.loads(blob[8:8 + size])
+        except (EOFError, ValueError, TypeError):
+            return None
+        if (header.get("size"), header.get("mtime")) != (st.st_size, st.st_mtime_ns):
+            if header.get("sha256") != self._digest():
+                return None
+        return header["index"], blob, 8 + size
+
+    def _parse(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            schema = json.load(f)
+        properties = schema.pop("properties", {})
+        tables = schema.pop("definitions", {}).get("tables", {})
+        self._data = {
+            "properties": properties,
+            "tables": tables,
+            "pages": schema.pop("x-pages", {}),
+            "meta": schema,
+            "rules": ConfigValidator.build_rules(properties, tables),
+        }
+        self._write_cache()
+
+    def _write_cache(self):
+        """
+        Store every section as its own marshal blob behind a header with
+        their offsets, so that each can be loaded without the others.
+        """
+        cache_file = self.registry.cache_file(self.product)
+        if cache_file is None:
+            return
+        blobs = [marshal.dumps(self._data[name]) for name in self._sections]
+        index, offset = {}, 0
+        for name, blob in zip(self._sections, blobs):
+            # offsets are relative to the end of the header
+            index[name] = (offset, len(blob))
+            offset += len(blob)
+        tmp = f"{cache_file}.{os.getpid()}.tmp"
+        try:
+            st = os.stat(self.path)
+            header = marshal.dumps({"sha256": self._digest(), "size": st.st_size,
+                                    "mtime": st.st_mtime_ns, "index": index})
+            os.makedirs(os.path.dirname(cache_file), mode=0o700, exist_ok=True)
+            with open(tmp, "wb") as f:
+                f.write(self._magic + struct.pack("<I", len(header)) + header)
+                for blob in blobs:
+                    f.write(blob)
+            os.replace(tmp, cache_file)
+        except OSError:
+            # the cache only saves time; a read-only home directory is not an error
+            pass
+
+
+class SchemaRegistry:
+    """
+    The product schemas of ``configdb-schemas``, parsed only when used.
+
+    Listing products and looking up a schema reads no schema file; a
+    section such as ``properties`` is loaded on first access. Parsed
+    schemas are kept in a binary cache keyed by the SHA-256 of the JSON
+    file, which loads several times faster than the JSON, and all
+    validators of a registry share their compiled patterns::
+
+        registry = jsonrpcdevice.SchemaRegistry()
+        schema = registry.for_device(dev)            # status("product_alias")
+        print(schema.product, schema.properties["comsrv"]["description"])
+        dev.validator = schema.validator()
+    """
+
+    #: Directory of the product schemas shipped with this module.
+    schema_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "configdb-schemas")
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, directory=None, cache_dir=None):
+        """
+        :param directory: Directory of ``<product>.schema.json`` files
+                          (default: :attr:`schema_dir`).
+        :param cache_dir: Directory of the binary cache; defaults to
+                          ``adstec-jsonrpcdevice/schemas`` in ``$XDG_CACHE_HOME``
+                          or ``~/.cache``. False disables the cache.
+        """
+        self.directory = directory or self.schema_dir
+        if cache_dir is None:
+            base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+            cache_dir = os.path.join(base, "adstec-jsonrpcdevice", "schemas")
+        self.cache_dir = cache_dir
+        #: Compiled patterns shared by the validators of this registry.
+        self.patterns = {}
+        self._schemas = {}
+        self._products = None
+
+    @classmethod
+    def default(cls):
+        """
+        Return the registry shared by :meth:`ConfigValidator.for_product`.
+        """
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    def cache_file(self, product):
+        """
+        Return the cache file of a product, or None without a cache.
+        """
+        if not self.cache_dir:
+            return None
+        # marshal data is only guaranteed to load in the same Python version
+        return os.path.join(self.cache_dir,
+                            f"{product}.py{sys.version_info[0]}{sys.version_info[1]}.cache")
+
+    def products(self):
+        """
+        Return the sorted product names (``x-product``) of the schema files.
+        """
+        if self._products is None:
+            suffix = ".schema.json"
+            self._products = sorted(name[:-len(suffix)] for name in os.listdir(self.directory)
+                                    if name.endswith(suffix))
+        return self._products
+
+    def get(self, product):
+        """
+        Return the :class:`ProductSchema` of a product without loading it.
+
+        :param product: Product name (e.g. 'IRF3821').
+        """
+        schema = self._schemas.get(product)
+        if schema is None:
+            if product not in self.products():
+                raise ValueError(f"No configuration schema for product {product!r}")
+            path = os.path.join(self.directory, f"{product}.schema.json")
+            schema = self._schemas.setdefault(product, ProductSchema(self, product, path))
+        return schema
+
+    def match(self, name):
+        """
+        Return the product whose schema covers a product name reported by a
+        device: the name itself, or the longest product it starts with.
+
+        :return: Product name or None.
+        """
+        if name in self.products():
+            return name
+        candidates = [p for p in self.products() if name and name.startswith(p)]
+        return max(candidates, key=len) if candidates else None
+
+    def for_device(self, device):
+        """
+        Return the :class:`ProductSchema` of a device, chosen by its
+        ``product_alias`` status property, or ``product`` when the alias
+        has no schema.
+        """
+        for prop in ("product_alias", "product"):
+            name = device.status(prop)
+            product = self.match(name)
+            if product is not None:
+                return self.get(product)
+        raise ValueError(f"No configuration schema for product {name!r}")
+
+    def validator(self, product, strict=False):
+        """
+        Create a :class:`ConfigValidator` for a product, see :meth:`ProductSchema.validator`.
+        """
+        return self.get(product).validator(strict=strict)
+
+
+ValidationIssue = collections.namedtuple(
+    "ValidationIssue", ["table", "row", "key", "value", "message"])
+ValidationIssue.__doc__ = """
+One invalid value found by :class:`ConfigValidator`: table name and row
+index (None for configuration variables), variable or column name, the
+rejected value and the schema's ``x-validation-error`` text.
+"""
+
+
+def _end_anchor(pattern):
+    """
+    Replace ``$`` outside of character classes by ``\\Z``: schema patterns
+    are meant to match the whole value, and Python's ``$`` also matches
+    before a trailing newline.
+    """
+    out = []
+    i, in_class = 0, False
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            out.append(pattern[i:i + 2])
+            i += 2
+            continue
+        if in_class:
+            # "]" right after "[" or "[^" is a literal
+            if char == "]" and pattern[i - 1] != "[" and pattern[i - 2:i] != "[^":
+                in_class = False
+        elif char == "[":
+            in_class = True
+        elif char == "$":
+            char = "\\Z"
+        out.append(char)
+        i += 1
+    return "".join(out)
+
+
+class ConfigValidator:
+    """
+    Check configuration payloads against a product schema from
+    ``configdb-schemas`` before they are sent to the device.
+
+    The regular expressions of the schema are compiled when the validator
+    is created; validators created by the same :class:`SchemaRegistry`
+    share the compiled patterns. ``$`` in a pattern only matches at the very
+    end of the value, not before a trailing newline as in Python. Every
+    invalid value is reported, not just the first::
+
+        validator = jsonrpcdevice.ConfigValidator.for_product("IRF3821")
+        for issue in validator.validate_config({"comsrv": "on", "ntp_service": "enabled"}):
+            print(issue.key, issue.message)
+
+    Passed as ``validator=`` to :class:`AdstecJSONRPCDevice`, it checks every
+    ``set``, ``table_set``, ``table_up`` and ``import_config`` call and raises
+    ValueError listing all issues instead of sending the call.
+
+    Variables and tables missing from the schema (e.g. the ``save_now``
+    trigger) are accepted unless ``strict`` is set.
+    """
+
+    def __init__(self, schema, strict=False, patterns=None):
+        """
+        :param schema: :class:`ProductSchema`, parsed product schema, or the
+                       path of a ``.schema.json`` file.
+        :param strict: Report variables, tables and columns that are not in
+                       the schema (default: False).
+        :param patterns: Dictionary of compiled patterns shared with other
+                         validators (default: a new one).
+        """
+        if isinstance(schema, str):
+            with open(schema, "r", encoding="utf-8") as f:
+                schema = json.load(f)
+        if isinstance(schema, ProductSchema):
+            self.product = schema.product
+            self.rules, self.tables = schema.rules
+        else:
+            self.product = schema.get("x-product")
+            self.rules, self.tables = self.build_rules(
+                schema.get("properties", {}), schema.get("definitions", {}).get("tables", {}))
+        self.strict = strict
+        self.patterns = {} if patterns is None else patterns
+        rules = list(self.rules.values())
+        for _, column_rules in self.tables.values():
+            rules.extend(column_rules.values())
+        for pattern, _, _ in rules:
+            if pattern is not None and pattern not in self.patterns:
+                self._compile(pattern)
+
+    @classmethod
+    def for_product(cls, product, strict=False):
+        """
+        Create a validator for a product of the default :class:`SchemaRegistry`.
+
+        :param product: Product name as in the schema file name (e.g. 'IRF3821').
+        """
+        return SchemaRegistry.default().validator(product, strict=strict)
+
+    @staticmethod
+    def build_rules(properties, tables):
+        """
+        Reduce schema properties and table definitions to what validation
+        needs: ``{key: (pattern, enum, message)}`` for the variables and
+        ``{table: (columns, {column: (pattern, enum, message)})}`` for the
+        tables, with ``columns`` in schema order.
+        """
+        def rule(spec):
+            enum = frozenset(spec["enum"]) if "enum" in spec else None
+            return spec.get("pattern"), enum, spec.get("x-validation-error") or "Invalid value."
+
+        table_rules = {}
+        for name, spec in tables.items():
+            columns = spec.get("items", {}).get("properties", {})
+            table_rules[name] = (tuple(columns), {column: rule(c) for column, c in columns.items()})
+        return {key: rule(spec) for key, spec in properties.items()}, table_rules
+
+    def _compile(self, pattern):
+        with warnings.catch_warnings():
+            # a few patterns contain "[[" which re warns about
+            warnings.simplefilter("ignore", FutureWarning)
+            search = self.patterns[pattern] = re.compile(_end_anchor(pattern)).search
+        return search
+
+    def _check(self, items, rules, table, index, issues):
+        """
+        Append an issue for every (name, value) pair that breaks its rule.
+        """
+        strict = self.strict
+        patterns = self.patterns
+        for name, value in items:
+            rule = rules.get(name)
+            if rule is None:
+                if strict:
+                    issues.append(ValidationIssue(table, index, name, value,
+                                                  "Unknown column." if table else "Unknown variable."))
+                continue
+            pattern, enum, message = rule
+            text = value if value.__class__ is str else ("" if value is None else str(value))
+            if pattern is not None:
+                if patterns[pattern](text) is None:
+                    issues.append(ValidationIssue(table, index, name, value, message))
+                    continue
+            if enum is not None and text not in enum:
+                issues.append(ValidationIssue(table, index, name, value, message))
+        return issues
+
+    def validate_config(self, values):
+        """
+        Check configuration variables as passed to ``config_set``.
+
+        :param values: Dictionary of key-value pairs.
+        :return: List of :class:`ValidationIssue`, empty if all values are valid.
+        """
+        return self._check(values.items(), self.rules, None, None, [])
+
+    def validate_row(self, tablename, row, index=None):
+        """
+        Check a table row as passed to ``table_insert`` (list of all columns
+        in schema order) or ``table_up`` (dictionary of some columns).
+
+        :param tablename: Name of the table.
+        :param row: List or dictionary of column values.
+        :param index: Row index reported in the issues (default: None).
+        :return: List of :class:`ValidationIssue`, empty if all values are valid.
+        """
+        table = self.tables.get(tablename)
+        if table is None:
+            if self.strict:
+                return [ValidationIssue(tablename, index, None, None, "Unknown table.")]
+            return []
+        columns, rules = table
+        issues = []
+        if isinstance(row, dict):
+            return self._check(row.items(), rules, tablename, index, issues)
+        if len(row) != len(columns):
+            issues.append(ValidationIssue(tablename, index, None, None,
+                                          f"Expected {len(columns)} columns, got {len(row)}."))
+        return self._check(zip(columns, row), rules, tablename, index, issues)
+
+    def validate_import(self, jsondata):
+        """
+        Check an ``import_config`` payload: ``configdata`` and the rows of
+        ``tableinsert`` and ``tableupdate``. Deletions only carry conditions
+        and are not checked.
+
+        :param jsondata: The ``jsondata`` parameter of ``import_config``.
+        :return: List of :class:`ValidationIssue`, empty if all values are valid.
+        """
+        issues = self.validate_config(jsondata.get("configdata") or {})
+        for section, field in (("tableinsert", "data"), ("tableupdate", "values")):
+            entries = jsondata.get(section) or []
+            if isinstance(entries, dict):
+                entries = [{"tablename": name, field: rows} for name, rows in entries.items()]
+            for entry in entries:
+                rows = entry.get(field) or []
+                if isinstance(rows, dict):
+                    rows = [rows]
+                for index, row in enumerate(rows):
+                    issues.extend(self.validate_row(entry.get("tablename"), row, index))
+        return issues
+
+    def validate(self, method, params):
+        """
+        Check the parameters of a ``config`` call. Methods that do not write
+        values are not checked.
+
+        :param method: Method name, e.g. 'set', 'table_set' or 'import_config'.
+        :param params: Parameters of the call.
+        :return: List of :class:`ValidationIssue`, empty if all values are valid.
+        """
+        if method == "set":
+            return self.validate_config(params.get("values") or {})
+        if method == "table_set":
+            return self.validate_row(params.get("tablename"), params.get("row") or [])
+        if method == "table_up":
+            return self.validate_row(params.get("tablename"), params.get("values") or {})
+        if method == "import_config":
+            return self.validate_import(params.get("jsondata") or {})
+        return []
+
+    def check(self, method, params):
+        """
+        Like :meth:`validate`, but raise :class:`ValidationError` listing all
+        issues; its ``errors`` map ``key`` or ``table[row].key`` to the message.
+        """
+        issues = self.validate(method, params)
+        if issues:
+            errors = {}
+            lines = []
+            for issue in issues:
+                where = issue.key if issue.table is None else \
+                    f"{issue.table}[{'' if issue.row is None else issue.row}].{issue.key or '*'}"
+                errors[where] = issue.message
+                lines.append(f"  {where}={issue.value!r}: {issue.message}")
+            raise ValidationError(f"{len(issues)} invalid value(s)\n" + "\n".join(lines),
+                                  method=f"config.{method}", errors=errors, issues=issues)
+
+
+class ConfigDelta(collections.namedtuple(
+        "ConfigDelta", ["configdata", "deletes", "updates", "inserts"])):
+    """
+    Difference between a device configuration and a desired one, computed
+    by :func:`diff_config`: changed variables, and per table the rows to
+    delete ``(table, condition)``, to update ``(table, condition, values)``
+    and to insert ``(table, row)`` with ``row`` in schema column order.
+    """
+
+    __slots__ = ()
+
+    @property
+    def operations(self):
+        """
+        Number of changed variables and rows.
+        """
+        return len(self.configdata) + len(self.deletes) + len(self.updates) + len(self.inserts)
+
+    def calls(self):
+        """
+        Return the ``config`` calls that apply the delta as a list of
+        (method, params) without ``cfg_session_id``.
+        """
+        calls = []
+        if self.configdata:
+            calls.append(("set", {"values": self.configdata, "verbose": True}))
+        calls.extend(("table_del", {"tablename": t, "condition": c}) for t, c in self.deletes)
+        calls.extend(("table_up", {"tablename": t, "condition": c, "values": v})
+                     for t, c, v in self.updates)
+        calls.extend(("table_set", {"tablename": t, "row": r}) for t, r in self.inserts)
+        return calls
+
+
+def _import_tables(entries, field):
+    """
+    Return ``{table: rows}`` from a table section of an ``import_config``
+    payload or ``export_pages`` result, given as a list of
+    ``{"tablename": ..., field: rows}`` or as a dictionary.
+    """
+    if not entries:
+        return {}
+    if isinstance(entries, dict):
+        return {name: list(rows) for name, rows in entries.items()}
+    tables = {}
+    for entry in entries:
+        tables.setdefault(entry["tablename"], []).extend(entry.get(field) or [])
+    return tables
+
+
+def _text(value):
+    # the device stores every value as a string
+    return "" if value is None else str(value)
+
+
+def diff_config(current, desired, keys=None, columns=None, ordered=True):
+    """
+    Compute the smallest set of changes that turns ``current`` into
+    ``desired``. Both are dictionaries with ``configdata`` (variables) and
+    ``tables`` (table name and list of rows); values are compared as strings.
+
+    Rows are matched by their key columns: ``keys[table]``, a column name or
+    a tuple of up to two (the limit of a ``table_del`` condition), by
+    default ``id``. A matched row with other values becomes an update of
+    just those columns, an unmatched desired row an insert, and an
+    unmatched current row a delete.
+
+    ``table_set`` appends, so inserts only keep the desired row order if
+    they all come after the rows that stay. For tables in ``ordered`` where
+    that is not the case, such as packet filter rules, the delta deletes
+    every current row and inserts all desired rows in order.
+
+    :param current: Configuration read from the device.
+    :param desired: Desired configuration. Rows may be dictionaries or lists
+                    in schema column order.
+    :param keys: Dictionary of table name and key column(s).
+    :param columns: Dictionary of table name and column names in schema
+                    order; needed for list rows and for inserts.
+    :param ordered: Names of the tables whose row order matters, True for
+                    all tables (default) or False for none.
+    :return: :class:`ConfigDelta`.
+    """
+    keys = keys or {}
+    columns = columns or {}
+    current_config = current.get("configdata") or {}
+    configdata = {key: value for key, value in (desired.get("configdata") or {}).items()
+                  if _text(current_config.get(key)) != _text(value)}
+    deletes, updates, inserts = [], [], []
+    current_tables = current.get("tables") or {}
+    for table, rows in (desired.get("tables") or {}).items():
+        names = columns.get(table)
+        key = keys.get(table, "id")
+        key = (key,) if isinstance(key, str) else tuple(key)
+        if not 1 <= len(key) <= 2:
+            raise ValueError(f"Table {table!r} needs one or two key columns")
+
+        def index(rows, what):
+            indexed = {}
+            for row in rows:
+                if not isinstance(row, dict):
+                    if names is None or len(row) != len(names):
+                        raise ValueError(f"Row {row!r} of table {table!r} does not match its columns")
+                    row = dict(zip(names, row))
+                if any(k not in row for k in key):
+                    raise ValueError(f"{what} row of table {table!r} lacks key column(s) {key}: {row!r}")
+                ident = tuple(_text(row[k]) for k in key)
+                if ident in indexed:
+                    raise ValueError(f"{what} rows of table {table!r} share the key {dict(zip(key, ident))}")
+                indexed[ident] = row
+            return indexed
+
+        have = index(current_tables.get(table) or [], "Current")
+        want = index(rows, "Desired")
+        if ordered is True or ordered and table in ordered:
+            # the order on the device after the delta: kept rows, then inserts
+            result = [ident for ident in have if ident in want]
+            result += [ident for ident in want if ident not in have]
+            if result != list(want):
+                deletes.extend((table, dict(zip(key, ident))) for ident in have)
+                have = {}
+        for ident in have:
+            if ident not in want:
+                deletes.append((table, dict(zip(key, ident))))
+        for ident, row in want.items():
+            old = have.get(ident)
+            if old is None:
+                if names is None:
+                    raise ValueError(f"Columns of table {table!r} are needed to insert rows")
+                missing = [c for c in names if c not in row]
+                if missing:
+                    raise ValueError(f"Row to insert into {table!r} lacks column(s) {missing}")
+                inserts.append((table, [_text(row[c]) for c in names]))
+                continue
+            changed = {c: v for c, v in row.items() if _text(old.get(c)) != _text(v)}
+            if changed:
+                updates.append((table, dict(zip(key, ident)), changed))
+    return ConfigDelta(configdata, deletes, updates, inserts)
+
+
+class TableView:
+    """
+    Local copy of a configuration table with hash indexes, for queries that
+    ``table_get`` cannot answer (more than two conditions, other operators)
+    or would need one call per lookup.
+
+    The table is read once with ``export_pages``. Rows written through the
+    same device object with ``table_insert``, ``table_up`` or ``table_del``
+    are applied to the copy when their session is committed, so the view
+    stays current without reading the table again::
+
+        rules = jsonrpcdevice.TableView(dev, "serv_Protocols", index=["service_id", "protocol"])
+        tcp = rules.find(service_id="1000", protocol="TCP")
+        open_ports = rules.find(lambda r: r["action_id"] == "1" and r["des_port"] not in ("", "*"))
+
+    An ``import_config`` call, or a ``table_up`` without a table name,
+    marks the view stale; it is read again on the next query. Values are
+    compared as strings. The returned rows are the view's own dictionaries
+    and must not be modified.
+    """
+
+    def __init__(self, device, tablename, index=()):
+        """
+        :param device: :class:`AdstecJSONRPCDevice` to read and follow.
+        :param tablename: Name of the table.
+        :param index: Columns to build hash indexes on.
+        """
+        self.device = device
+        self.tablename = tablename
+        self.columns = device.product_schema().columns(tablename)
+        self.indexes = {column: {} for column in index}
+        self.rows = []
+        self.stale = True
+        self.fetches = 0
+        self._pending = {}
+        self._lock = threading.RLock()
+        device._table_views.add(self)
+
+    def __len__(self):
+        self._ensure()
+        return len(self.rows)
+
+    def __iter__(self):
+        self._ensure()
+        return iter(list(self.rows))
+
+    def refresh(self):
+        """
+        Read the table from the device again.
+        """
+        rows = self.device.export_tables([self.tablename])[self.tablename]
+        with self._lock:
+            self.rows = [{c: _text(v) for c, v in row.items()} for row in rows]
+            self.stale = False
+            self.fetches += 1
+            self._reindex()
+
+    def add_index(self, column):
+        """
+        Build a hash index on another column.
+        """
+        with self._lock:
+            self.indexes[column] = {}
+            self._reindex()
+
+    def _reindex(self):
+        for column, index in self.indexes.items():
+            index.clear()
+            for row in self.rows:
+                index.setdefault(row.get(column), []).append(row)
+
+    def _ensure(self):
+        if self.stale:
+            self.refresh()
+
+    def find(self, where=None, **conditions):
+        """
+        Return the rows whose columns equal ``conditions`` and for which
+        ``where(row)`` is true. Indexed columns are looked up first; the
+        smallest candidate list is then filtered.
+
+        :param where: Optional predicate taking a row dictionary.
+        :param conditions: Column values that must match.
+        :return: List of rows in table order.
+        """
+        self._ensure()
+        conditions = {c: _text(v) for c, v in conditions.items()}
+        with self._lock:
+            candidates = self.rows
+            for column, value in conditions.items():
+                index = self.indexes.get(column)
+                if index is not None:
+                    rows = index.get(value, [])
+                    if len(rows) < len(candidates):
+                        candidates = rows
+            # index lists keep table order as long as they are rebuilt on change
+            return [row for row in candidates
+                    if all(row.get(c) == v for c, v in conditions.items())
+                    and (where is None or where(row))]
+
+    def get(self, where=None, **conditions):
+        """
+        Return the first row matching :meth:`find`, or None.
+        """
+        rows = self.find(where, **conditions)
+        return rows[0] if rows else None
+
+    def count(self, where=None, **conditions):
+        """
+        Return the number of rows matching :meth:`find`.
+        """
+        return len(self.find(where, **conditions))
+
+    def track(self, method, params):
+        """
+        Follow a successful ``config`` call of the device: queue the table
+        operations of a session and apply them to the copy on ``sess_commit``.
+        """
+        session = params.get("cfg_session_id")
+        if method in ("table_set", "table_up", "table_del"):
+            tablename = params.get("tablename")
+            if tablename == self.tablename:
+                with self._lock:
+                    self._pending.setdefault(session, []).append((method, params))
+            elif tablename is None:
+                # config_update() does not name its table
+                with self._lock:
+                    self._pending.setdefault(session, []).append(("unknown", params))
+        elif method == "sess_commit":
+            with self._lock:
+                ops = self._pending.pop(session, [])
+                if ops and not self.stale:
+                    self._apply(ops)
+        elif method == "sess_abort":
+            with self._lock:
+                self._pending.pop(session, None)
+        elif method == "import_config":
+            self.stale = True
+
+    def _apply(self, ops):
+        for method, params in ops:
+            if method == "table_set":
+                row = params.get("row")
+                if not isinstance(row, dict):
+                    row = dict(zip(self.columns, row))
+                self.rows.append({c: _text(v) for c, v in row.items()})
+                continue
+            if method == "unknown":
+                self.stale = True
+                return
+            condition = {c: _text(v) for c, v in params.get("condition", {}).items()}
+            matches = [row for row in self.rows
+                       if all(row.get(c) == v for c, v in condition.items())]
+            if method == "table_up":
+                values = {c: _text(v) for c, v in params.get("values", {}).items()}
+                for row in matches:
+                    row.update(values)
+            else:
+                ids = set(map(id, matches))
+                self.rows = [row for row in self.rows if id(row) not in ids]
+        self._reindex()
+
+
+class Batch:
+    """
+    Queue of JSON/RPC calls that are sent together by
+    :meth:`AdstecJSONRPCDevice.batch`.
+
+    Every call returns a :class:`concurrent.futures.Future` holding the
+    result data, or the exception the call raised.
+    """
+
+    def __init__(self, device):
+        self.device = device
+        self._pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
+        else:
+            for _, future, _ in self._pending:
+                future.cancel()
+            self._pending = []
+
+    def call(self, obj, method, **params):
+        """
+        Queue a JSON/RPC call.
+
+        :return: Future resolved with the result data when the batch is sent.
+        """
+        return self._queue(obj, method, params)
+
+    def _queue(self, obj, method, params, convert=None):
+        future = Future()
+        if self.device.validator is not None and obj == "config":
+            try:
+                self.device.validator.check(method, params)
+            except ValueError as e:
+                future.set_exception(e)
+                return future
+        self._pending.append(((obj, method, params), future, convert))
+        return future
+
+    def status(self, property, param1="", param2=""):
+        """
+        Queue a status query, see :meth:`AdstecJSONRPCDevice.status`.
+        """
+        return self._queue("status", "get",
+                           {"function": property, "parameters": [param1, param2]},
+                           convert=lambda r: r.get(property, None))
+
+    def config_get(self, keys):
+        """
+        Queue a configuration read, see :meth:`AdstecJSONRPCDevice.config_get`.
+        """
+        return self.call("config", "get", keys=keys)
+
+    def execute(self):
+        """
+        Send all queued calls and resolve their futures.
+
+        :return: List of the futures in the order the calls were queued.
+        """
+        pending, self._pending = self._pending, []
+        if not pending:
+            return []
+        dev = self.device
+        try:
+            dev.ensure_sid()
+            payloads = [dev._envelope(*call) for call, _, _ in pending]
+            responses = dev.send_batch(payloads)
+            expired = [i for i, r in enumerate(responses) if dev._session_expired(r)]
+            if expired:
+                dev.get_sid()
+                retry = [dev._envelope(*pending[i][0]) for i in expired]
+                for i, response in zip(expired, dev.send_batch(retry)):
+                    responses[i] = response
+        except Exception as e:
+            # nothing was answered: every call fails with the same error
+            for _, future, _ in pending:
+                if not future.done():
+                    future.set_exception(e)
+            raise
+        dev._touch_sid()
+        dev._sid_verified = True
+        for (call, future, convert), response in zip(pending, responses):
+            try:
+                result = dev._unpack(response, f"{call[0]}.{call[1]}")
+                if call[0] == "config":
+                    dev._track(call[1], call[2])
+                future.set_result(convert(result) if convert else result)
+            except Exception as e:
+                future.set_exception(e)
+        return [future for _, future, _ in pending]
+
+
+class MetricStream:
+    """
+    Incremental reader for ``datacollection.get_values_as_table``.
+
+    The stream remembers the newest sample of every metric and only asks the
+    device for later ones, so a poll every 10 s transfers about 10 slots per
+    metric instead of the whole window. The last ``window`` seconds are kept
+    in a ring buffer of ``(ts, val)`` tuples per metric::
+
+        stream = jsonrpcdevice.MetricStream(dev, ["ETH1.rx_bytes", "system.cpu"])
+        while True:
+            stream.poll()
+            print(stream.latest("system.cpu"))
+            time.sleep(10)
+
+    Timestamps are the device's. The difference to the local clock is
+    learned from the samples, and after ``resync_after`` polls without a
+    new sample the whole window is read again, which recovers from the
+    device clock being set back. Null slots are not stored; slots that are
+    still null at the end of the range are asked for again on the next poll.
+    """
+
+    def __init__(self, device, metrics, window=600, resolution=1, resync_after=3,
+                 clock_offset=0):
+        """
+        :param device: :class:`AdstecJSONRPCDevice` to read from.
+        :param metrics: List of metric names.
+        :param window: Seconds of history kept per metric (default: 600,
+                       about what the device itself keeps).
+        :param resolution: Buffer resolution in seconds (default: 1).
+        :param resync_after: Polls without new samples after which the whole
+                             window is read again (default: 3).
+        :param clock_offset: Known difference of the device clock to the local
+                             clock in seconds. Differences larger than ``window``
+                             cannot be learned from the samples (default: 0).
+        """
+        self.device = device
+        self.metrics = list(metrics)
+        self.window = window
+        self.resolution = resolution
+        self.resync_after = resync_after
+        maxlen = max(1, window // resolution)
+        self.history = {m: collections.deque(maxlen=maxlen) for m in self.metrics}
+        self.last_ts = dict.fromkeys(self.metrics)
+        #: Device clock minus local clock in seconds, as far as the samples tell.
+        self.clock_offset = clock_offset
+        self._initial_offset = clock_offset
+        #: ``(metric, from, to)`` ranges that dropped out of the device buffer
+        #: before they were read.
+        self.gaps = []
+        self.polls = 0
+        self.points = 0
+        self.samples = 0
+        self._idle = 0
+        self._offset_known = False
+
+    def poll(self, now=None):
+        """
+        Fetch the samples that arrived since the last poll.
+
+        :param now: Local Unix time (default: the current time).
+        :return: Dictionary of the new ``(ts, val)`` samples per metric.
+        """
+        now = int(time.time() if now is None else now)
+        resync = self._idle >= self.resync_after
+        if resync:
+            self.clock_offset = self._initial_offset
+            self._offset_known = False
+        to = now + self.clock_offset
+        oldest = to - self.window
+        groups = collections.defaultdict(list)
+        for metric in self.metrics:
+            last = self.last_ts[metric]
+            start = oldest
+            if last is not None and not resync:
+                start = last + self.resolution
+                if start < oldest:
+                    self.gaps.append((metric, start, oldest))
+                    start = oldest
+            groups[min(start, to)].append(metric)
+
+        data = {}
+        for start, metrics in groups.items():
+            raw = self.device.call("datacollection", "get_values_as_table",
+                                   metrics=metrics, resolution=self.resolution,
+                                   **{"from": start, "to": to})
+            data.update(raw.get("result", raw))
+        self.polls += 1
+        return self._merge(data, now, resync)
+
+    def _merge(self, data, now, resync):
+        new = {}
+        newest = None
+        for metric in self.metrics:
+            points = data.get(metric) or []
+            self.points += len(points)
+            samples = sorted((p["ts"], p["val"]) for p in points if p["val"] is not None)
+            last = self.last_ts[metric]
+            if resync and samples and last is not None and samples[-1][0] < last:
+                # the device clock went back, the old timestamps are useless
+                self.history[metric].clear()
+                last = None
+            if last is not None:
+                samples = [s for s in samples if s[0] > last]
+            if samples:
+                self.history[metric].extend(samples)
+                self.last_ts[metric] = samples[-1][0]
+                newest = samples[-1][0] if newest is None else max(newest, samples[-1][0])
+            self.samples += len(samples)
+            new[metric] = samples
+
+        if newest is None:
+            self._idle += 1
+        else:
+            self._idle = 0
+            # the newest sample lags the device clock by up to one collection
+            # interval, so the largest lag seen is the best estimate
+            offset = newest - now
+            if not self._offset_known or offset > self.clock_offset:
+                self.clock_offset = offset
+                self._offset_known = True
+        return new
+
+    def latest(self, metric):
+        """
+        Return the most recent value of a metric, or None.
+        """
+        history = self.history.get(metric)
+        return history[-1][1] if history else None
+
+    def stats(self):
+        """
+        :return: Dictionary with the number of polls, returned slots (points),
+                 new samples and gaps, and the learned clock offset.
+        """
+        return {
+            "polls": self.polls,
+            "points": self.points,
+            "samples": self.samples,
+            "gaps": len(self.gaps),
+            "clock_offset": self.clock_offset,
+        }
+
+
+def to_columns(table):
+    """
+    Convert a ``datacollection.get_values_as_table`` result into columns.
+
+    :param table: ``{metric: [{"ts": ..., "val": ...}, ...]}``, the raw
+                  response with a ``result`` key, or the ``{metric: [(ts, val)]}``
+                  returned by :meth:`MetricStream.poll`.
+    :return: Dictionary of ``(ts, val)`` per metric, ``ts`` as an ``int64``
+             and ``val`` as a ``float64`` array with NaN for null.
+
+    Requires ``pip install numpy``.
+    """
+    if np is None:
+        raise ImportError("to_columns requires numpy: pip install numpy")
+    if isinstance(table.get("result"), dict):
+        table = table["result"]
+    columns = {}
+    for metric, points in table.items():
+        if points and isinstance(points[0], dict):
+            ts = np.fromiter((p["ts"] for p in points), np.int64, len(points))
+            # None becomes NaN in a float array
+            val = np.array([p["val"] for p in points], dtype=np.float64)
+        elif points:
+            ts = np.fromiter((p[0] for p in points), np.int64, len(points))
+            val = np.array([p[1] for p in points], dtype=np.float64)
+        else:
+            ts, val = np.empty(0, np.int64), np.empty(0, np.float64)
+        columns[metric] = ts, val
+    return columns
+
+
+class TimeSeriesStore:
+    """
+    Rolling, column-oriented store for datacollection samples.
+
+    All series share one time grid of ``retention / step`` slots, kept as an
+    ``int64`` array of slot times and a preallocated ``float64`` matrix with
+    one row per series and NaN for missing values. Series from different
+    metrics and devices are therefore aligned by construction, and rates or
+    deltas over all of them are single NumPy operations::
+
+        store = jsonrpcdevice.TimeSeriesStore(retention=86400, step=60, agg="sum")
+        for host, stream in streams.items():
+            store.add(stream.poll(), source=host)
+        rx = [k for k in store.keys if k[1].endswith(".rx_bytes")]
+        bytes_per_second = store.rate(rx, window=600)
+
+    A row takes ``8 * retention / step`` bytes: 24 h of 500 metrics is
+    5.8 MB at ``step=60`` and 346 MB at ``step=1``.
+
+    Samples falling into the same slot are combined by ``agg``: ``"last"``
+    keeps the newest, ``"sum"`` adds them up (for the per-interval byte and
+    packet counts), ``"mean"`` averages them (for gauges such as CPU usage).
+
+    Requires ``pip install numpy``.
+    """
+
+    def __init__(self, retention=86400, step=1, agg="last", capacity=64):
+        """
+        :param retention: Seconds of data kept (default: 86400).
+        :param step: Width of a time slot in seconds (default: 1).
+        :param agg: How samples in one slot are combined: "last", "sum" or "mean".
+        :param capacity: Number of rows preallocated; the matrix grows as needed.
+        """
+        if np is None:
+            raise ImportError("TimeSeriesStore requires numpy: pip install numpy")
+        if agg not in ("last", "sum", "mean"):
+            raise ValueError(f"Invalid agg: {agg}. Must be one of: last, sum, mean.")
+        self.step = step
+        self.slots = max(1, retention // step)
+        self.agg = agg
+        #: Start time of the data in each slot, -1 for never written.
+        self.ts = np.full(self.slots, -1, np.int64)
+        self.values = np.full((capacity, self.slots), np.nan)
+        self._counts = np.zeros((capacity, self.slots), np.uint32) if agg == "mean" else None
+        #: Row index per series key; the key is the metric name, or
+        #: ``(source, metric)`` for data added with a source.
+        self.keys = {}
+        self.latest = None
+
+    @property
+    def nbytes(self):
+        """
+        Memory used by the arrays in bytes.
+        """
+        total = self.ts.nbytes + self.values.nbytes
+        return total + (self._counts.nbytes if self._counts is not None else 0)
+
+    def row(self, key):
+        """
+        Return the row index of a series, allocating a row for a new key.
+        """
+        row = self.keys.get(key)
+        if row is None:
+            row = len(self.keys)
+            if row == len(self.values):
+                grow = np.full((len(self.values), self.slots), np.nan)
+                self.values = np.vstack([self.values, grow])
+                if self._counts is not None:
+                    self._counts = np.vstack([self._counts, np.zeros_like(self._counts)])
+            self.keys[key] = row
+        return row
+
+    def add(self, table, source=None):
+        """
+        Add a ``get_values_as_table`` result or :meth:`MetricStream.poll` output.
+
+        :param table: Samples per metric, see :func:`to_columns`.
+        :param source: Optional device name; the series keys become ``(source, metric)``.
+        """
+        for metric, (ts, val) in to_columns(table).items():
+            self.add_columns(metric if source is None else (source, metric), ts, val)
+
+    def add_columns(self, key, ts, val):
+        """
+        Add the samples of one series given as timestamp and value arrays.
+        """
+        ts = np.asarray(ts, np.int64)
+        val = np.asarray(val, np.float64)
+        keep = ~np.isnan(val)
+        if not keep.any():
+            return
+        ts, val = ts[keep], val[keep]
+        newest = int(ts.max())
+        aligned = ts - ts % self.step
+        # compare slot times, a sample just inside the retention can still
+        # share its slot with the newest one
+        keep = aligned > newest - newest % self.step - self.slots * self.step
+        aligned, val = aligned[keep], val[keep]
+        idx = (aligned // self.step) % self.slots
+
+        # data older than what a slot holds has already rolled out
+        current = self.ts[idx]
+        keep = aligned >= current
+        aligned, idx, val = aligned[keep], idx[keep], val[keep]
+        renew = aligned > self.ts[idx]
+        if renew.any():
+            slots = idx[renew]
+            self.ts[slots] = aligned[renew]
+            self.values[:, slots] = np.nan
+            if self._counts is not None:
+                self._counts[:, slots] = 0
+
+        row = self.row(key)
+        values = self.values[row]
+        if self.agg == "last":
+            order = np.argsort(aligned, kind="stable")
+            values[idx[order]] = val[order]
+        elif self.agg == "sum":
+            values[idx] = np.nan_to_num(values[idx])
+            np.add.at(values, idx, val)
+        else:
+            counts = self._counts[row]
+            sums = np.nan_to_num(values[idx]) * counts[idx]
+            values[idx] = sums
+            np.add.at(values, idx, val)
+            np.add.at(counts, idx, 1)
+            values[idx] /= counts[idx]
+        if self.latest is None or newest > self.latest:
+            self.latest = newest - newest % self.step
+
+    def _rows(self, keys):
+        if keys is None:
+            return list(self.keys.values())
+        if isinstance(keys, (str, tuple)):
+            keys = [keys]
+        return [self.keys[key] for key in keys]
+
+    def frame(self, keys=None, start=None, end=None):
+        """
+        Return the aligned series in time order.
+
+        :param keys: Series keys, default all in insertion order.
+        :param start: First Unix time to include (default: oldest kept).
+        :param end: Last Unix time to include (default: newest).
+        :return: A tuple (ts, values) with the ``int64`` slot times and a
+                 ``float64`` matrix with one row per key; slots without data
+                 are NaN.
+        """
+        rows = self._rows(keys)
+        if self.latest is None:
+            return np.empty(0, np.int64), np.empty((len(rows), 0))
+        grid = self.latest - self.step * np.arange(self.slots - 1, -1, -1, dtype=np.int64)
+        if start is not None:
+            grid = grid[grid >= start - start % self.step]
+        if end is not None:
+            grid = grid[grid <= end]
+        idx = (grid // self.step) % self.slots
+        values = self.values[np.ix_(rows, idx)]
+        values[:, self.ts[idx] != grid] = np.nan
+        return grid, values
+
+    def series(self, key):
+        """
+        Return the samples of one series as ``(ts, val)`` arrays without gaps.
+        """
+        ts, values = self.frame([key])
+        keep = ~np.isnan(values[0])
+        return ts[keep], values[0][keep]
+
+    def last(self, keys=None):
+        """
+        Return the most recent value of every series, NaN for none.
+        """
+        _, values = self.frame(keys)
+        valid = ~np.isnan(values)
+        if not values.shape[1]:
+            return np.full(len(values), np.nan)
+        pos = values.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+        result = values[np.arange(len(values)), pos]
+        result[~valid.any(axis=1)] = np.nan
+        return result
+
+    def delta(self, keys=None, start=None, end=None):
+        """
+        Differences between consecutive slots, e.g. for cumulative counters.
+
+        :return: A tuple (ts, deltas) where ``ts`` are the later slot times.
+        """
+        ts, values = self.frame(keys, start, end)
+        return ts[1:], np.diff(values, axis=1)
+
+    def derivative(self, keys=None, start=None, end=None):
+        """
+        Change per second between consecutive samples of each series.
+
+        Gaps are bridged, so the result is defined at every slot that has a
+        sample and a preceding sample somewhere before it.
+
+        :return: A tuple (ts, rates).
+        """
+        ts, values = self.frame(keys, start, end)
+        valid = ~np.isnan(values)
+        # index of the last valid slot at or before each slot
+        pos = np.where(valid, np.arange(values.shape[1]), -1)
+        np.maximum.accumulate(pos, axis=1, out=pos)
+        prev = np.concatenate([np.full((len(values), 1), -1), pos[:, :-1]], axis=1)
+        rows = np.arange(len(values))[:, None]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            dv = values - values[rows, np.maximum(prev, 0)]
+            dt = ts[None, :] - ts[np.maximum(prev, 0)]
+            result = dv / dt
+        result[~valid | (prev < 0)] = np.nan
+        return ts, result
+
+    def rate(self, keys=None, window=60, end=None):
+        """
+        Average per second over the last ``window`` seconds, for per-interval
+        counts such as ``rx_bytes``.
+
+        :return: Array with one rate per key, NaN if there was no sample.
+        """
+        end = self.latest if end is None else end
+        if end is None:
+            return np.full(len(self._rows(keys)), np.nan)
+        _, values = self.frame(keys, end - window + self.step, end)
+        with np.errstate(invalid="ignore"):
+            total = np.nansum(values, axis=1)
+        total[np.isnan(values).all(axis=1)] = np.nan
+        return total / window
+
+    def resample(self, step, keys=None, how="mean", start=None, end=None):
+        """
+        Aggregate the series onto a coarser grid.
+
+        :param step: New slot width in seconds, a multiple of the store's step.
+        :param how: "mean", "sum", "min", "max" or "last".
+        :return: A tuple (ts, values) on the new grid.
+        """
+        if step % self.step:
+            raise ValueError(f"step must be a multiple of {self.step}")
+        ts, values = self.frame(keys, start, end)
+        if not len(ts):
+            return ts, values
+        # pad at the front so that buckets start at multiples of step
+        pad = int((ts[0] % step) // self.step)
+        factor = step // self.step
+        total = pad + len(ts)
+        total += -total % factor
+        padded = np.full((len(values), total), np.nan)
+        padded[:, pad:pad + len(ts)] = values
+        buckets = padded.reshape(len(values), -1, factor)
+        grid = ts[0] - ts[0] % step + step * np.arange(buckets.shape[1], dtype=np.int64)
+        with np.errstate(invalid="ignore"), warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            if how == "last":
+                valid = ~np.isnan(buckets)
+                pos = factor - 1 - np.argmax(valid[:, :, ::-1], axis=2)
+                result = np.take_along_axis(buckets, pos[:, :, None], axis=2)[:, :, 0]
+            elif how in ("mean", "sum", "min", "max"):
+                result = getattr(np, "nan" + how)(buckets, axis=2)
+                if how == "sum":
+                    result[np.isnan(buckets).all(axis=2)] = np.nan
+            else:
+                raise ValueError(f"Invalid how: {how}. Must be one of: mean, sum, min, max, last.")
+        return grid, result
+
+
+FleetResult = collections.namedtuple(
+    "FleetResult", ["host", "product", "ok", "value", "error", "attempts", "elapsed"])
+FleetResult.__doc__ = """
+Outcome of one fleet operation on one device.
+
+``value`` holds the return value on success, ``error`` the last exception
+on failure. ``elapsed`` is the wall time in seconds including retries.
+"""
+
+
+class Fleet:
+    """
+    Run one operation on many devices in parallel.
+
+    The inventory is a list of dicts with ``host``, ``user``, ``password``
+    and optionally ``product``. Device objects (and with them their SIDs
+    and pooled connections) are kept between runs::
+
+        fleet = jsonrpcdevice.Fleet.from_file("inventory.csv", max_workers=64)
+        for r in fleet.run(lambda dev: dev.config_set_commit({"ntp_service": "enabled"})):
+            print(r.host, "ok" if r.ok else r.error)
+        print(fleet.summary())
+
+    By default an operation is only retried if the device could not be
+    connected to, so a call that may already have been executed (e.g. a
+    commit whose answer timed out) is not repeated. Pass
+    ``idempotent=True`` to :meth:`run` for read-only operations to also
+    retry the errors in :attr:`retry_on`.
+    """
+
+    #: Errors worth retrying for an idempotent operation; anything else fails
+    #: the device immediately.
+    retry_on = (TransportError, DeviceBusy,
+                requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+    def __init__(self, inventory, max_workers=32, timeout=30.0, retries=2,
+                 backoff=1.0, rate_limit=None, deadline=None, **device_kwargs):
+        """
+        :param inventory: Iterable of dicts with host, user, password and product.
+        :param max_workers: Number of devices worked on at the same time (default: 32).
+        :param timeout: Per-request timeout in seconds for each device (default: 30.0).
+        :param retries: Retries per device after a connection error, see :meth:`run` (default: 2).
+        :param backoff: Base delay in seconds of the exponential, jittered retry backoff (default: 1.0).
+        :param rate_limit: Maximum number of devices started per second, None for no limit.
+        :param deadline: Seconds after the first attempt on a device after which no
+                         retry is started (default: ``timeout * (retries + 1)``).
+        :param device_kwargs: Further arguments for :class:`AdstecJSONRPCDevice`.
+        """
+        self.inventory = [dict(entry) for entry in inventory]
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.retries = retries
+        self.deadline = timeout * (retries + 1) if deadline is None else deadline
+        self.backoff = backoff
+        self.rate_limit = rate_limit
+        self.device_kwargs = device_kwargs
+        self.devices = {}
+        self.results = []
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    @classmethod
+    def from_file(cls, filename, **kwargs):
+        """
+        Create a fleet from a JSON list or a CSV file with a header line
+        ``host,user,password[,product]``.
+        """
+        with open(filename, newline="") as f:
+            if filename.endswith(".json"):
+                inventory = json.load(f)
+            else:
+                inventory = list(csv.DictReader(f))
+        return cls(inventory, **kwargs)
+
+    def device(self, entry):
+        """
+        Return the (cached) device object for an inventory entry.
+        """
+        host = entry["host"]
+        with self._lock:
+            dev = self.devices.get(host)
+            if dev is None:
+                kwargs = dict(self.device_kwargs)
+                kwargs.setdefault("timeout", self.timeout)
+                kwargs.setdefault("pool_maxsize", 1)
+                dev = AdstecJSONRPCDevice(host, entry["user"], entry["password"], **kwargs)
+                self.devices[host] = dev
+        return dev
+
+    def _throttle(self):
+        if not self.rate_limit:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + 1.0 / self.rate_limit
+        if start > now:
+            time.sleep(start - now)
+
+    def _retryable(self, error, idempotent):
+        if idempotent:
+            return isinstance(error, self.retry_on)
+        return _connect_failed(error)
+
+    def _run_one(self, entry, func, idempotent):
+        self._throttle()
+        dev = self.device(entry)
+        start = time.monotonic()
+        deadline = start + self.deadline
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                value = func(dev)
+                return FleetResult(entry["host"], entry.get("product"), True, value,
+                                   None, attempts, time.monotonic() - start)
+            except Exception as e:
+                error = e
+            if attempts > self.retries or not self._retryable(error, idempotent):
+                break
+            delay = self.backoff * 2 ** (attempts - 1) * random.uniform(0.5, 1.0)
+            if time.monotonic() + delay >= deadline:
+                break
+            time.sleep(delay)
+        return FleetResult(entry["host"], entry.get("product"), False, None,
+                           error, attempts, time.monotonic() - start)
+
+    def run(self, func, hosts=None, idempotent=False):
+        """
+        Call ``func(dev)`` for every device and yield a :class:`FleetResult`
+        per device as soon as it is done.
+
+        A device is retried up to ``retries`` times, but no retry is started
+        once its ``deadline`` has passed (a running request still gets its
+        ``timeout``).
+
+        :param func: Callable taking an :class:`AdstecJSONRPCDevice`.
+        :param hosts: Optional subset of hosts to run on.
+        :param idempotent: True if ``func`` may safely run twice, e.g. only
+                           reads; then timeouts and the other errors in
+                           :attr:`retry_on` are retried too. Otherwise only a
+                           failed connection is retried (default: False).
+        """
+        entries = self.inventory
+        if hosts is not None:
+            hosts = set(hosts)
+            entries = [e for e in entries if e["host"] in hosts]
+        self.results = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self._run_one, entry, func, idempotent)
+                       for entry in entries]
+            for future in as_completed(futures):
+                result = future.result()
+                self.results.append(result)
+                yield result
+
+    def map(self, func, hosts=None, idempotent=False):
+        """
+        Like :meth:`run`, but wait for all devices and return the results
+        in inventory order.
+        """
+        order = {entry["host"]: i for i, entry in enumerate(self.inventory)}
+        return sorted(self.run(func, hosts, idempotent), key=lambda r: order[r.host])
+
+    def call(self, obj, method, idempotent=False, **params):
+        """
+        Make the same JSON/RPC call on every device, see :meth:`map`.
+        """
+        return self.map(lambda dev: dev.call(obj, method, **params), idempotent=idempotent)
+
+    def summary(self, results=None):
+        """
+        Summarize the results of the last run.
+
+        :return: Dictionary with device counts, latency statistics in
+                 seconds and the error message per failed host.
+        """
+        results = self.results if results is None else results
+        latencies = sorted(r.elapsed for r in results if r.ok)
+        summary = {
+            "total": len(results),
+            "succeeded": len(latencies),
+            "failed": len(results) - len(latencies),
+            "errors": {r.host: str(r.error) for r in results if not r.ok},
+        }
+        if latencies:
+            summary["latency"] = {
+                "min": latencies[0],
+                "median": latencies[len(latencies) // 2],
+                "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+                "max": latencies[-1],
+            }
+        return summary
+
+    def close(self):
+        """
+        Close the pooled connections of all devices.
+        """
+        for dev in self.devices.values():
+            dev.close()
+
+    def logout(self):
+        """
+        Log out of all devices that have a session.
+        """
+        for dev in self.devices.values():
+            if dev.sid:
+                try:
+                    dev.logout()
+                except Exception:
+                    pass
+        self.close()
+
+
+PollStats = collections.namedtuple(
+    "PollStats", ["polls", "skipped", "errors", "lag", "max_lag", "duration", "last_error"])
+PollStats.__doc__ = """
+Per-device statistics of a :class:`PollScheduler`.
+
+``lag`` is how late (in seconds) the last poll started after its scheduled
+grid time, ``max_lag`` the largest lag so far and ``duration`` the run time
+of the last poll. ``skipped`` counts ticks dropped because the previous
+poll of the device was still running.
+"""
+
+
+class PollScheduler:
+    """
+    Call a function for many devices on a fixed time grid.
+
+    Every device is polled at ``phase + k * interval`` on the wall clock, so
+    the cycle does not drift by the time the polls take. The phase is
+    derived from the device name and spreads the devices evenly over
+    ``jitter`` seconds, which avoids a burst of requests at the start of
+    every interval; it stays the same across restarts. If a device is still
+    busy with its previous poll when its next tick comes, that tick is
+    skipped instead of queued::
+
+        def poll(name, dev):
+            print(name, dev.status("uptimesec"))
+
+        scheduler = jsonrpcdevice.PollScheduler(devices, poll, interval=10)
+        scheduler.run()               # until scheduler.stop()
+        print(scheduler.stats())
+
+    ``func(name, device)`` runs in a pool of ``max_workers`` threads; an
+    exception counts as an error of that poll and does not affect others.
+    """
+
+    def __init__(self, devices, func, interval=10.0, jitter=None, max_workers=32):
+        """
+        :param devices: :class:`Fleet`, dictionary of name to device, or list
+                        of devices (named by their target).
+        :param func: Callable taking the device name and the device.
+        :param interval: Seconds between the polls of one device (default: 10.0).
+        :param jitter: Seconds over which the devices' phases are spread
+                       (default: the whole interval).
+        :param max_workers: Number of polls running at the same time (default: 32).
+        """
+        self.devices = _device_dict(devices)
+        self.func = func
+        self.interval = interval
+        self.jitter = interval if jitter is None else jitter
+        self.max_workers = max_workers
+        self._stats = {name: [0, 0, 0, 0.0, 0.0, 0.0, None] for name in self.devices}
+        self._busy = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def phase(self, name):
+        """
+        Return the offset of a device's ticks within the interval in seconds.
+        """
+        return zlib.crc32(str(name).encode()) / 2 ** 32 * self.jitter
+
+    def _next_tick(self, name, after):
+        phase = self.phase(name)
+        return ((after - phase) // self.interval + 1) * self.interval + phase
+
+    def run(self, duration=None):
+        """
+        Poll until :meth:`stop` is called or ``duration`` seconds have passed.
+        """
+        self._stop.clear()
+        now = time.time()
+        end = None if duration is None else now + duration
+        heap = [(self._next_tick(name, now), name) for name in self.devices]
+        heapq.heapify(heap)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while heap and not self._stop.is_set():
+                tick, name = heap[0]
+                if end is not None and tick >= end:
+                    break
+                if self._stop.wait(max(0.0, tick - time.time())):
+                    break
+                now = time.time()
+                with self._lock:
+                    stats = self._stats[name]
+                    if name in self._busy:
+                        stats[1] += 1
+                        start = False
+                    else:
+                        self._busy.add(name)
+                        start = True
+                if start:
+                    executor.submit(self._poll, name, tick)
+                # after a stall (e.g. suspend) continue with the next future tick
+                next_tick = tick + self.interval
+                if next_tick <= now:
+                    missed = int((now - tick) // self.interval)
+                    with self._lock:
+                        stats[1] += missed
+                    next_tick = self._next_tick(name, now)
+                heapq.heapreplace(heap, (next_tick, name))
+
+    def _poll(self, name, tick):
+        start = time.time()
+        error = None
+        try:
+            self.func(name, self.devices[name])
+        except Exception as e:
+            error = e
+        finally:
+            duration = time.time() - start
+            lag = max(0.0, start - tick)
+            with self._lock:
+                stats = self._stats[name]
+                stats[0] += 1
+                if error is not None:
+                    stats[2] += 1
+                    stats[6] = error
+                stats[3] = lag
+                stats[4] = max(stats[4], lag)
+                stats[5] = duration
+                self._busy.discard(name)
+
+    def stop(self):
+        """
+        Make :meth:`run` return; polls already running are finished first.
+        """
+        self._stop.set()
+
+    def stats(self):
+        """
+        :return: Dictionary of :class:`PollStats` per device name.
+        """
+        with self._lock:
+            return {name: PollStats(*stats) for name, stats in self._stats.items()}
+
+
+def _device_dict(devices):
+    if isinstance(devices, Fleet):
+        return {entry["host"]: devices.device(entry) for entry in devices.inventory}
+    if isinstance(devices, dict):
+        return devices
+    return {dev.target: dev for dev in devices}
+
+
+class MetricArchive:
+    """
+    Append-only on-disk archive of datacollection samples with rollups.
+
+    The device keeps only about 10 minutes of data; the archive keeps it as
+    long as ``retention`` says. Every device/metric pair has one file per
+    level: raw samples (1 s) and 1 min and 1 h rollups. Files are arrays of
+    fixed-size little-endian records in time order, appended with a single
+    write and read through ``numpy.memmap``, so a query is a binary search
+    and a slice. Rows rather than one file per field keep an append, which a
+    collector does for every metric of every device on each poll, to a
+    single write per level::
+
+        archive = jsonrpcdevice.MetricArchive("/var/lib/adstec-metrics")
+        archive.append("10.0.0.1", stream.poll())
+        ts, cpu = archive.query("10.0.0.1", "system.cpu", start=time.time() - 86400)
+
+    Raw records hold ``ts`` and ``val``; rollup records hold ``ts``, the mean
+    as ``val``, ``min``, ``max`` and ``count``. A rollup bucket is written
+    when the first sample of the next bucket arrives, so queries never see
+    a partial bucket. Samples that are not newer than the last archived one
+    are ignored, which makes overlapping appends harmless.
+
+    Appends for one device must come from one thread at a time, and
+    :meth:`compact` must not run for a device while it is appended to.
+    Requires ``pip install numpy``.
+    """
+
+    #: Rollup levels in seconds; each is built from the one before.
+    levels = (1, 60, 3600)
+
+    #: Default seconds of data kept per level.
+    default_retention = {1: 86400, 60: 30 * 86400, 3600: 5 * 365 * 86400}
+
+    def __init__(self, directory, retention=None):
+        """
+        :param directory: Directory holding one subdirectory per device.
+        :param retention: Dictionary of seconds kept per level, merged with
+                          :attr:`default_retention`.
+        """
+        if np is None:
+            raise ImportError("MetricArchive requires numpy: pip install numpy")
+        self.directory = directory
+        self.retention = dict(self.default_retention)
+        self.retention.update(retention or {})
+        self.raw_dtype = np.dtype([("ts", "<i8"), ("val", "<f8")])
+        self.rollup_dtype = np.dtype([("ts", "<i8"), ("val", "<f8"), ("min", "<f8"),
+                                      ("max", "<f8"), ("count", "<i8")])
+        # (device, metric) -> [last raw ts, {step: open bucket}]
+        self._state = {}
+        self._dirs = set()
+
+    def _dtype(self, step):
+        return self.raw_dtype if step == self.levels[0] else self.rollup_dtype
+
+    def path(self, device, metric, step=1):
+        """
+        Return the file holding a device's metric at one level.
+        """
+        name = quote(metric, safe=".-_")
+        return os.path.join(self.directory, quote(device, safe=".-_"), f"{name}.{step}")
+
+    def devices(self):
+        """
+        Return the names of all archived devices.
+        """
+        try:
+            return sorted(unquote(d) for d in os.listdir(self.directory))
+        except FileNotFoundError:
+            return []
+
+    def metrics(self, device):
+        """
+        Return the names of all archived metrics of a device.
+        """
+        directory = os.path.join(self.directory, quote(device, safe=".-_"))
+        suffix = f".{self.levels[0]}"
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return []
+        return sorted(unquote(n[:-len(suffix)]) for n in names if n.endswith(suffix))
+
+    def _read(self, path, step):
+        try:
+            if os.path.getsize(path) == 0:
+                return np.empty(0, self._dtype(step))
+        except FileNotFoundError:
+            return np.empty(0, self._dtype(step))
+        return np.memmap(path, dtype=self._dtype(step), mode="r")
+
+    def _write(self, path, data):
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+    def _load_state(self, device, metric):
+        # rebuild the open buckets from the tail of the level below, so a
+        # restarted collector continues the rollups where it stopped
+        base = self.path(device, metric, "")[:-1]
+        raw = self._read(f"{base}.{self.levels[0]}", self.levels[0])
+        last = int(raw["ts"][-1]) if len(raw) else None
+        buckets = {}
+        below, below_step = raw, self.levels[0]
+        for step in self.levels[1:]:
+            if len(below):
+                start = int(below["ts"][-1]) // step * step
+                tail = below[np.searchsorted(below["ts"], start):]
+                buckets[step] = self._bucket(tail, below_step, start)
+            below, below_step = self._read(f"{base}.{step}", step), step
+        directory = os.path.dirname(base)
+        if directory not in self._dirs:
+            os.makedirs(directory, exist_ok=True)
+            self._dirs.add(directory)
+        state = self._state[device, metric] = [last, buckets, base]
+        return state
+
+    def _bucket(self, records, step, start):
+        if step == self.levels[0]:
+            vals = records["val"]
+            return [start, float(vals.sum()), float(vals.min()), float(vals.max()), len(vals)]
+        counts = records["count"]
+        return [start, float((records["val"] * counts).sum()), float(records["min"].min()),
+                float(records["max"].max()), int(counts.sum())]
+
+    def append(self, device, table):
+        """
+        Archive a ``get_values_as_table`` result or :meth:`MetricStream.poll` output.
+
+        :return: Number of samples written.
+        """
+        if isinstance(table.get("result"), dict):
+            table = table["result"]
+        written = 0
+        for metric, points in table.items():
+            if points and isinstance(points[0], dict):
+                samples = [(p["ts"], p["val"]) for p in points if p["val"] is not None]
+            else:
+                samples = [(ts, val) for ts, val in points if val is not None]
+            written += self._append(device, metric, samples)
+        return written
+
+    def append_columns(self, device, metric, ts, val):
+        """
+        Archive the samples of one metric given as timestamp and value arrays.
+
+        :return: Number of samples written.
+        """
+        # NaN != NaN drops the missing values
+        samples = [(int(t), float(v)) for t, v in zip(ts, val) if v == v and v is not None]
+        return self._append(device, metric, samples)
+
+    def _append(self, device, metric, samples):
+        # plain Python is faster than NumPy for the ~10 samples of one poll
+        state = self._state.get((device, metric)) or self._load_state(device, metric)
+        last, buckets, base = state
+        if not samples:
+            return 0
+        times = [s[0] for s in samples]
+        if any(map(operator.ge, times, itertools.islice(times, 1, None))):
+            samples = sorted(dict(samples).items())
+            times = [s[0] for s in samples]
+        if last is not None and times[0] <= last:
+            first = bisect.bisect_right(times, last)
+            samples, times = samples[first:], times[first:]
+            if not samples:
+                return 0
+        self._write(f"{base}.{self.levels[0]}",
+                    struct.pack("<" + "qd" * len(samples), *itertools.chain.from_iterable(samples)))
+        state[0] = samples[-1][0]
+
+        # the samples of a poll fall into one or two minutes: sum them up
+        # per minute first, then feed completed buckets of each level into
+        # the next one
+        step = self.levels[1]
+        bucket = buckets.get(step)
+        if bucket is not None and times[-1] < bucket[0] + step:
+            # all in the open minute, which holds the last sample before them
+            vals = [val for _, val in samples]
+            bucket[1] += sum(vals)
+            bucket[2] = min(bucket[2], min(vals))
+            bucket[3] = max(bucket[3], max(vals))
+            bucket[4] += len(vals)
+            return len(samples)
+        records = []
+        i = 0
+        while i < len(times):
+            start = times[i] - times[i] % step
+            j = bisect.bisect_left(times, start + step, i)
+            vals = [val for _, val in samples[i:j]]
+            records.append((start, sum(vals), min(vals), max(vals), j - i))
+            i = j
+        for step in self.levels[1:]:
+            bucket = buckets.get(step)
+            done = []
+            for ts, total, low, high, count in records:
+                start = ts - ts % step
+                if bucket is not None and bucket[0] == start:
+                    bucket[1] += total
+                    if low < bucket[2]:
+                        bucket[2] = low
+                    if high > bucket[3]:
+                        bucket[3] = high
+                    bucket[4] += count
+                    continue
+                if bucket is not None:
+                    done.append(tuple(bucket))
+                bucket = [start, total, low, high, count]
+            buckets[step] = bucket
+            if not done:
+                break
+            self._write(f"{base}.{step}", b"".join(
+                struct.pack("<qdddq", ts, total / count, low, high, count)
+                for ts, total, low, high, count in done))
+            records = done
+        return len(samples)
+
+    def query(self, device, metric, start=None, end=None, step=None, field="val"):
+        """
+        Read archived data of one metric.
+
+        :param start: First Unix time (default: oldest archived).
+        :param end: Last Unix time (default: newest archived).
+        :param step: Level to read (1, 60 or 3600). By default the finest
+                     level whose retention still covers ``start``.
+        :param field: Column to return; rollups have "val" (mean), "min",
+                      "max" and "count".
+        :return: A tuple (ts, values) of NumPy arrays.
+        """
+        if step is None:
+            step = self.levels[-1]
+            for level in self.levels:
+                if start is None or start >= time.time() - self.retention[level]:
+                    step = level
+                    break
+        data = self._read(self.path(device, metric, step), step)
+        ts = data["ts"]
+        first = 0 if start is None else np.searchsorted(ts, start, "left")
+        last = len(ts) if end is None else np.searchsorted(ts, end, "right")
+        return np.array(ts[first:last]), np.array(data[field][first:last])
+
+    def compact(self, now=None, devices=None):
+        """
+        Drop records older than the retention of their level.
+
+        :param devices: Devices to compact (default: all).
+        :return: Number of records removed.
+        """
+        now = time.time() if now is None else now
+        removed = 0
+        for device in self.devices() if devices is None else devices:
+            for metric in self.metrics(device):
+                for step in self.levels:
+                    path = self.path(device, metric, step)
+                    data = self._read(path, step)
+                    cut = int(np.searchsorted(data["ts"], now - self.retention[step], "left"))
+                    if cut == 0:
+                        continue
+                    tmp = path + ".tmp"
+                    with open(tmp, "wb") as f:
+                        f.write(data[cut:].tobytes())
+                    del data
+                    os.replace(tmp, path)
+                    removed += cut
+        return removed
+
+
+class MetricCollector:
+    """
+    Daemon that polls datacollection on many devices into a :class:`MetricArchive`.
+
+    Every device gets a :class:`MetricStream`, so each poll only transfers
+    the samples that arrived since the previous one::
+
+        fleet = jsonrpcdevice.Fleet.from_file("inventory.csv")
+        archive = jsonrpcdevice.MetricArchive("/var/lib/adstec-metrics")
+        collector = jsonrpcdevice.MetricCollector(archive, fleet)
+        collector.run()    # until collector.stop()
+
+    Errors of single devices are kept in :attr:`errors` and do not stop the
+    others; the next poll of the device simply catches up.
+    """
+
+    def __init__(self, archive, devices, metrics=None, interval=10, max_workers=32,
+                 compact_interval=3600):
+        """
+        :param archive: :class:`MetricArchive` to write to.
+        :param devices: :class:`Fleet`, dictionary of name to
+                        :class:`AdstecJSONRPCDevice`, or list of devices
+                        (named by their target).
+        :param metrics: Metric names to collect, or a function selecting names
+                        from what each device reports in ``get_metrics``;
+                        by default all of them.
+        :param interval: Seconds between polls (default: 10, the device's
+                         collection interval).
+        :param max_workers: Number of devices polled at the same time (default: 32).
+        :param compact_interval: Seconds between retention runs per device (default: 3600).
+        """
+        self.archive = archive
+        self.devices = _device_dict(devices)
+        self.metrics = metrics
+        self.interval = interval
+        self.max_workers = max_workers
+        self.compact_interval = compact_interval
+        self.streams = {}
+        self.errors = {}
+        self.polls = 0
+        self.samples = 0
+        self.scheduler = None
+        self._next_compact = {}
+        self._lock = threading.Lock()
+
+    def _poll(self, name):
+        stream = self.streams.get(name)
+        if stream is None:
+            dev = self.devices[name]
+            metrics = self.metrics
+            if metrics is None or callable(metrics):
+                available = dev.call("datacollection", "get_metrics").get("result", [])
+                metrics = [m for m in available if self.metrics is None or self.metrics(m)]
+            stream = self.streams[name] = MetricStream(dev, metrics)
+        written = self.archive.append(name, stream.poll())
+        # compacting in the device's own poll keeps it apart from its appends
+        now = time.monotonic()
+        if now >= self._next_compact.setdefault(name, now + self.compact_interval):
+            self.archive.compact(devices=[name])
+            self._next_compact[name] = now + self.compact_interval
+        return written
+
+    def _collect(self, name, dev=None):
+        try:
+            written = self._poll(name)
+        except Exception as e:
+            self.errors[name] = e
+            raise
+        self.errors.pop(name, None)
+        with self._lock:
+            self.polls += 1
+            self.samples += written
+        return written
+
+    def collect_once(self, executor=None):
+        """
+        Poll every device once and archive the new samples.
+
+        :return: Dictionary of the number of samples written per device;
+                 failed devices are missing and listed in :attr:`errors`.
+        """
+        own = executor is None
+        if own:
+            executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            futures = {executor.submit(self._collect, name): name for name in self.devices}
+            written = {}
+            for future in as_completed(futures):
+                if future.exception() is None:
+                    written[futures[future]] = future.result()
+        finally:
+            if own:
+                executor.shutdown()
+        return written
+
+    def run(self, duration=None):
+        """
+        Poll every device every ``interval`` seconds on a :class:`PollScheduler`
+        grid until :meth:`stop` is called or ``duration`` seconds have passed.
+        Per-device lag and skipped ticks are in ``collector.scheduler.stats()``.
+        """
+        self.scheduler = PollScheduler(self.devices, self._collect, self.interval,
+                                       max_workers=self.max_workers)
+        self.scheduler.run(duration)
+
+    def stop(self):
+        """
+        Make :meth:`run` return after the polls in progress.
+        """
+        if self.scheduler is not None:
+            self.scheduler.stop()
+
+
+RebootResult = collections.namedtuple(
+    "RebootResult", ["name", "device", "ok", "offline", "online", "booted", "probes", "error"])
+RebootResult.__doc__ = """
+Outcome of a :class:`RebootWaiter` for one device.
+
+``offline``, ``online`` and ``booted`` are the seconds from the start of the
+wait until the device stopped accepting connections, completed a TLS
+handshake again and reported ``boot_finished``; None if the phase was not
+seen. ``device`` is the device object that was waited on, ready for further
+calls. ``error`` is the TimeoutError if the device did not boot in time.
+"""
+
+
+class _RebootState:
+    __slots__ = ("index", "name", "device", "host", "port", "address", "phase", "interval",
+                 "sock", "deadline", "future", "offline", "online", "booted", "probes", "error")
+
+    def __init__(self, index, name, device, phase, interval):
+        self.index = index
+        self.name = name
+        self.device = device
+        self.host, self.port = _host_port(device.target)
+        self.address = None
+        self.phase = phase
+        self.interval = interval
+        self.sock = None
+        self.deadline = None
+        self.future = None
+        self.offline = self.online = self.booted = None
+        self.probes = 0
+        self.error = None
+
+
+def _host_port(target, port=443):
+    """
+    Split a device target into host and port, e.g. ``[fd00::1]:8443``.
+    """
+    host, sep, rest = target.rpartition(":")
+    if sep and rest.isdigit() and (host.endswith("]") or ":" not in host):
+        return host.strip("[]"), int(rest)
+    return target.strip("[]"), port
+
+
+class RebootWaiter:
+    """
+    Wait for devices to reboot and finish booting, many at the same time.
+
+    Each device goes through three phases, each probed only as far as
+    needed:
+
+    1. **offline** -- TCP connects to the HTTPS port fail (skipped with
+       ``expect_offline=False``),
+    2. **online** -- a TCP connect succeeds, then a TLS handshake,
+    3. **booted** -- ``status("boot_finished")`` answers ``"yes"``.
+
+    TCP probes of all devices run non-blocking in one thread; TLS handshakes
+    and status calls run in a small thread pool. A device that is up, before
+    the reboot or once its TLS handshake succeeded, is probed every
+    ``min_interval``: the next change is near and the probes are cheap (a
+    TCP connect, or a status call on the pooled connection). While a device
+    is down, the pause grows by half up to ``max_interval`` as long as
+    nothing changes, and drops back to ``min_interval`` when the connection
+    is refused, which means the network is up and the web server is about
+    to start::
+
+        dev.upload_file("firmware", "image.bin")
+        result = jsonrpcdevice.RebootWaiter(timeout=600).wait(dev)
+        print(result.offline, result.online, result.booted)
+        print(result.device.status("imageversion"))
+
+    The device objects are reused: their pooled connections are dropped and
+    the next call logs in again.
+    """
+
+    def __init__(self, timeout=900.0, min_interval=0.25, max_interval=2.0, probe_timeout=2.0,
+                 expect_offline=True, max_workers=16, on_phase=None):
+        """
+        :param timeout: Seconds until a device that has not booted is given
+                        up (default: 900.0); None waits forever.
+        :param min_interval: Pause between two probes of a device that is up,
+                             and the shortest one of a device that is down (default: 0.25).
+        :param max_interval: Longest pause between two probes of a device that
+                             is down (default: 2.0).
+        :param probe_timeout: Timeout of a TCP connect or TLS handshake (default: 2.0).
+        :param expect_offline: Wait for the device to go down first, e.g.
+                               right after triggering a reboot (default: True).
+        :param max_workers: Number of TLS and status probes at the same time (default: 16).
+        :param on_phase: Optional callback ``on_phase(name, phase, elapsed)``
+                         with phase ``"offline"``, ``"online"`` or ``"booted"``.
+        """
+        self.timeout = timeout
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.probe_timeout = probe_timeout
+        self.expect_offline = expect_offline
+        self.max_workers = max_workers
+        self.on_phase = on_phase
+        self._tls = ssl.create_default_context()
+        self._tls.check_hostname = False
+        self._tls.verify_mode = ssl.CERT_NONE
+
+    def wait(self, device):
+        """
+        Wait for a single device.
+
+        :param device: :class:`AdstecJSONRPCDevice`.
+        :return: :class:`RebootResult`.
+        """
+        return self.wait_all([device])[device.target]
+
+    def wait_all(self, devices):
+        """
+        Wait until all devices have booted or timed out.
+
+        :param devices: :class:`Fleet`, dictionary of name to device, or list
+                        of devices (named by their target).
+        :return: Dictionary of :class:`RebootResult` per device name.
+        """
+        start = time.monotonic()
+        first = "up" if self.expect_offline else "down"
+        states = [_RebootState(i, name, dev, first, self.min_interval)
+                  for i, (name, dev) in enumerate(_device_dict(devices).items())]
+        heap = [(start, state.index) for state in states]
+        selector = selectors.DefaultSelector()
+        wake_r, wake_w = socket.socketpair()
+        wake_r.setblocking(False)
+        selector.register(wake_r, selectors.EVENT_READ)
+        probing = {}
+        running = set()
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                while any(state.phase != "done" for state in states):
+                    now = time.monotonic()
+                    while heap and heap[0][0] <= now:
+                        state = states[heapq.heappop(heap)[1]]
+                        if state.phase == "done":
+                            continue
+                        state.probes += 1
+                        if state.phase == "boot":
+                            state.future = executor.submit(self._probe_boot, state)
+                            state.future.add_done_callback(lambda f: wake_w.send(b"\0"))
+                            running.add(state)
+                        else:
+                            err = self._connect(state)
+                            if err is None:
+                                selector.register(state.sock, selectors.EVENT_WRITE, state)
+                                probing[state] = state.sock
+                            else:
+                                self._tcp_done(state, heap, now - start, err)
+                    waits = [state.deadline for state in probing]
+                    if heap:
+                        waits.append(heap[0][0])
+                    if self.timeout is not None:
+                        waits.append(start + self.timeout)
+                    wait = max(0.0, min(waits) - time.monotonic()) if waits else None
+                    ready = [key.data for key, _ in selector.select(wait)]
+                    now = time.monotonic()
+                    for state in ready:
+                        if state is None:
+                            wake_r.recv(4096)
+                            continue
+                        sock = probing.pop(state)
+                        selector.unregister(sock)
+                        err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                        self._tcp_done(state, heap, now - start, err)
+                    for state in [state for state in probing if state.deadline <= now]:
+                        selector.unregister(probing.pop(state))
+                        self._tcp_done(state, heap, now - start, errno.ETIMEDOUT)
+                    for state in [state for state in running if state.future.done()]:
+                        running.discard(state)
+                        if state.phase != "done":
+                            self._boot_done(state, heap, now - start)
+                    if self.timeout is not None and now - start >= self.timeout:
+                        for state in states:
+                            if state.phase != "done":
+                                if state in probing:
+                                    selector.unregister(probing.pop(state))
+                                self._give_up(state)
+        finally:
+            for sock in probing.values():
+                selector.unregister(sock)
+                sock.close()
+            selector.close()
+            wake_r.close()
+            wake_w.close()
+        return {s.name: RebootResult(s.name, s.device, s.booted is not None, s.offline,
+                                     s.online, s.booted, s.probes, s.error) for s in states}
+
+    def _connect(self, state):
+        """
+        Start a non-blocking TCP connect; return None while it is in
+        progress, else the error number (0 if connected at once).
+        """
+        try:
+            if state.address is None:
+                info = socket.getaddrinfo(state.host, state.port, type=socket.SOCK_STREAM)[0]
+                state.address = info[0], info[4]
+            state.sock = socket.socket(state.address[0], socket.SOCK_STREAM)
+        except OSError as e:
+            return e.errno or errno.EHOSTUNREACH
+        state.sock.setblocking(False)
+        state.deadline = time.monotonic() + self.probe_timeout
+        err = state.sock.connect_ex(state.address[1])
+        return None if err in (errno.EINPROGRESS, errno.EWOULDBLOCK) else err
+
+    def _tcp_done(self, state, heap, elapsed, err):
+        """
+        Move a device on after a TCP probe with result ``err`` (0: connected).
+        """
+        if state.sock is not None:
+            state.sock.close()
+            state.sock = None
+        if err == 0:
+            if state.phase == "up":
+                # still up, e.g. while flashing the firmware before the reboot
+                self._schedule(state, heap, grow=True)
+            else:
+                state.phase = "boot"
+                self._schedule(state, heap)
+            return
+        if state.phase == "up":
+            state.phase = "down"
+            state.device.close()
+            self._reached(state, "offline", elapsed)
+        # refused: the network is up and the web server is about to start
+        self._schedule(state, heap, grow=err != errno.ECONNREFUSED)
+
+    def _probe_boot(self, state):
+        """
+        TLS handshake until it succeeds once, then ``boot_finished``; runs in the pool.
+        """
+        if state.online is None:
+            with socket.create_connection((state.host, state.port), self.probe_timeout) as sock:
+                self._tls.wrap_socket(sock, server_hostname=state.host).close()
+            return "online"
+        return state.device.status("boot_finished") == "yes"
+
+    def _boot_done(self, state, heap, elapsed):
+        """
+        Move a device on after a TLS or ``boot_finished`` probe.
+        """
+        future, state.future = state.future, None
+        try:
+            result = future.result()
+        except TransportError as e:
+            if e.code is None:
+                # gone again, e.g. a second reboot: back to TCP probes
+                state.phase = "down"
+                state.online = None
+            self._schedule(state, heap, grow=True)
+            return
+        except (OSError, DeviceError):
+            # no TLS yet, or rpcd still starting (login fails, ubus timeouts)
+            if state.online is None:
+                state.phase = "down"
+            self._schedule(state, heap, grow=True)
+            return
+        if result == "online":
+            state.device.close()
+            self._reached(state, "online", elapsed)
+            self._schedule(state, heap)
+        elif result:
+            state.phase = "done"
+            self._reached(state, "booted", elapsed)
+        else:
+            self._schedule(state, heap, grow=True)
+
+    def _schedule(self, state, heap, grow=None):
+        """
+        Queue the next probe: at once (``grow=None``), after the shortest
+        pause (False) or, for a device that is down, after a pause half as
+        long again as the last (True).
+        """
+        delay = 0.0
+        if grow is not None:
+            if grow and state.phase == "down":
+                state.interval = min(state.interval * 1.5, self.max_interval)
+            else:
+                state.interval = self.min_interval
+            delay = state.interval
+        heapq.heappush(heap, (time.monotonic() + delay, state.index))
+
+    def _reached(self, state, phase, elapsed):
+        setattr(state, phase, elapsed)
+        state.interval = self.min_interval
+        if self.on_phase is not None:
+            self.on_phase(state.name, phase, elapsed)
+
+    def _give_up(self, state):
+        waiting = {"up": "offline", "down": "online", "boot": "booted"}[state.phase]
+        if state.sock is not None:
+            state.sock.close()
+            state.sock = None
+        state.error = TimeoutError(f"{state.name}: not {waiting} after {self.timeout}s")
+        state.phase = "done"
+
+
+class FirmwareRollout:
+    """
+    Update the firmware of a fleet in waves, resumable after an interruption.
+
+    ``images`` maps product families to firmware images: each device gets
+    the image of the longest key its product starts with, e.g. ``"IRF3"``
+    for an IRF3821. A value is the image path or a tuple ``(path, version)``;
+    with a version, devices whose ``imageversion`` already contains it are
+    not updated, and the update is only accepted if the new version contains
+    it. Without one, the version must have changed.
+
+    Every device goes through the steps ``uploading``, ``rebooting``,
+    ``booting`` and ``verifying`` and ends ``done``, ``failed`` or
+    ``skipped`` (no image for its product)::
+
+        fleet = jsonrpcdevice.Fleet.from_file("plant.csv")
+        rollout = jsonrpcdevice.FirmwareRollout(
+            fleet, {"IRF3": ("Ads-tec-IRF3xxx-2.2.6.bin", "2.2.6")},
+            state_file="rollout.json", waves=(1, 10, 0.25, 1.0), max_failures=0.02,
+            parallel=8, bandwidth=20e6)
+        print(rollout.run())
+
+    Devices are updated in ``waves`` in inventory order; a wave starts when
+    the previous one has finished. If a device of the first wave (the
+    canary) fails, or more devices than ``max_failures`` fail overall, no
+    further uploads are started; devices that are already flashing are
+    still followed to the end.
+
+    After every step the state of all devices is written to ``state_file``.
+    Running the rollout again with the same file continues where it
+    stopped: finished devices are left alone, uploads that were cut off are
+    restarted, and devices that were rebooting are only waited for and
+    verified.
+    """
+
+    #: Steps after which a device is not touched again (``failed`` only
+    #: with ``retry_failed=False``).
+    final_steps = frozenset({"done", "failed", "skipped"})
+
+    def __init__(self, fleet, images, state_file=None, waves=(1, 1.0), parallel=4,
+                 bandwidth=None, max_failures=0, max_workers=64, reboot_timeout=900.0,
+                 retry_failed=False, between_waves=None, on_step=None):
+        """
+        :param fleet: :class:`Fleet` with the devices to update.
+        :param images: Dictionary of product family to image path or
+                       ``(path, version)``.
+        :param state_file: JSON file to keep the progress in, None for none.
+        :param waves: Sizes of the waves: an int is a number of devices, a
+                      float a fraction of the fleet. The last wave is
+                      extended to all remaining devices (default: one
+                      canary device, then all others).
+        :param parallel: Number of uploads at the same time (default: 4).
+        :param bandwidth: Upload budget in bytes per second shared by all
+                          uploads, None for no limit.
+        :param max_failures: Failed devices tolerated before the rollout is
+                             aborted: an int is a number of devices, a float
+                             a fraction of the fleet (default: 0).
+        :param max_workers: Devices uploading or rebooting at the same time (default: 64).
+        :param reboot_timeout: Seconds a device may take from the end of the
+                               upload until it has booted (default: 900.0).
+        :param retry_failed: Try devices that failed in an earlier run again.
+        :param between_waves: Optional callback ``between_waves(wave, summary)``
+                              before each further wave; returning False stops
+                              the rollout, e.g. after checking the canary.
+        :param on_step: Optional callback ``on_step(host, step, record)``.
+        """
+        self.fleet = fleet
+        self.images = {family: image if isinstance(image, (tuple, list)) else (image, None)
+                       for family, image in images.items()}
+        self.state_file = state_file
+        self.waves = waves
+        self.parallel = parallel
+        self.bandwidth = bandwidth
+        self.max_failures = max_failures
+        self.max_workers = max_workers
+        self.reboot_timeout = reboot_timeout
+        self.retry_failed = retry_failed
+        self.between_waves = between_waves
+        self.on_step = on_step
+        self.aborted = None
+        self.devices = {}
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(parallel)
+        self._next_send = 0.0
+        if state_file is not None and os.path.exists(state_file):
+            with open(state_file) as f:
+                self.devices = json.load(f).get("devices", {})
+
+    def image(self, product):
+        """
+        Return ``(path, version)`` of the image for a product, or None.
+        """
+        families = [family for family in self.images if product.startswith(family)]
+        return self.images[max(families, key=len)] if families else None
+
+    def wave_sizes(self, total):
+        """
+        Return the number of devices in each wave for a fleet of ``total``.
+        """
+        sizes = []
+        left = total
+        for size in self.waves:
+            if not left:
+                break
+            count = size if isinstance(size, int) else int(-(-size * total // 1))
+            count = min(max(count, 1), left)
+            sizes.append(count)
+            left -= count
+        if left:
+            if sizes:
+                sizes[-1] += left
+            else:
+                sizes.append(left)
+        return sizes
+
+    def run(self):
+        """
+        Update all devices of the fleet that still need it.
+
+        :return: :meth:`summary` at the end of the rollout.
+        """
+        self.aborted = None
+        entries = self.fleet.inventory
+        sizes = self.wave_sizes(len(entries))
+        start = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for number, size in enumerate(sizes, 1):
+                wave = entries[start:start + size]
+                start += size
+                futures = [executor.submit(self._update, entry, number == 1 and len(sizes) > 1)
+                           for entry in wave if self._pending(entry["host"])]
+                for future in futures:
+                    future.result()
+                if self.aborted or number == len(sizes):
+                    break
+                if self.between_waves is not None and \
+                        self.between_waves(number, self.summary()) is False:
+                    self._abort(f"stopped after wave {number}")
+                    break
+        return self.summary()
+
+    def summary(self):
+        """
+        :return: Dictionary with the number of devices per step, the abort
+                 reason (None if not aborted) and the error per failed host.
+        """
+        with self._lock:
+            records = {host: dict(record) for host, record in self.devices.items()}
+        steps = collections.Counter(record["step"] for record in records.values())
+        steps["pending"] = sum(1 for entry in self.fleet.inventory if entry["host"] not in records)
+        return {
+            "total": len(self.fleet.inventory),
+            "steps": dict(steps),
+            "aborted": self.aborted,
+            "errors": {host: r["error"] for host, r in records.items()
+                       if r["step"] == "failed"},
+        }
+
+    def _pending(self, host):
+        step = self.devices.get(host, {}).get("step")
+        if step == "failed":
+            return self.retry_failed
+        return step not in self.final_steps
+
+    def _update(self, entry, canary):
+        host = entry["host"]
+        dev = self.fleet.device(entry)
+        try:
+            if self.devices.get(host, {}).get("step") in ("rebooting", "booting", "verifying"):
+                # stopped after the upload: the device may have rebooted meanwhile
+                self._finish(host, dev, resumed=True)
+                return
+            product = entry.get("product") or dev.status("product")
+            image = self.image(product)
+            if image is None:
+                self._set(host, step="skipped", product=product, error=None)
+                return
+            path, version = image
+            current = dev.status("imageversion")
+            # an earlier run may have been stopped after the upload went through
+            before = self.devices.get(host, {}).get("before") or current
+            if (version in current) if version else current != before:
+                self._set(host, step="done", product=product, before=before, after=current,
+                          error=None)
+                return
+            with self._slots:
+                if self.aborted:
+                    return
+                self._set(host, step="uploading", product=product, image=path, version=version,
+                          before=before, after=None, error=None)
+                start = time.monotonic()
+                dev.upload_file("firmware", path, progress=self._meter(),
+                                min_rate=None if self.bandwidth else 8192)
+            self._set(host, step="rebooting", upload=round(time.monotonic() - start, 1),
+                      offline=None, online=None, booted=None)
+            self._finish(host, dev)
+        except Exception as e:
+            self._set(host, step="failed", error=f"{type(e).__name__}: {e}")
+        if self.devices.get(host, {}).get("step") == "failed":
+            if canary:
+                self._abort(f"canary {host} failed")
+            else:
+                self._check_failures()
+
+    def _finish(self, host, dev, resumed=False):
+        """
+        Wait for the reboot and check ``imageversion``.
+        """
+        steps = {"offline": "rebooting", "online": "booting", "booted": "verifying"}
+
+        def on_phase(name, phase, elapsed):
+            self._set(host, step=steps[phase], **{phase: round(elapsed, 1)})
+
+        record = self.devices[host]
+        expect_offline = not resumed
+        while True:
+            result = RebootWaiter(timeout=self.reboot_timeout, expect_offline=expect_offline,
+                                  on_phase=on_phase).wait(dev)
+            if not result.ok:
+                raise result.error
+            after = dev.status("imageversion")
+            updated = record["version"] in after if record.get("version") else after != record["before"]
+            if updated or expect_offline or record.get("offline") is not None:
+                break
+            # the device was still flashing when the rollout was stopped
+            expect_offline = True
+        if updated:
+            self._set(host, step="done", after=after)
+        else:
+            expected = record.get("version") or f"a change from {record['before']}"
+            self._set(host, step="failed", after=after,
+                      error=f"imageversion is {after}, expected {expected}")
+
+    def _check_failures(self):
+        with self._lock:
+            failed = sum(1 for record in self.devices.values() if record["step"] == "failed")
+        limit = self.max_failures
+        if isinstance(limit, float):
+            limit *= len(self.fleet.inventory)
+        if failed > limit:
+            self._abort(f"{failed} devices failed")
+
+    def _abort(self, reason):
+        with self._lock:
+            if self.aborted is None:
+                self.aborted = reason
+                self._save()
+
+    def _set(self, host, **changes):
+        """
+        Update the record of a device and write the state file.
+        """
+        with self._lock:
+            record = self.devices.setdefault(host, {})
+            record.update(changes, updated=time.time())
+            record = dict(record)
+            self._save()
+        if self.on_step is not None:
+            self.on_step(host, record["step"], record)
+
+    def _save(self):
+        # called with the lock held; replaced atomically so that an
+        # interruption never leaves a truncated file
+        if self.state_file is None:
+            return
+        tmp = f"{self.state_file}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"devices": self.devices, "aborted": self.aborted}, f)
+        os.replace(tmp, self.state_file)
+
+    def _meter(self):
+        """
+        Return a progress callback that keeps all uploads within ``bandwidth``.
+        """
+        if not self.bandwidth:
+            return None
+        last = [0]
+
+        def progress(sent, total):
+            # a restarted upload starts counting at 0 again
+            count = sent - last[0] if sent >= last[0] else sent
+            last[0] = sent
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_send)
+                self._next_send = start + count / self.bandwidth
+            if start > now:
+                time.sleep(start - now)
+
+        return progress
+
+
+def check_host(host, timeout=5, session=None):
+    """
+    Check if a host is online by making an HTTPS request.
+
+    :param host: Hostname or IP address.
+    :param timeout: Request timeout in seconds (default: 5).
+    :param session: Optional requests.Session whose connection pool is reused.
+    :return: A tuple (is_online, info).
+             is_online: Boolean indicating if the host is reachable.
+             info: Status code if online, or error message if offline.
+    """
+    url = f"https://{host}/"
+    http = session if session is not None else requests
+    try:
+        # We use verify=False because the device might have a self-signed certificate
+        response = http.get(url, timeout=timeout, verify=False)
+        response.close()
+        return True, response.status_code
+    except requests.exceptions.RequestException as e:
+        return False, str(e)
+
+
+def wait_for_reboot(host, username, password, check_interval=3, timeout=None, device=None):
+    """
+    Wait for a device to reboot and finish its boot process.
+
+    Prints the initial state and the state changes; use
+    :class:`RebootWaiter` for the timings or for many devices.
+
+    :param host: Hostname or IP address of the device.
+    :param username: Username for authentication.
+    :param password: Password for authentication.
+    :param check_interval: Longest time between two checks in seconds (default: 3).
+    :param timeout: Seconds to wait at most (default: no limit).
+    :param device: Optional device object to reuse instead of a new one.
+    :return: An instance of AdstecJSONRPCDevice once the device is ready.
+    """
+    def report(name, phase, elapsed):
+        if phase == "offline":
+            print(f"\n[{time.strftime('%Y-%m-%d %H:%M:%S')}] ✗ Host went OFFLINE")
+        elif phase == "online":
+            print(f"\n[{time.strftime('%Y-%m-%d %H:%M:%S')}] ✓ Host came ONLINE")
+
+    if device is None:
+        device = AdstecJSONRPCDevice(host, username, password)
+    is_online, info = device.check_host()
+    print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Initial state: {'ONLINE' if is_online else 'OFFLINE'}")
+    if is_online:
+        print(f"  Status code: {info}")
+    else:
+        print(f"  Error: {info}")
+    # like before, a device that is down at the start is only waited for
+    waiter = RebootWaiter(timeout=timeout, max_interval=check_interval,
+                          expect_offline=is_online, on_phase=report)
+    result = waiter.wait(device)
+    if result.error is not None:
+        raise result.error
+    return result.device
+
+
+def wait_for_host_is_online(host, timeout=300, interval=5):
+    """
+    Wait for a host to become online by checking its HTTPS URL.
+
+    :param host: Hostname or IP address.
+    :param timeout: Maximum time to wait in seconds (default: 300).
+    :param interval: Time to wait between checks in seconds (default: 5).
+    """
+    start_time = time.time()
+    print(f"Waiting for {host} to be online...")
+
+    while time.time() - start_time < timeout:
+        is_online, info = check_host(host)
         if is_online and info == 200:
             print(f"Host {host} is online.")
             return True
 
         time.sleep(interval)
 
-    raise TimeoutError(f"Timed out waiting for {host} to come online.")
\ No newline at end of file
+    raise TimeoutError(f"Timed out waiting for {host} to come online.")
+
+
+class AsyncAdstecJSONRPCDevice:
+    """
+    asyncio variant of :class:`AdstecJSONRPCDevice` built on ``httpx``.
+
+    All methods of the blocking client are coroutines here. Devices can share
+    one ``httpx.AsyncClient`` (and with it one connection pool) and one
+    ``asyncio.Semaphore`` that bounds the number of requests in flight, so a
+    single event loop can drive thousands of devices::
+
+        client = jsonrpcdevice.async_client(max_connections=200)
+        limit = asyncio.Semaphore(200)
+        devs = [AsyncAdstecJSONRPCDevice(ip, "admin", "admin", client=client,
+                                         semaphore=limit) for ip in ips]
+        versions = await asyncio.gather(*(d.status("imageversion") for d in devs))
+
+    ``validator`` and ``hooks`` work as in the blocking client; hooks get no
+    ``connect`` and ``tls`` times, and ``server`` includes connecting. There
+    is no SID cache and no read cache yet: passing ``sid_cache`` or
+    ``cache`` raises TypeError. Requires ``pip install httpx``.
+    """
+
+    #: Errors after which a file upload is worth another attempt.
+    transient_errors = (TransportError, DeviceBusy) + ((httpx.TransportError,) if httpx else ())
+
+    def __init__(self, target, user, pw, timeout=120.0, verify=False,
+                 pool_maxsize=4, keepalive_expiry=30.0, session_timeout=600,
+                 client=None, semaphore=None, validator=None, hooks=None,
+                 sid_cache=None, cache=None):
+        """
+        :param target: Hostname or IP address of the device.
+        :param user: Username for authentication.
+        :param pw: Password for authentication.
+        :param timeout: Request timeout in seconds (default: 120.0).
+        :param verify: Verify the device's TLS certificate (default: False).
+        :param pool_maxsize: Connections kept open when the device creates its
+                             own client (default: 4).
+        :param keepalive_expiry: Idle time in seconds after which pooled
+                                 connections are dropped (default: 30.0).
+        :param session_timeout: Idle timeout in seconds requested for the SID
+                                with session.create (default: 600).
+        :param client: Shared ``httpx.AsyncClient``; it is not closed by
+                       :meth:`close`.
+        :param semaphore: Shared ``asyncio.Semaphore`` limiting concurrent requests.
+        :param validator: :class:`ConfigValidator` that checks written values
+                          before they are sent, or None (default).
+        :param hooks: List of :class:`CallHooks` called around every JSON/RPC
+                      request (default: none).
+        :param sid_cache: Not supported, must be None.
+        :param cache: Not supported, must be None.
+        """
+        if httpx is None:
+            raise ImportError("AsyncAdstecJSONRPCDevice requires httpx: pip install httpx")
+        if sid_cache is not None or cache is not None:
+            raise TypeError("AsyncAdstecJSONRPCDevice does not support sid_cache or cache; "
+                            "use AdstecJSONRPCDevice for cached SIDs and reads")
+        self.target = target
+        self.username = user
+        self.password = pw
+        self.sid = None
+        self.sid_expires = 0.0
+        self.session_timeout = session_timeout
+        self.timeout = timeout
+        self.verify = verify
+        self.pool_maxsize = pool_maxsize
+        self.keepalive_expiry = keepalive_expiry
+        self.semaphore = semaphore
+        self.upload_file_types = set(AdstecJSONRPCDevice.upload_file_types_default)
+        self.download_file_types = set(AdstecJSONRPCDevice.download_file_types_default)
+        self.validator = validator
+        #: :class:`CallHooks` called around every JSON/RPC request.
+        self.hooks = list(hooks or [])
+        self._client = client
+        self._owns_client = client is None
+        self._request_ids = itertools.count(1)
+        self._sid_lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    @property
+    def client(self):
+        """
+        The ``httpx.AsyncClient`` used for all requests, created on first use.
+        """
+        if self._client is None:
+            self._client = async_client(self.pool_maxsize, self.keepalive_expiry,
+                                        self.timeout, self.verify)
+        return self._client
+
+    async def close(self):
+        """
+        Close the connection pool, unless it is a shared client.
+        """
+        if self._client is not None and self._owns_client:
+            await self._client.aclose()
+            self._client = None
+
+    async def _limited(self, coro):
+        if self.semaphore is None:
+            return await coro
+        async with self.semaphore:
+            return await coro
+
+    async def get_sid(self):
+        """
+        Authenticate and acquire a session ID (SID).
+        """
+        self.sid = self._login_sid(await self.send_request(self._auth_payload()))
+        self._touch_sid()
+
+    async def ensure_sid(self):
+        """
+        Acquire a new SID if there is none or its idle deadline has passed.
+        """
+        # concurrent calls on a fresh device must not create several sessions
+        if self.sid and not self.sid_expired():
+            return
+        async with self._sid_lock:
+            if not self.sid or self.sid_expired():
+                await self.get_sid()
+
+    NULL_SID = AdstecJSONRPCDevice.NULL_SID
+    _auth_payload = AdstecJSONRPCDevice._auth_payload
+    sid_expired = AdstecJSONRPCDevice.sid_expired
+    _touch_sid = AdstecJSONRPCDevice._touch_sid
+    _session_expired = staticmethod(AdstecJSONRPCDevice._session_expired)
+    _login_sid = staticmethod(AdstecJSONRPCDevice._login_sid)
+
+    def set_target(self, target):
+        """
+        set the target device IP address
+        i.e., when changing the IP address of the device
+        """
+        self.target = target
+
+    async def call(self, obj, method, **params):
+        """
+        Make a JSON/RPC call, see :meth:`AdstecJSONRPCDevice.call`.
+        """
+        if self.validator is not None and obj == "config":
+            self.validator.check(method, params)
+        await self.ensure_sid()
+        response = await self.send_request(self._envelope(obj, method, params))
+        if self._session_expired(response):
+            await self.get_sid()
+            response = await self.send_request(self._envelope(obj, method, params))
+        self._touch_sid()
+        return AdstecJSONRPCDevice._unpack(response, f"{obj}.{method}")
+
+    _envelope = AdstecJSONRPCDevice._envelope
+    _decode = staticmethod(AdstecJSONRPCDevice._decode)
+    _share = staticmethod(AdstecJSONRPCDevice._share)
+    _hooks_before = AdstecJSONRPCDevice._hooks_before
+    _hooks_after = AdstecJSONRPCDevice._hooks_after
+
+    async def send_request(self, payload):
+        """
+        Send a JSON/RPC request to the target device.
+        """
+        if self.hooks:
+            return await self._send_hooked(payload)
+        return self._decode(await self._post(payload))
+
+    async def _post(self, payload):
+        try:
+            return await self._limited(self.client.post(
+                f"https://{self.target}/rpc", json=payload, timeout=self.timeout,
+                headers={"Content-Type": "application/json"},
+            ))
+        except httpx.HTTPError as e:
+            raise _transport_error(e) from e
+
+    async def _send_hooked(self, payload):
+        """
+        :meth:`send_request` with timing, see :meth:`AdstecJSONRPCDevice._send_hooked`.
+        """
+        calls = self._hooks_before(payload)
+        start = time.perf_counter()
+        response = None
+        decode = None
+        try:
+            response = await self._post(payload)
+            decoding = time.perf_counter()
+            data = self._decode(response)
+            decode = time.perf_counter() - decoding
+        except DeviceError as e:
+            self._hooks_after(calls, payload, self._timing(start, response, decode), error=e)
+            raise
+        self._hooks_after(calls, payload, self._timing(start, response, decode), data)
+        return data
+
+    @staticmethod
+    def _timing(start, response, decode):
+        total = time.perf_counter() - start
+        if response is None:
+            return CallTiming(total, None, None, None, None, None, None, None)
+        # httpx does not time connecting apart from the request, and has no
+        # elapsed time for responses that were never streamed
+        try:
+            server = response.elapsed.total_seconds()
+        except RuntimeError:
+            server = None
+        return CallTiming(total, None, None, server, decode,
+                          len(response.request.content), len(response.content),
+                          response.status_code)
+
+    async def upload_file(self, type, filename, retries=2, backoff=2.0):
+        """
+        Upload a file to the device via upload.php, see
+        :meth:`AdstecJSONRPCDevice.upload_file`. On connection errors,
+        timeouts and 5xx responses the upload is restarted from the beginning.
+
+        :param type: File type, one of ``upload_file_types``.
+        :param filename: Path of the file to upload.
+        :param retries: Number of restarts after a transient failure (default: 2).
+        :param backoff: Delay in seconds before the first restart, doubled for
+                        each further one (default: 2.0).
+        :return: :class:`UploadResult` of the successful attempt.
+        """
+        if type not in self.upload_file_types:
+            raise Exception(f"Invalid file type: {type}. Must be one of: {self.upload_file_types}.")
+
+        if not os.path.exists(filename):
+            raise Exception(f"Error: File '{filename}' does not exist.")
+
+        url = f"https://{self.target}/priv/script/php_rpc/upload.php"
+        start = time.monotonic()
+        attempts = 0
+        while True:
+            attempts += 1
+            await self.ensure_sid()
+            try:
+                with open(filename, 'rb') as f:
+                    response = await self._limited(self.client.post(
+                        url, files={type: f}, headers={"Cookie": f"ads_sid={self.sid}"},
+                        timeout=self.timeout))
+                if response.status_code < 500:
+                    break
+                error = _http_error(response, "upload.php")
+            except self.transient_errors as e:
+                error = e
+            if attempts > retries:
+                if isinstance(error, DeviceError):
+                    raise error
+                raise _transport_error(error, "upload.php") from error
+            await asyncio.sleep(backoff * 2 ** (attempts - 1))
+        _raise_for_status(response, "upload.php")
+        self._touch_sid()
+        return UploadResult(response.status_code, response.text,
+                            int(response.request.headers.get("Content-Length", 0)),
+                            time.monotonic() - start, attempts)
+
+    async def download_file(self, filename, output_filename):
+        """
+        Download a file from the device via download.php, see
+        :meth:`AdstecJSONRPCDevice.download_file`; not resumed. The file is
+        written to ``output_filename + ".part"`` and renamed when complete.
+
+        :param filename: File to download, one of ``download_file_types``.
+        :param output_filename: Local path to write the file to.
+        :return: :class:`DownloadResult`.
+        """
+        if filename not in self.download_file_types:
+            raise Exception(f"Invalid file type: {filename}. Must be one of: {self.download_file_types}.")
+        await self.ensure_sid()
+        url = f"https://{self.target}/priv/script/php_rpc/download.php?file={quote(filename)}"
+        start = time.monotonic()
+        part = output_filename + ".part"
+        try:
+            size = await self._limited(self._download(url, part))
+        except httpx.HTTPError as e:
+            os.remove(part)
+            raise _transport_error(e, "download.php") from e
+        except BaseException:
+            if os.path.exists(part):
+                os.remove(part)
+            raise
+        os.replace(part, output_filename)
+        self._touch_sid()
+        return DownloadResult(output_filename, size, None, time.monotonic() - start, 1)
+
+    async def _download(self, url, part):
+        size = 0
+        with open(part, 'wb') as f:
+            async with self.client.stream("GET", url, headers={"Cookie": f"ads_sid={self.sid}"},
+                                          timeout=self.timeout) as response:
+                _raise_for_status(response, "download.php")
+                async for chunk in response.aiter_bytes(65536):
+                    f.write(chunk)
+                    size += len(chunk)
+                length = response.headers.get("Content-Length")
+                if length is not None and size < int(length):
+                    raise TransportError(f"Connection closed after {size} of {length} bytes",
+                                         method="download.php")
+        return size
+
+    async def check_host(self, timeout=5):
+        """
+        Check if the device is online, reusing the pooled connection.
+
+        :param timeout: Request timeout in seconds (default: 5).
+        :return: A tuple (is_online, info), see :func:`check_host`.
+        """
+        return await async_check_host(self.target, timeout=timeout, client=self.client)
+
+    async def sess_start(self):
+        """
+        Start a configuration session.
+        """
+        return (await self.call("config", "sess_start"))["cfg_session_id"]
+
+    async def sess_commit(self, cfg_session_id):
+        """
+        Commit a configuration session.
+        """
+        return await self.call("config", "sess_commit", cfg_session_id=cfg_session_id)
+
+    async def table_get(self, tablename, condition_key, condition_value):
+        """
+        Get a row from a table.
+        """
+        return await self.call(
+            "config",
+            "table_get",
+            tablename=tablename,
+            condition={condition_key: condition_value},
+        )
+
+    async def table_up(self, tablename, cfg_session_id, condition, values):
+        """
+        Update a row in a table.
+        """
+        return await self.call(
+            "config",
+            "table_up",
+            tablename=tablename,
+            cfg_session_id=cfg_session_id,
+            condition=condition,
+            values=values,
+        )
+
+    async def table_insert(self, tablename, cfg_session_id, row):
+        """
+        Insert a new row into a table.
+        """
+        return await self.call(
+            "config",
+            "table_set",
+            tablename=tablename,
+            cfg_session_id=cfg_session_id,
+            row=row,
+        )
+
+    async def table_del(self, tablename, cfg_session_id, condition):
+        """
+        Delete a row from a table.
+        """
+        return await self.call(
+            "config",
+            "table_del",
+            tablename=tablename,
+            cfg_session_id=cfg_session_id,
+            condition=condition,
+        )
+
+    async def config_get(self, keys):
+        """
+        Get the values of configuration variables.
+
+        :param keys: List of configuration keys to retrieve.
+        :return: Dictionary of key-value pairs.
+        """
+        return await self.call("config", "get", keys=keys)
+
+    async def config_set(self, cfg_session_id, values):
+        """
+        Set configuration variables.
+
+        :param cfg_session_id: Active configuration session ID.
+        :param values: Dictionary of key-value pairs to set.
+        :return: Result of the set operation.
+        """
+        return await self.call(
+            "config",
+            "set",
+            cfg_session_id=cfg_session_id,
+            values=values,
+            verbose=True
+        )
+
+    async def config_set_commit(self, values):
+        cfg_session_id = await self.sess_start()
+        await self.config_set(cfg_session_id, values)
+        await self.sess_commit(cfg_session_id)
+
+    async def config_update(self, cfg_session_id, values, condition):
+        """
+        Update configuration variables based on a condition.
+
+        :param cfg_session_id: Active configuration session ID.
+        :param values: Dictionary of key-value pairs to update.
+        :param condition: Dictionary specifying the condition for the update.
+        :return: Result of the update operation.
+        """
+        return await self.call(
+            "config",
+            "table_up",
+            cfg_session_id=cfg_session_id,
+            values=values,
+            condition=condition,
+        )
+
+    async def status(self, property, param1="", param2=""):
+        """
+        Get system status information for a specific property with optional parameters.
+
+        :param property: The status property to query (e.g., 'uptime').
+        :param param1: First optional parameter (default: "").
+        :param param2: Second optional parameter (default: "").
+        :return: The status value for the specified property.
+        """
+        response = await self.call(
+            "status",
+            "get",
+            function=property,
+            parameters=[param1, param2],
+        )
+        return response.get(property, None)
+
+    async def logout(self):
+        response = await self.call(
+            "session",
+            "destroy",
+        )
+        self.sid = None
+        self.sid_expires = 0.0
+        return response
+
+    async def convert_to_ifname(self, interfaces_arr):
+        """
+        Convert interface names to their corresponding ifname values.
+
+        :param interfaces_arr: List of interface names (e.g., ['wan', 'docker', 'vpn10'])
+        :return: Space-separated string of interface names (e.g., 'br1 lxcbr0 l3tap10')
+        """
+        if not interfaces_arr:
+            return ""
+        ifname_array = [f"{interface}_ifname" for interface in interfaces_arr]
+        try:
+            result = (await self.config_get(ifname_array))['result']
+        except KeyError:
+            raise ValueError("config_get did not return expected 'result' key")
+        return ' '.join(
+            str(list(d.values())[0]) for d in result if d.values()
+        )
+
+
+def async_client(max_connections=100, keepalive_expiry=30.0, timeout=120.0, verify=False,
+                 transport=None):
+    """
+    Create an ``httpx.AsyncClient`` suitable for sharing between many
+    :class:`AsyncAdstecJSONRPCDevice` objects.
+
+    :param max_connections: Upper bound of open connections over all devices.
+    :param keepalive_expiry: Idle time in seconds after which connections are dropped.
+    :param timeout: Default request timeout in seconds.
+    :param verify: Verify the devices' TLS certificates (default: False).
+    :param transport: ``httpx`` transport, e.g. ``FakeDevice.async_transport()``
+                      from ``jsonrpcdevice_fake``; None for HTTPS (default).
+    """
+    if httpx is None:
+        raise ImportError("async_client requires httpx: pip install httpx")
+    limits = httpx.Limits(max_connections=max_connections,
+                          max_keepalive_connections=max_connections,
+                          keepalive_expiry=keepalive_expiry)
+    return httpx.AsyncClient(verify=verify, limits=limits, timeout=timeout, transport=transport)
+
+
+async def async_check_host(host, timeout=5, client=None):
+    """
+    Check if a host is online by making an HTTPS request, see :func:`check_host`.
+
+    :param host: Hostname or IP address.
+    :param timeout: Request timeout in seconds (default: 5).
+    :param client: Optional ``httpx.AsyncClient`` whose connection pool is reused.
+    :return: A tuple (is_online, info).
+    """
+    url = f"https://{host}/"
+    own_client = client is None
+    if own_client:
+        client = async_client(max_connections=1)
+    try:
+        response = await client.get(url, timeout=timeout)
+        return True, response.status_code
+    except httpx.HTTPError as e:
+        return False, str(e)
+    finally:
+        if own_client:
+            await client.aclose()
+
+
+async def async_wait_for_host_is_online(host, timeout=300, interval=5, client=None):
+    """
+    Wait for a host to become online, see :func:`wait_for_host_is_online`.
+
+    :param host: Hostname or IP address.
+    :param timeout: Maximum time to wait in seconds (default: 300).
+    :param interval: Time to wait between checks in seconds (default: 5).
+    :param client: Optional ``httpx.AsyncClient`` whose connection pool is reused.
+    """
+    loop = asyncio.get_running_loop()
+    start_time = loop.time()
+    print(f"Waiting for {host} to be online...")
+
+    while loop.time() - start_time < timeout:
+        is_online, info = await async_check_host(host, client=client)
+        if is_online and info == 200:
+            print(f"Host {host} is online.")
+            return True
+
+        await asyncio.sleep(interval)
+
+    raise TimeoutError(f"Timed out waiting for {host} to come online.")
@@ -0,0 +1,562 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+"""
+In-memory stand-in for an ads-tec device, for tests, CI jobs and
+benchmarks. It is plugged in as the ``transport`` of
+:class:`jsonrpcdevice.AdstecJSONRPCDevice`, so no network or hardware is
+needed::
+
+    import jsonrpcdevice
+    from jsonrpcdevice_fake import FakeDevice
+
+    fake = FakeDevice("IRF3821")
+    dev = jsonrpcdevice.AdstecJSONRPCDevice("fake", "admin", "admin", transport=fake)
+"""
+import asyncio
+import base64
+import collections
+import hashlib
+import io
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from urllib.parse import unquote
+
+import requests
+import urllib3
+
+from jsonrpcdevice import SchemaRegistry, ValidationError
+
+try:
+    import httpx
+except ImportError:
+    # only needed by FakeDevice.async_transport
+    httpx = None
+
+
+class FakeDevice(requests.adapters.BaseAdapter):
+    """
+    In-memory stand-in for a device, plugged in as the transport of a client.
+
+    The transport of :class:`AdstecJSONRPCDevice` is a ``requests`` transport
+    adapter: by default an ``HTTPAdapter`` that talks HTTPS to the device.
+    A FakeDevice answers the same requests without a network, so scripts
+    and benchmarks run reproducibly without an IRF/AWT device::
+
+        fake = jsonrpcdevice_fake.FakeDevice("IRF3821", latency=0.005, failures={"busy": 0.01})
+        dev = jsonrpcdevice.AdstecJSONRPCDevice("fake", "admin", "admin", transport=fake)
+        dev.config_set_commit({"ntp_service": "enabled"})
+        print(fake.config["ntp_service"], fake.calls)
+
+    It implements ``session``, ``config`` (sessions, variables, tables,
+    ``export_pages``, ``import_config``), ``status``, ``datacollection`` and
+    ``file`` as well as ``upload.php`` and ``download.php``. Other methods
+    described in ``schemas/*.schema.json`` answer with their example
+    response, and required parameters are checked against those schemas.
+    With a ``product``, variables start at their defaults from the
+    configdb schema and written values are validated like on the device;
+    rejected values are reported as ``{"errors": {key: message}}``.
+
+    The state is kept in plain attributes: ``config``, ``tables`` (lists of
+    row dicts), ``status``, ``files`` (download.php and ``file`` paths),
+    ``uploads`` (``(type, size, sha256)`` per upload), ``metrics`` and the
+    counters ``calls`` per (object, method), ``requests`` and ``received``
+    (bytes). Use ``httpx.AsyncClient(transport=fake.async_transport())`` for
+    :class:`AsyncAdstecJSONRPCDevice`.
+    """
+
+    #: Directory of the JSON-RPC API schemas shipped with this module.
+    api_schema_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schemas")
+
+    #: Kinds of failures that can be injected, see :meth:`inject`.
+    failure_kinds = ("connect", "timeout", "unavailable", "busy", "expire")
+
+    def __init__(self, product=None, users=None, latency=0.0, failures=None, seed=None,
+                 registry=None):
+        """
+        :param product: Product whose configdb schema provides the variables,
+                        tables and validation, e.g. ``"IRF3821"``; None for a
+                        device without schema.
+        :param users: Dictionary of user name to password (default: admin/admin).
+        :param latency: Seconds added to every HTTP request, or ``(low, high)``
+                        for a uniformly random latency.
+        :param failures: Dictionary of failure kind to probability per request:
+                         ``connect`` and ``timeout`` raise the requests
+                         exception, ``unavailable`` answers HTTP 503, ``busy``
+                         answers a ubus timeout and ``expire`` drops the session.
+        :param seed: Seed of the random numbers for latency, failures and SIDs.
+        :param registry: :class:`SchemaRegistry` to take the product schema from.
+        """
+        super().__init__()
+        self.product = product
+        self.users = dict(users or {"admin": "admin"})
+        self.latency = latency
+        self.failures = dict(failures or {})
+        unknown = set(self.failures) - set(self.failure_kinds)
+        if unknown:
+            raise ValueError(f"Unknown failure kinds {sorted(unknown)}; use {self.failure_kinds}")
+        self.schema = None
+        self.validator = None
+        self.defaults = {}
+        if product is not None:
+            self.schema = (registry or SchemaRegistry.default()).get(product)
+            self.validator = self.schema.validator()
+            self.defaults = {key: prop.get("default", "")
+                             for key, prop in self.schema.properties.items()}
+        self.config = dict(self.defaults)
+        self.tables = {}
+        #: Column order for ``table_set`` of tables not in the product schema.
+        self.columns = {}
+        self.status = {
+            "product": product or "IRF3821", "product_alias": product or "IRF3821",
+            "imageversion": "Ads-tec/IRF3xxx/2.2.8/SVN-R63743.B-181926",
+            "system_name": "fake", "boot_finished": "yes", "redbootserial": "00000000",
+        }
+        self.files = {}
+        self.uploads = []
+        self.metrics = ["ETH1.rx_bytes", "ETH1.tx_bytes", "system.cpu", "system.memory.used",
+                        "system.memory.total"]
+        self.calls = collections.Counter()
+        self.requests = 0
+        self.received = 0
+        self.sessions = {}
+        self._cfg_sessions = {}
+        self._cfg_session_ids = itertools.count(1)
+        self._injected = collections.deque()
+        self._rng = random.Random(seed)
+        self._booted = time.monotonic()
+        self._lock = threading.RLock()
+        self._api = None
+        self._handlers = {
+            ("session", "create"): self._session_create,
+            ("session", "destroy"): self._session_destroy,
+            ("session", "list"): lambda sid, params: {"sessions": list(self.sessions)},
+            ("config", "sess_start"): self._sess_start,
+            ("config", "sess_commit"): self._sess_commit,
+            ("config", "sess_abort"): self._sess_abort,
+            ("config", "get"): lambda sid, params: {
+                "result": [{key: self.config.get(key, "")} for key in params["keys"]]},
+            ("config", "get_default"): lambda sid, params: {
+                "result": [{key: self.defaults.get(key, "")} for key in params["keys"]]},
+            ("config", "set"): self._config_set,
+            ("config", "table_get"): self._table_get,
+            ("config", "table_set"): self._table_op,
+            ("config", "table_up"): self._table_op,
+            ("config", "table_del"): self._table_op,
+            ("config", "export_pages"): self._export_pages,
+            ("config", "import_config"): self._import_config,
+            ("status", "get"): self._status_get,
+            ("datacollection", "get_metrics"): lambda sid, params: {"result": list(self.metrics)},
+            ("datacollection", "get_values_as_table"): self._get_values_as_table,
+            ("file", "write"): self._file_write,
+            ("file", "read"): lambda sid, params: {
+                "data": base64.b64encode(self.files[params["path"]]).decode()},
+            ("file", "delete"): self._file_delete,
+        }
+
+    def inject(self, kind, count=1):
+        """
+        Make the next ``count`` requests fail with ``kind``, see ``failures``.
+        """
+        if kind not in self.failure_kinds:
+            raise ValueError(f"Unknown failure kind {kind!r}; use {self.failure_kinds}")
+        self._injected.extend([kind] * count)
+
+    def reboot(self, downtime=0.0):
+        """
+        Drop all sessions and restart the uptime; requests fail with a
+        connection error for ``downtime`` seconds.
+        """
+        with self._lock:
+            self.sessions.clear()
+            self._cfg_sessions.clear()
+            self._booted = time.monotonic() + downtime
+
+    # -- requests transport adapter --
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        """
+        Answer a ``requests.PreparedRequest``, see ``requests.adapters.BaseAdapter``.
+        """
+        delay, failure = self._prepare()
+        if delay:
+            time.sleep(delay)
+        if failure == "connect":
+            # wrapped like requests does for a refused connection
+            reason = urllib3.exceptions.NewConnectionError(
+                self.product or "fake", "Failed to establish a new connection: connection refused")
+            raise requests.exceptions.ConnectionError(
+                urllib3.exceptions.MaxRetryError(None, request.path_url, reason), request=request)
+        if failure == "timeout":
+            raise requests.exceptions.ReadTimeout(f"{self.product or 'fake'}: read timed out",
+                                                  request=request)
+        url = urllib3.util.parse_url(request.url)
+        path = url.path or "/"
+        if url.query:
+            path += "?" + url.query
+        status, headers, content = self.handle(request.method, path, request.headers,
+                                               self._chunks(request.body), failure)
+        response = requests.Response()
+        response.status_code = status
+        response.reason = {200: "OK", 206: "Partial Content", 403: "Forbidden",
+                           404: "Not Found", 503: "Service Unavailable"}.get(status, "")
+        response.headers = requests.structures.CaseInsensitiveDict(headers)
+        response.raw = io.BytesIO(content)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.encoding = "utf-8"
+        return response
+
+    def close(self):
+        """
+        Nothing to release; the state survives ``AdstecJSONRPCDevice.close()``.
+        """
+
+    def async_transport(self):
+        """
+        Return an ``httpx`` transport answering from this fake device.
+        """
+        if httpx is None:
+            raise ImportError("async_transport requires httpx: pip install httpx")
+
+        async def handler(request):
+            delay, failure = self._prepare()
+            if delay:
+                await asyncio.sleep(delay)
+            if failure == "connect":
+                raise httpx.ConnectError("connection refused", request=request)
+            if failure == "timeout":
+                raise httpx.ReadTimeout("read timed out", request=request)
+            path = request.url.raw_path.decode()
+            status, headers, content = self.handle(request.method, path, request.headers,
+                                                   [await request.aread()], failure)
+            return httpx.Response(status, headers=headers, content=content)
+
+        return httpx.MockTransport(handler)
+
+    def _prepare(self):
+        """
+        Count a request and draw its latency and injected failure.
+        """
+        with self._lock:
+            self.requests += 1
+            latency = self.latency
+            if isinstance(latency, (tuple, list)):
+                latency = self._rng.uniform(*latency)
+            failure = self._injected.popleft() if self._injected else None
+            for kind, rate in self.failures.items():
+                if failure is None and self._rng.random() < rate:
+                    failure = kind
+            if time.monotonic() < self._booted:
+                failure = "connect"
+        return latency, failure
+
+    @staticmethod
+    def _chunks(body):
+        if body is None:
+            return []
+        if isinstance(body, (bytes, str)):
+            return [body.encode() if isinstance(body, str) else body]
+        if hasattr(body, "read"):
+            return iter(lambda: body.read(65536), b"")
+        return body
+
+    # -- HTTP --
+
+    def handle(self, method, path, headers, chunks, failure=None):
+        """
+        Answer one HTTP request.
+
+        :param method: HTTP method.
+        :param path: Path and query of the URL.
+        :param headers: Request headers (case-insensitive mapping).
+        :param chunks: Iterable of the request body in bytes chunks.
+        :param failure: Injected failure kind for this request, or None.
+        :return: Tuple ``(status, headers, content)``.
+        """
+        if failure == "unavailable":
+            return 503, {"Content-Type": "text/plain"}, b"Service Unavailable"
+        if path == "/rpc" and method == "POST":
+            body = b"".join(chunks)
+            with self._lock:
+                self.received += len(body)
+                if failure == "expire":
+                    self.sessions.clear()
+            try:
+                request = json.loads(body)
+            except ValueError:
+                response = {"jsonrpc": "2.0", "id": None,
+                            "error": {"code": -32700, "message": "Parse error"}}
+            else:
+                if isinstance(request, list):
+                    response = [self.rpc(r, failure) for r in request]
+                else:
+                    response = self.rpc(request, failure)
+            return 200, {"Content-Type": "application/json"}, json.dumps(response).encode()
+        sid = None
+        for cookie in headers.get("Cookie", "").split(";"):
+            name, _, value = cookie.strip().partition("=")
+            if name == "ads_sid":
+                sid = value
+        if path == "/":
+            return 200, {"Content-Type": "text/html"}, b"<html></html>"
+        if path.startswith("/priv/script/php_rpc/"):
+            if not self._valid_sid(sid):
+                return 403, {"Content-Type": "text/plain"}, b"Forbidden"
+            if path.endswith("/upload.php") and method == "POST":
+                return self._upload(headers, chunks)
+            if "/download.php?file=" in path:
+                return self._download(unquote(path.split("=", 1)[1]), headers)
+        return 404, {"Content-Type": "text/plain"}, b"Not Found"
+
+    def _upload(self, headers, chunks):
+        boundary = headers.get("Content-Type", "").partition("boundary=")[2].strip('"').encode()
+        closing = b"\r\n--" + boundary + b"--\r\n"
+        buffer = b""
+        chunks = iter(chunks)
+        for chunk in chunks:
+            buffer += chunk
+            if b"\r\n\r\n" in buffer:
+                break
+        head, _, buffer = buffer.partition(b"\r\n\r\n")
+        match = re.search(rb'name="([^"]*)"', head)
+        digest = hashlib.sha256()
+        size = 0
+        # the data ends before the closing boundary: hold that many bytes back
+        for chunk in chunks:
+            buffer += chunk
+            if len(buffer) > len(closing):
+                digest.update(buffer[:-len(closing)])
+                size += len(buffer) - len(closing)
+                buffer = buffer[-len(closing):]
+        data = buffer[:-len(closing)] if buffer.endswith(closing) else buffer
+        digest.update(data)
+        size += len(data)
+        with self._lock:
+            self.received += size
+            self.uploads.append((match.group(1).decode() if match else None, size,
+                                 digest.hexdigest()))
+        return 200, {"Content-Type": "text/plain"}, b"OK"
+
+    def _download(self, name, headers):
+        data = self.files.get(name)
+        if data is None:
+            return 404, {"Content-Type": "text/plain"}, b"Not Found"
+        etag = f'"{len(data)}-{zlib.crc32(data)}"'
+        match = re.match(r"bytes=(\d+)-$", headers.get("Range", ""))
+        if match and headers.get("If-Range", etag) == etag:
+            start = int(match.group(1))
+            return 206, {"Content-Type": "application/octet-stream", "ETag": etag,
+                         "Content-Length": str(len(data) - start),
+                         "Content-Range": f"bytes {start}-{len(data) - 1}/{len(data)}"}, data[start:]
+        return 200, {"Content-Type": "application/octet-stream", "ETag": etag,
+                     "Content-Length": str(len(data))}, data
+
+    # -- JSON-RPC --
+
+    def api(self):
+        """
+        Return the method definitions of ``schemas/*.schema.json`` by
+        ``(object, method)``.
+        """
+        if self._api is None:
+            api = {}
+            for filename in sorted(os.listdir(self.api_schema_dir)):
+                with open(os.path.join(self.api_schema_dir, filename)) as f:
+                    schema = json.load(f)
+                for name, definition in schema.get("definitions", {}).items():
+                    obj, _, method = definition.get("title", "").rpartition(".")
+                    if obj:
+                        api[obj, method] = definition
+            self._api = api
+        return self._api
+
+    def rpc(self, request, failure=None):
+        """
+        Answer one JSON-RPC request envelope.
+        """
+        def error(code, message):
+            return {"jsonrpc": "2.0", "id": request.get("id"),
+                    "error": {"code": code, "message": message}}
+
+        try:
+            sid, obj, method, params = request["params"]
+        except (KeyError, TypeError, ValueError):
+            return error(-32600, "Invalid request")
+        with self._lock:
+            self.calls[obj, method] += 1
+        if (obj, method) != ("session", "create") and not self._valid_sid(sid):
+            return error(-32002, "Access denied")
+        definition = self.api().get((obj, method))
+        handler = self._handlers.get((obj, method))
+        if handler is None and definition is None:
+            known = any(o == obj for o, _ in self._handlers) or any(o == obj for o, _ in self.api())
+            return error(-32601, "Method not found") if known else error(-32000, "Object not found")
+        required = (definition or {}).get("request_params", {}).get("required", [])
+        if failure == "busy":
+            result = [7]
+        elif not isinstance(params, dict) or any(key not in params for key in required):
+            result = [2]
+        elif handler is None:
+            example = definition.get("example_response", {}).get("result", [0, {}])
+            result = [example[0], example[1] if len(example) > 1 else {}]
+        else:
+            try:
+                with self._lock:
+                    result = [0, handler(sid, params)]
+            except ValidationError as e:
+                result = [2, {"errors": e.errors}]
+            except PermissionError:
+                result = [6]
+            except KeyError:
+                result = [4]
+            except (TypeError, ValueError):
+                result = [2]
+        return {"jsonrpc": "2.0", "id": request.get("id"), "result": result}
+
+    def _valid_sid(self, sid):
+        with self._lock:
+            session = self.sessions.get(sid)
+            now = time.monotonic()
+            if session is None or now > session[2]:
+                self.sessions.pop(sid, None)
+                return False
+            session[2] = now + session[1]
+            return True
+
+    def _session_create(self, sid, params):
+        if self.users.get(params["user"]) != params["password"]:
+            raise PermissionError
+        sid = "%032x" % self._rng.getrandbits(128)
+        timeout = int(params.get("timeout") or 600)
+        self.sessions[sid] = [params["user"], timeout, time.monotonic() + timeout]
+        return {"sid": sid, "acls": {}}
+
+    def _session_destroy(self, sid, params):
+        self.sessions.pop(params.get("sid", sid), None)
+        return {}
+
+    def _sess_start(self, sid, params):
+        cfg_session_id = str(next(self._cfg_session_ids))
+        self._cfg_sessions[cfg_session_id] = ({}, [])
+        return {"cfg_session_id": cfg_session_id}
+
+    def _cfg_session(self, params):
+        return self._cfg_sessions[str(params["cfg_session_id"])]
+
+    def _check(self, method, params):
+        if self.validator is not None:
+            self.validator.check(method, params)
+
+    def _config_set(self, sid, params):
+        values, _ = self._cfg_session(params)
+        self._check("set", params)
+        values.update(params["values"])
+        return {}
+
+    def _sess_commit(self, sid, params):
+        values, ops = self._cfg_sessions.pop(str(params["cfg_session_id"]))
+        self.config.update(values)
+        for method, op in ops:
+            self._apply(method, op)
+        return {}
+
+    def _sess_abort(self, sid, params):
+        self._cfg_sessions.pop(str(params["cfg_session_id"]), None)
+        return {}
+
+    def _table_columns(self, tablename):
+        if tablename in self.columns:
+            return self.columns[tablename]
+        if self.schema is not None and tablename in self.schema.tables:
+            return self.schema.columns(tablename)
+        raise KeyError(tablename)
+
+    @staticmethod
+    def _matches(row, condition):
+        return all(str(row.get(key)) == str(value) for key, value in condition.items())
+
+    def _table_get(self, sid, params):
+        rows = self.tables.get(params["tablename"], [])
+        return {"result": [dict(row) for row in rows if self._matches(row, params["condition"])]}
+
+    def _table_op(self, sid, params):
+        _, ops = self._cfg_session(params)
+        method = "table_set" if "row" in params else "table_up" if "values" in params else "table_del"
+        if method == "table_set":
+            columns = self._table_columns(params["tablename"])
+            if len(params["row"]) != len(columns):
+                raise ValueError(params["row"])
+        self._check(method, params)
+        ops.append((method, params))
+        return {}
+
+    def _apply(self, method, op):
+        rows = self.tables.setdefault(op["tablename"], [])
+        if method == "table_set":
+            rows.append(dict(zip(self._table_columns(op["tablename"]), op["row"])))
+            return
+        for row in [row for row in rows if self._matches(row, op["condition"])]:
+            if method == "table_up":
+                row.update(op["values"])
+            else:
+                rows.remove(row)
+
+    def _export_pages(self, sid, params):
+        pages = set(params["pages"])
+        names = list(self.tables)
+        configdata = {}
+        if self.schema is not None:
+            names = [name for name, table in self.schema.tables.items()
+                     if table.get("x-page") in pages]
+            configdata = {key: self.config.get(key, "") for key, prop in self.schema.properties.items()
+                          if prop.get("x-page") in pages}
+        return {"jsondata": {"configdata": configdata, "tableinsert": [
+            {"tablename": name, "data": [dict(row) for row in self.tables.get(name, [])]}
+            for name in names]}}
+
+    def _import_config(self, sid, params):
+        data = params["jsondata"]
+        self._check("import_config", params)
+        for entry in data.get("tableflush") or []:
+            self.tables[entry["tablename"]] = []
+        for entry in data.get("tableinsert") or []:
+            self.tables.setdefault(entry["tablename"], []).extend(dict(row) for row in entry["data"])
+        self.config.update(data.get("configdata") or {})
+        return {}
+
+    def _status_get(self, sid, params):
+        name = params["function"]
+        if name == "uptimesec":
+            value = str(int(time.monotonic() - self._booted))
+        else:
+            value = self.status.get(name, "")
+        return {name: value}
+
+    def _get_values_as_table(self, sid, params):
+        # like the device: 1 s slots over the last 600 s, filled every 10 s
+        now = int(time.time())
+        flushed = now - now % 10
+        start = max(int(params["from"]), now - 600)
+        table = {}
+        for i, metric in enumerate(params["metrics"]):
+            if metric in self.metrics:
+                table[metric] = [
+                    {"ts": ts, "val": float((ts * (i + 1)) % 1000) if ts < flushed else None}
+                    for ts in range(start, int(params["to"]) + 1)]
+        return {"result": table}
+
+    def _file_write(self, sid, params):
+        self.files[params["path"]] = base64.b64decode(params["data"])
+        return {}
+
+    def _file_delete(self, sid, params):
+        self.files.pop(params["path"], None)
+        return {}
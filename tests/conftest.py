@@ -0,0 +1,106 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+import sys
+import os
+import shutil
+import socket
+import ssl
+import subprocess
+import threading
+import time
+import types
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import pytest
+import jsonrpcdevice
+import jsonrpcdevice_fake
+from jsonrpcdevice_fake import FakeDevice
+
+T0 = 1_700_000_005
+
+
+@pytest.fixture
+def fake():
+    return FakeDevice("IRF3821", seed=1)
+
+
+@pytest.fixture
+def dev(fake):
+    device = jsonrpcdevice.AdstecJSONRPCDevice("fake", "admin", "admin", transport=fake)
+    yield device
+    device.close()
+
+
+@pytest.fixture
+def fleet(fake):
+    inventory = [{"host": "fake", "user": "admin", "password": "admin", "product": fake.product}]
+    fleet = jsonrpcdevice.Fleet(inventory, backoff=0.0, transport=fake)
+    yield fleet
+    fleet.close()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Clock behind the datacollection slots of the fake, set by the test."""
+    clock = types.SimpleNamespace(now=T0)
+    monkeypatch.setattr(jsonrpcdevice_fake, "time", types.SimpleNamespace(
+        time=lambda: clock.now, monotonic=time.monotonic, sleep=time.sleep))
+    return clock
+
+
+class Listener:
+    """
+    Web server port of a device: completes TLS handshakes and hangs up.
+    The requests themselves go to the fake device.
+    """
+
+    def __init__(self, cert, key):
+        self.context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        self.context.load_cert_chain(cert, key)
+        self.port = 0
+        self.sock = None
+
+    def start(self):
+        self.sock = socket.socket()
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(("127.0.0.1", self.port))
+        self.sock.listen()
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self._serve, args=(self.sock,), daemon=True).start()
+
+    def stop(self):
+        self.sock.shutdown(socket.SHUT_RDWR)   # wakes up accept()
+        self.sock.close()
+
+    def _serve(self, sock):
+        while True:
+            try:
+                conn, _ = sock.accept()
+            except OSError:
+                return
+            conn.settimeout(1.0)
+            try:
+                self.context.wrap_socket(conn, server_side=True).close()
+            except OSError:
+                conn.close()
+
+
+@pytest.fixture(scope="session")
+def certificate(tmp_path_factory):
+    if shutil.which("openssl") is None:
+        pytest.skip("needs the openssl command line tool")
+    directory = tmp_path_factory.mktemp("tls")
+    cert, key = str(directory / "cert.pem"), str(directory / "key.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", key,
+                    "-out", cert, "-days", "1", "-subj", "/CN=127.0.0.1"],
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return cert, key
+
+
+@pytest.fixture
+def listener(certificate):
+    listener = Listener(*certificate)
+    listener.start()
+    yield listener
+    if listener.sock.fileno() != -1:
+        listener.stop()
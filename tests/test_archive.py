@@ -0,0 +1,94 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+import time
+
+import pytest
+
+import jsonrpcdevice
+
+np = pytest.importorskip("numpy")
+
+T0 = 1_699_999_200   # on a whole hour
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return jsonrpcdevice.MetricArchive(str(tmp_path))
+
+
+def test_raw_samples_are_kept_in_order(archive):
+    assert archive.append("dev", {"cpu": [(T0, 1.0), (T0 + 1, None), (T0 + 2, 3.0)]}) == 2
+    # overlapping poll: only the newer samples are written
+    assert archive.append("dev", {"cpu": [{"ts": T0 + 2, "val": 3.0},
+                                          {"ts": T0 + 3, "val": 4.0}]}) == 1
+    ts, val = archive.query("dev", "cpu", step=1)
+    assert ts.tolist() == [T0, T0 + 2, T0 + 3]
+    assert val.tolist() == [1.0, 3.0, 4.0]
+    assert archive.devices() == ["dev"] and archive.metrics("dev") == ["cpu"]
+
+
+def test_unsorted_samples_are_sorted_before_the_overlap_is_dropped(archive):
+    archive.append("dev", {"cpu": [(T0 + 10, 1.0)]})
+    assert archive.append("dev", {"cpu": [(T0 + 12, 3.0), (T0 + 9, 0.0), (T0 + 11, 2.0)]}) == 2
+    ts, _ = archive.query("dev", "cpu", step=1)
+    assert ts.tolist() == [T0 + 10, T0 + 11, T0 + 12]
+
+
+def test_minute_rollups(archive):
+    archive.append_columns("dev", "cpu", range(T0, T0 + 60), [float(i) for i in range(60)])
+    ts, _ = archive.query("dev", "cpu", step=60)
+    assert len(ts) == 0   # the bucket is still open
+    archive.append_columns("dev", "cpu", [T0 + 60, T0 + 61], [float("nan"), 100.0])
+    ts, mean = archive.query("dev", "cpu", step=60)
+    assert ts.tolist() == [T0] and mean.tolist() == [29.5]
+    assert archive.query("dev", "cpu", step=60, field="min")[1].tolist() == [0.0]
+    assert archive.query("dev", "cpu", step=60, field="max")[1].tolist() == [59.0]
+    assert archive.query("dev", "cpu", step=60, field="count")[1].tolist() == [60]
+
+
+def test_rollups_continue_after_a_restart(archive, tmp_path):
+    archive.append_columns("dev", "cpu", [T0, T0 + 1], [1.0, 2.0])
+    again = jsonrpcdevice.MetricArchive(str(tmp_path))
+    again.append_columns("dev", "cpu", [T0 + 2, T0 + 60], [3.0, 9.0])
+    ts, mean = again.query("dev", "cpu", step=60)
+    assert ts.tolist() == [T0] and mean.tolist() == [2.0]
+    assert again.query("dev", "cpu", step=60, field="count")[1].tolist() == [3]
+
+
+def test_hour_rollups_are_built_from_minutes(archive):
+    hour = T0 + 3600
+    archive.append_columns("dev", "cpu", [hour - 120, hour - 60, hour], [1.0, 3.0, 5.0])
+    assert len(archive.query("dev", "cpu", step=3600)[0]) == 0
+    # the first minute of the next hour is complete once the second one starts
+    archive.append_columns("dev", "cpu", [hour + 60], [7.0])
+    ts, mean = archive.query("dev", "cpu", step=3600)
+    assert ts.tolist() == [hour - 3600] and mean.tolist() == [2.0]
+
+
+def test_retention(tmp_path):
+    archive = jsonrpcdevice.MetricArchive(str(tmp_path), retention={1: 100})
+    archive.append_columns("dev", "cpu", range(T0, T0 + 200), [1.0] * 200)
+    assert archive.compact(now=T0 + 200) == 100
+    ts, _ = archive.query("dev", "cpu", step=1)
+    assert ts[0] == T0 + 100 and len(ts) == 100
+    # the rollups have their own, longer retention
+    assert len(archive.query("dev", "cpu", step=60)[0]) == 3
+    assert archive.compact(now=T0 + 200) == 0
+
+
+def test_query_picks_the_level_by_retention(archive):
+    start = int(time.time()) // 60 * 60 - 2 * 86400
+    archive.append_columns("dev", "cpu", [start, start + 60], [1.0, 2.0])
+    assert len(archive.query("dev", "cpu", start=start)[0]) == 1   # older than a day: minutes
+    assert len(archive.query("dev", "cpu", start=start, step=1)[0]) == 2
+
+
+def test_collector_archives_the_device(fake, dev, archive):
+    collector = jsonrpcdevice.MetricCollector(archive, {"dev": dev},
+                                              metrics=lambda m: m.startswith("system."))
+    written = collector.collect_once()
+    assert written["dev"] > 0 and not collector.errors
+    assert archive.metrics("dev") == sorted(m for m in fake.metrics if m.startswith("system."))
+    assert collector.collect_once()["dev"] >= 0
+    assert fake.calls["datacollection", "get_metrics"] == 1
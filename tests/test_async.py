@@ -0,0 +1,71 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+import asyncio
+
+import pytest
+
+import jsonrpcdevice
+
+pytest.importorskip("httpx")
+
+
+def test_wait_for_host_is_online(fake):
+    async def main():
+        async with jsonrpcdevice.async_client(transport=fake.async_transport()) as client:
+            return await jsonrpcdevice.async_wait_for_host_is_online("fake", interval=0, client=client)
+
+    assert asyncio.run(main()) is True
+
+
+def test_get_sid_logs_in(fake):
+    async def main():
+        async with jsonrpcdevice.async_client(transport=fake.async_transport()) as client:
+            dev = jsonrpcdevice.AsyncAdstecJSONRPCDevice("fake", "admin", "admin", client=client)
+            await dev.get_sid()
+            return dev.sid, await dev.status("boot_finished")
+
+    sid, booted = asyncio.run(main())
+    assert sid in fake.sessions
+    assert booted == "yes"
+    assert fake.calls["session", "create"] == 1
+
+
+def run(fake, coro, **kwargs):
+    async def main():
+        async with jsonrpcdevice.async_client(transport=fake.async_transport()) as client:
+            dev = jsonrpcdevice.AsyncAdstecJSONRPCDevice("fake", "admin", "admin", client=client,
+                                                         **kwargs)
+            return await coro(dev)
+    return asyncio.run(main())
+
+
+def test_validator_checks_before_sending(fake):
+    async def write(dev):
+        await dev.config_set(await dev.sess_start(), {"sc_pin": "12"})
+
+    with pytest.raises(jsonrpcdevice.ValidationError):
+        run(fake, write, validator=fake.schema.validator())
+    assert fake.calls["config", "set"] == 0
+
+
+def test_hooks_see_every_call(fake):
+    metrics = jsonrpcdevice.CallMetrics()
+
+    async def read(dev):
+        await dev.status("boot_finished")
+        fake.inject("connect")
+        with pytest.raises(jsonrpcdevice.TransportError):
+            await dev.status("boot_finished")
+
+    run(fake, read, hooks=[metrics])
+    counts = metrics.as_dict()
+    assert counts["session.create"]["calls"] == 1
+    assert counts["status.get[boot_finished]"]["calls"] == 2
+    assert counts["status.get[boot_finished]"]["errors"] == 1
+
+
+@pytest.mark.parametrize("option", ["sid_cache", "cache"])
+def test_caches_are_rejected(option):
+    with pytest.raises(TypeError):
+        jsonrpcdevice.AsyncAdstecJSONRPCDevice("fake", "admin", "admin", **{option: True})
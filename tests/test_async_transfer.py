@@ -0,0 +1,82 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+import asyncio
+import os
+
+import pytest
+
+import jsonrpcdevice
+
+pytest.importorskip("httpx")
+
+
+def run(fake, coro):
+    async def main():
+        client = jsonrpcdevice.async_client(transport=fake.async_transport())
+        dev = jsonrpcdevice.AsyncAdstecJSONRPCDevice("fake", "admin", "admin", client=client)
+        try:
+            return await coro(dev)
+        finally:
+            await client.aclose()
+    return asyncio.run(main())
+
+
+def test_upload_reports_the_result(fake, tmp_path):
+    image = tmp_path / "firmware.bin"
+    image.write_bytes(os.urandom(10000))
+    result = run(fake, lambda dev: dev.upload_file("firmware", str(image)))
+    assert result.status_code == 200
+    assert result.bytes_sent > 10000
+    assert fake.uploads[-1][:2] == ("firmware", 10000)
+
+
+def test_upload_maps_http_errors(fake, tmp_path):
+    image = tmp_path / "firmware.bin"
+    image.write_bytes(b"x")
+
+    async def upload(dev):
+        await dev.get_sid()
+        fake.inject("unavailable")
+        await dev.upload_file("firmware", str(image), retries=0)
+
+    with pytest.raises(jsonrpcdevice.DeviceBusy):
+        run(fake, upload)
+
+
+@pytest.mark.parametrize("kind", ["connect", "timeout", "unavailable"])
+def test_upload_is_restarted(fake, tmp_path, kind):
+    image = tmp_path / "firmware.bin"
+    image.write_bytes(os.urandom(10000))
+
+    async def upload(dev):
+        await dev.get_sid()
+        fake.inject(kind, 2)
+        return await dev.upload_file("firmware", str(image), backoff=0)
+
+    result = run(fake, upload)
+    assert result.attempts == 3
+    assert fake.uploads == [("firmware", 10000, fake.uploads[0][2])]
+
+
+def test_download_renames_the_complete_file(fake, tmp_path):
+    fake.files["diag.tar.gz"] = os.urandom(100000)
+    target = str(tmp_path / "diag.tar.gz")
+    result = run(fake, lambda dev: dev.download_file("diag.tar.gz", target))
+    assert result.size == 100000
+    with open(target, "rb") as f:
+        assert f.read() == fake.files["diag.tar.gz"]
+    assert not os.path.exists(target + ".part")
+
+
+def test_failed_download_leaves_no_file(fake, tmp_path):
+    target = str(tmp_path / "diag.tar.gz")
+
+    async def download(dev):
+        await dev.get_sid()
+        fake.inject("timeout")
+        await dev.download_file("diag.tar.gz", target)
+
+    with pytest.raises(jsonrpcdevice.TransportError):
+        run(fake, download)
+    assert os.listdir(tmp_path) == []
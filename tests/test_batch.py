@@ -0,0 +1,67 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+import pytest
+import jsonrpcdevice
+from jsonrpcdevice_fake import FakeDevice
+
+
+def test_batch_resolves_all_calls(dev, fake):
+    with dev.batch() as b:
+        product = b.status("product")
+        comsrv = b.config_get(["comsrv"])
+    assert product.result() == "IRF3821"
+    assert comsrv.result() == {"result": [{"comsrv": "disabled"}]}
+    assert dev.batch_supported is True
+
+
+def test_failed_execute_fails_every_future(dev, fake):
+    dev.get_sid()
+    b = dev.batch()
+    futures = [b.status("product"), b.config_get(["comsrv"])]
+    fake.inject("connect")
+    with pytest.raises(jsonrpcdevice.TransportError):
+        b.execute()
+    for future in futures:
+        assert future.done()
+        with pytest.raises(jsonrpcdevice.TransportError):
+            future.result(timeout=0)
+
+
+class OldFirmware(FakeDevice):
+    """Answers JSON-RPC arrays with a single error envelope."""
+
+    def handle(self, method, path, headers, chunks, failure=None):
+        chunks = list(chunks)
+        if path == "/rpc" and b"".join(chunks).lstrip().startswith(b"["):
+            return 200, {"Content-Type": "application/json"}, (
+                b'{"jsonrpc": "2.0", "id": null, '
+                b'"error": {"code": -32600, "message": "Invalid request"}}')
+        return super().handle(method, path, headers, chunks, failure)
+
+
+def test_rejected_array_falls_back_to_single_calls():
+    fake = OldFirmware("IRF3821")
+    dev = jsonrpcdevice.AdstecJSONRPCDevice("fake", "admin", "admin", transport=fake)
+    with dev.batch() as b:
+        product = b.status("product")
+        comsrv = b.config_get(["comsrv"])
+    assert product.result() == "IRF3821"
+    assert comsrv.result() == {"result": [{"comsrv": "disabled"}]}
+    assert dev.batch_supported is False
+
+
+def test_busy_device_keeps_batches(dev, fake):
+    dev.get_sid()
+    b = dev.batch()
+    future = b.status("product")
+    fake.inject("unavailable")
+    with pytest.raises(jsonrpcdevice.DeviceBusy):
+        b.execute()
+    with pytest.raises(jsonrpcdevice.DeviceBusy):
+        future.result(timeout=0)
+    assert dev.batch_supported is not False
+    with dev.batch() as b:
+        product = b.status("product")
+    assert product.result() == "IRF3821"
+    assert dev.batch_supported is True
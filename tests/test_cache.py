@@ -0,0 +1,36 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+import pytest
+
+import jsonrpcdevice
+
+
+@pytest.fixture
+def cached(fake):
+    device = jsonrpcdevice.AdstecJSONRPCDevice("fake", "admin", "admin", transport=fake, cache=True)
+    yield device
+    device.close()
+
+
+def test_table_up_invalidates_its_table(fake, cached):
+    fake.tables["ipgroups"] = [{"name": "a", "network": "10.0.0.0/24"}]
+    assert cached.table_get("ipgroups", "name", "a")["result"][0]["network"] == "10.0.0.0/24"
+    cfg = cached.sess_start()
+    cached.table_up("ipgroups", cfg, {"name": "a"}, {"network": "10.1.0.0/16"})
+    cached.sess_commit(cfg)
+    assert cached.table_get("ipgroups", "name", "a")["result"][0]["network"] == "10.1.0.0/16"
+
+
+def test_table_up_without_table_name_invalidates_all_tables():
+    cache = jsonrpcdevice.ConfigCache()
+    cache.put(("table", "ipgroups", "name", '"a"'), [{"name": "a"}])
+    cache.put(("table", "macgroups", "name", '"b"'), [{"name": "b"}])
+    cache.put(("config", "comsrv"), "disabled")
+    # config_update() sends table_up without a table name
+    cache.track("table_up", {"cfg_session_id": "1", "condition": {"name": "a"},
+                             "values": {"network": "10.1.0.0/16"}})
+    cache.track("sess_commit", {"cfg_session_id": "1"})
+    assert not cache.get(("table", "ipgroups", "name", '"a"'))[0]
+    assert not cache.get(("table", "macgroups", "name", '"b"'))[0]
+    assert cache.get(("config", "comsrv")) == (True, "disabled")
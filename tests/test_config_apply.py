@@ -0,0 +1,50 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+import jsonrpcdevice
+
+
+def groups(*names):
+    return [{"name": name, "network": f"10.0.{i}.0/24"} for i, name in enumerate(names)]
+
+
+def test_insert_keeps_desired_order(fake, dev):
+    fake.tables["ipgroups"] = groups("a", "c")
+    delta = dev.config_apply({"tables": {"ipgroups": groups("a", "b", "c")}},
+                             keys={"ipgroups": "name"})
+    assert delta.operations
+    assert [row["name"] for row in fake.tables["ipgroups"]] == ["a", "b", "c"]
+
+
+def test_appended_rows_are_only_inserted(fake, dev):
+    fake.tables["ipgroups"] = groups("a", "b")
+    delta = dev.config_apply({"tables": {"ipgroups": groups("a", "b", "c")}},
+                             keys={"ipgroups": "name"})
+    assert delta.operations == 1
+    assert [row["name"] for row in fake.tables["ipgroups"]] == ["a", "b", "c"]
+
+
+def test_unordered_table_is_matched_by_key(fake, dev):
+    fake.tables["ipgroups"] = groups("b", "a")
+    delta = dev.config_diff({"tables": {"ipgroups": groups("a", "b")}},
+                            keys={"ipgroups": "name"}, ordered=False)
+    assert delta.operations == 2   # the network of both rows changed places
+
+
+def test_inserts_are_sent_one_by_one(fake, dev):
+    fake.tables["ipgroups"] = []
+    dev.config_apply({"tables": {"ipgroups": groups("a", "b", "c")}},
+                     keys={"ipgroups": "name"})
+    assert fake.calls[("config", "table_set")] == 3
+
+
+def test_diff_bypasses_the_cache(fake):
+    dev = jsonrpcdevice.AdstecJSONRPCDevice("fake", "admin", "admin", transport=fake, cache=True)
+    try:
+        assert dev.config_get(["comsrv"])["result"] == [{"comsrv": "disabled"}]
+        fake.config["comsrv"] = "enabled"   # changed by another client
+        delta = dev.config_apply({"configdata": {"comsrv": "disabled"}})
+        assert delta.operations == 1
+        assert fake.config["comsrv"] == "disabled"
+    finally:
+        dev.close()
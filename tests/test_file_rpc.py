@@ -0,0 +1,64 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+import hashlib
+import os
+
+import pytest
+
+import jsonrpcdevice
+from jsonrpcdevice_fake import FakeDevice
+
+
+class Garbling(FakeDevice):
+    """Fake device that cuts off or replaces the answers to file calls."""
+
+    mode = None
+
+    def handle(self, method, path, headers, chunks, failure=None):
+        chunks = list(chunks)
+        status, headers, content = super().handle(method, path, headers, chunks, failure)
+        if b'"file"' in b"".join(chunks):
+            if self.mode == "truncate":
+                content = content[:len(content) // 2]
+            elif self.mode == "html":
+                content = b"<html>Internal error</html>"
+        return status, headers, content
+
+
+@pytest.fixture
+def garbling():
+    fake = Garbling("IRF3821", seed=1)
+    device = jsonrpcdevice.AdstecJSONRPCDevice("fake", "admin", "admin", transport=fake)
+    yield fake, device
+    device.close()
+
+
+def test_file_read_checks_the_digest(fake, dev, tmp_path):
+    data = os.urandom(5000)
+    fake.files["/tmp/settings.cf2"] = data
+    dst = str(tmp_path / "settings.cf2")
+    result = dev.file_read("/tmp/settings.cf2", dst,
+                           expected_sha256=hashlib.sha256(data).hexdigest())
+    assert result.size == 5000
+    with pytest.raises(jsonrpcdevice.DeviceError, match="SHA-256 mismatch"):
+        dev.file_read("/tmp/settings.cf2", dst + "2", expected_sha256="0" * 64)
+    assert sorted(os.listdir(tmp_path)) == ["settings.cf2"]
+
+
+def test_truncated_file_read(garbling, tmp_path):
+    fake, dev = garbling
+    fake.files["/tmp/settings.cf2"] = os.urandom(5000)
+    fake.mode = "truncate"
+    with pytest.raises(jsonrpcdevice.TransportError):
+        dev.file_read("/tmp/settings.cf2", str(tmp_path / "settings.cf2"))
+    assert os.listdir(tmp_path) == []
+
+
+def test_file_write_without_json_answer(garbling, tmp_path):
+    fake, dev = garbling
+    src = tmp_path / "upsettings"
+    src.write_bytes(b"settings")
+    fake.mode = "html"
+    with pytest.raises(jsonrpcdevice.TransportError, match="Invalid JSON"):
+        dev.file_write("/tmp/upsettigs", str(src))
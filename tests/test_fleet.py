@@ -0,0 +1,64 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+import pytest
+
+import jsonrpcdevice
+
+
+def boot_finished(dev):
+    return dev.status("boot_finished")
+
+
+def test_failed_connection_is_retried(fake, fleet):
+    fake.inject("connect", 2)
+    [result] = fleet.map(boot_finished)
+    assert result.ok and result.value == "yes"
+    assert result.attempts == 3
+
+
+def test_connect_flag(fake, dev):
+    fake.inject("connect")
+    with pytest.raises(jsonrpcdevice.TransportError) as info:
+        dev.status("boot_finished")
+    assert info.value.connect and not info.value.timeout
+    fake.inject("timeout")
+    with pytest.raises(jsonrpcdevice.TransportError) as info:
+        dev.status("boot_finished")
+    assert info.value.timeout and not info.value.connect
+
+
+@pytest.mark.parametrize("kind", ["timeout", "busy", "unavailable"])
+def test_sent_request_is_not_repeated(fake, fleet, kind):
+    fleet.map(boot_finished)   # log in first
+    fake.inject(kind)
+    [result] = fleet.map(lambda dev: dev.config_set_commit({"comsrv": "enabled"}))
+    assert not result.ok and result.attempts == 1
+    assert fake.calls["config", "sess_start"] <= 1
+
+
+@pytest.mark.parametrize("kind", ["timeout", "busy", "unavailable"])
+def test_idempotent_operation_is_retried(fake, fleet, kind):
+    fleet.map(boot_finished)
+    fake.inject(kind)
+    [result] = fleet.map(boot_finished, idempotent=True)
+    assert result.ok and result.attempts == 2
+
+
+def test_retries_stop_at_the_deadline(fake, fleet):
+    fleet.retries = 100
+    fleet.backoff = 0.02
+    fleet.deadline = 0.1
+    fake.inject("connect", 100)
+    [result] = fleet.map(boot_finished)
+    assert not result.ok
+    assert 1 < result.attempts < 6
+    # no backoff sleeps past the deadline; only the last attempt may end after it
+    assert result.elapsed < 0.2
+
+
+def test_other_errors_fail_at_once(fake, fleet):
+    [result] = fleet.map(lambda dev: dev.call("config", "get"), idempotent=True)
+    assert not result.ok and result.attempts == 1
+    assert isinstance(result.error, jsonrpcdevice.DeviceError)
+    assert fleet.summary()["failed"] == 1
@@ -0,0 +1,60 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+import jsonrpcdevice
+
+from conftest import T0
+
+
+def expected(ts, i=0):
+    return float((ts * (i + 1)) % 1000)
+
+
+def test_only_new_slots_are_read(fake, dev, clock):
+    stream = jsonrpcdevice.MetricStream(dev, ["ETH1.rx_bytes"])
+    first = stream.poll(now=clock.now)["ETH1.rx_bytes"]
+    # the device fills its slots every 10 s, the last 5 are still null
+    assert first[0] == (T0 - 600, expected(T0 - 600))
+    assert first[-1] == (T0 - 6, expected(T0 - 6))
+    assert stream.points == 601
+    assert stream.clock_offset == -6
+
+    clock.now += 10
+    second = stream.poll(now=clock.now)["ETH1.rx_bytes"]
+    assert [ts for ts, _ in second] == list(range(T0 - 5, T0 + 5))
+    assert stream.points == 601 + 10
+    assert stream.latest("ETH1.rx_bytes") == expected(T0 + 4)
+    assert len(stream.history["ETH1.rx_bytes"]) == 600
+    assert fake.calls["datacollection", "get_values_as_table"] == 2
+
+
+def test_metrics_are_read_in_one_call_per_start(fake, dev, clock):
+    stream = jsonrpcdevice.MetricStream(dev, ["system.cpu", "ETH1.tx_bytes"])
+    stream.poll(now=clock.now)
+    clock.now += 10
+    stream.poll(now=clock.now)
+    assert fake.calls["datacollection", "get_values_as_table"] == 2
+    assert stream.latest("system.cpu") is not None
+    assert stream.latest("no.such.metric") is None
+
+
+def test_slots_lost_between_polls_are_gaps(dev, clock):
+    stream = jsonrpcdevice.MetricStream(dev, ["system.cpu"])
+    stream.poll(now=clock.now)
+    clock.now += 700
+    stream.poll(now=clock.now)
+    assert stream.gaps == [("system.cpu", T0 - 5, clock.now - 6 - 600)]
+    assert stream.stats()["gaps"] == 1
+
+
+def test_device_clock_set_back_is_resynced(dev, clock):
+    stream = jsonrpcdevice.MetricStream(dev, ["system.cpu"], resync_after=2)
+    stream.poll(now=T0)
+    clock.now -= 300
+    for now in (T0 + 10, T0 + 20):
+        assert stream.poll(now=now) == {"system.cpu": []}
+    # the third poll reads the whole window again and drops the old samples
+    assert stream.poll(now=T0 + 30)["system.cpu"]
+    history = stream.history["system.cpu"]
+    assert (history[0][0], history[-1][0]) == (T0 - 570, clock.now - 6)
+    assert stream.clock_offset == clock.now - 6 - (T0 + 30)
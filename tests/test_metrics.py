@@ -0,0 +1,58 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+import pytest
+
+import jsonrpcdevice
+
+
+@pytest.fixture
+def metrics(dev):
+    metrics = jsonrpcdevice.CallMetrics()
+    dev.get_sid()
+    dev.hooks.append(metrics)
+    return metrics
+
+
+def test_calls_are_counted_per_status_property(dev, metrics):
+    dev.status("boot_finished")
+    dev.status("boot_finished")
+    dev.status("product")
+    counts = metrics.as_dict()
+    assert counts["status.get[boot_finished]"]["calls"] == 2
+    assert counts["status.get[product]"]["calls"] == 1
+    seconds = counts["status.get[boot_finished]"]["seconds"]
+    assert seconds["total"]["count"] == 2
+    assert seconds["connect"]["count"] == 0   # no sockets with a fake transport
+
+
+def test_batch_is_reported_per_call(dev, metrics):
+    with dev.batch() as b:
+        b.status("boot_finished")
+        b.status("product")
+        b.config_get(["comsrv"])
+    counts = metrics.as_dict()
+    assert sorted(counts) == ["config.get", "status.get[boot_finished]", "status.get[product]"]
+    assert all(entry["calls"] == 1 for entry in counts.values())
+    sent = [entry["bytes"]["sent"]["sum"] for entry in counts.values()]
+    assert len(set(sent)) == 1   # each call gets an equal share of the request
+
+
+def test_errors_and_rpc_errors(fake, dev, metrics):
+    fake.inject("connect")
+    with pytest.raises(jsonrpcdevice.TransportError):
+        dev.status("boot_finished")
+    with pytest.raises(jsonrpcdevice.DeviceError):
+        dev.call("config", "get")   # required keys missing
+    counts = metrics.as_dict()
+    assert counts["status.get[boot_finished]"]["errors"] == 1
+    assert counts["config.get"]["rpc_errors"] == 1
+
+
+def test_prometheus_export(dev, metrics):
+    dev.status("boot_finished")
+    text = metrics.prometheus()
+    labels = 'object="status",method="get",function="boot_finished"'
+    assert f"adstec_jsonrpc_calls_total{{{labels}}} 1" in text
+    assert f'adstec_jsonrpc_call_seconds_count{{{labels},phase="total"}} 1' in text
+    assert text.endswith("\n")
@@ -0,0 +1,84 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+import threading
+import time
+
+import pytest
+
+import jsonrpcdevice
+
+
+@pytest.fixture
+def listener(listener, dev):
+    dev.set_target(f"127.0.0.1:{listener.port}")
+    return listener
+
+
+def reboot(fake, listener, down=0.3, booting=0.3):
+    """
+    Go down, come back and report boot_finished after ``booting`` seconds;
+    return the times of the three changes.
+    """
+    changes = {}
+
+    def run():
+        time.sleep(0.1)
+        listener.stop()
+        fake.reboot(down)
+        fake.status["boot_finished"] = "no"
+        changes["offline"] = time.monotonic()
+        time.sleep(down)
+        listener.start()
+        changes["online"] = time.monotonic()
+        time.sleep(booting)
+        fake.status["boot_finished"] = "yes"
+        changes["booted"] = time.monotonic()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, changes
+
+
+def test_phases_are_noticed_quickly(fake, dev, listener):
+    seen = {}
+    waiter = jsonrpcdevice.RebootWaiter(timeout=10, min_interval=0.05, max_interval=0.2,
+                                        on_phase=lambda name, phase, elapsed:
+                                        seen.__setitem__(phase, time.monotonic()))
+    thread, changes = reboot(fake, listener)
+    result = waiter.wait(dev)
+    thread.join()
+    assert result.ok and result.error is None
+    assert result.offline < result.online < result.booted
+    assert result.device is dev and dev.status("boot_finished") == "yes"
+    for phase in ("offline", "online", "booted"):
+        # probes every min_interval, plus a TLS handshake or status call;
+        # the margin covers a loaded test machine, a fixed 3 s poll lags far more
+        assert seen[phase] - changes[phase] < 0.5, phase
+
+
+def test_device_that_is_up_is_only_checked(dev, listener):
+    result = jsonrpcdevice.RebootWaiter(timeout=5, expect_offline=False).wait(dev)
+    assert result.ok and result.offline is None
+    assert result.online is not None and result.booted is not None
+
+
+def test_timeout(dev, listener):
+    listener.stop()
+    result = jsonrpcdevice.RebootWaiter(timeout=0.3, max_interval=0.1).wait(dev)
+    assert not result.ok
+    assert isinstance(result.error, TimeoutError)
+    assert result.offline is not None and result.online is None
+
+
+def test_wait_for_reboot_prints_the_changes(fake, dev, listener, capsys):
+    thread, _ = reboot(fake, listener)
+    assert jsonrpcdevice.wait_for_reboot(dev.target, "admin", "admin", timeout=10,
+                                         device=dev) is dev
+    thread.join()
+    lines = [line for line in capsys.readouterr().out.splitlines() if line]
+    assert lines[0].endswith("Initial state: ONLINE")
+    assert lines[1] == "  Status code: 200"
+    assert lines[2].endswith("✗ Host went OFFLINE")
+    assert lines[3].endswith("✓ Host came ONLINE")
+    assert len(lines) == 4
@@ -0,0 +1,131 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+import json
+import threading
+import time
+
+import pytest
+
+import jsonrpcdevice
+
+OLD = "Ads-tec/IRF3xxx/2.2.8/SVN-R63743.B-181926"
+NEW = "Ads-tec/IRF3xxx/2.2.9/SVN-R64012.B-190311"
+
+
+@pytest.fixture
+def host(listener):
+    return f"127.0.0.1:{listener.port}"
+
+
+@pytest.fixture
+def fleet(fake, host):
+    inventory = [{"host": host, "user": "admin", "password": "admin", "product": fake.product}]
+    fleet = jsonrpcdevice.Fleet(inventory, backoff=0.0, transport=fake)
+    yield fleet
+    fleet.close()
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = tmp_path / "firmware.bin"
+    path.write_bytes(b"\x00" * 4096)
+    return str(path)
+
+
+@pytest.fixture
+def state_file(tmp_path):
+    return str(tmp_path / "rollout.json")
+
+
+def flash(fake, listener, delay=0.1, down=0.6):
+    """
+    Reboot the fake into the new firmware in the background; it is down for
+    longer than the waiter's default probe interval.
+    """
+    def run():
+        time.sleep(delay)
+        listener.stop()
+        fake.reboot(down)
+        fake.status["imageversion"] = NEW
+        time.sleep(down)
+        listener.start()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def rollout(fleet, image, state_file, **kwargs):
+    return jsonrpcdevice.FirmwareRollout(fleet, {"IRF3": (image, "2.2.9")}, state_file=state_file,
+                                         reboot_timeout=10, **kwargs)
+
+
+def write_state(state_file, host, **record):
+    record = dict({"product": "IRF3821", "version": "2.2.9", "before": OLD, "error": None},
+                  **record)
+    with open(state_file, "w") as f:
+        json.dump({"devices": {host: record}}, f)
+
+
+def test_update_and_run_again(fake, listener, fleet, host, image, state_file):
+    threads = []
+
+    def on_step(name, step, record):
+        if step == "rebooting" and not threads:
+            threads.append(flash(fake, listener))
+
+    summary = rollout(fleet, image, state_file, on_step=on_step).run()
+    threads[0].join()
+    assert summary["steps"] == {"done": 1, "pending": 0}
+    assert [upload[0] for upload in fake.uploads] == ["firmware"]
+    with open(state_file) as f:
+        record = json.load(f)["devices"][host]
+    assert (record["step"], record["before"], record["after"]) == ("done", OLD, NEW)
+
+    calls = sum(fake.calls.values())
+    assert rollout(fleet, image, state_file).run()["steps"]["done"] == 1
+    assert sum(fake.calls.values()) == calls
+    assert len(fake.uploads) == 1
+
+
+def test_cut_off_upload_is_restarted(fake, listener, fleet, host, image, state_file):
+    write_state(state_file, host, step="uploading")
+    thread = flash(fake, listener, delay=0.5)
+    summary = rollout(fleet, image, state_file).run()
+    thread.join()
+    assert summary["steps"]["done"] == 1
+    assert len(fake.uploads) == 1
+
+
+def test_upload_that_went_through_is_not_repeated(fake, fleet, host, image, state_file):
+    write_state(state_file, host, step="uploading")
+    fake.status["imageversion"] = NEW
+    assert rollout(fleet, image, state_file).run()["steps"]["done"] == 1
+    assert fake.uploads == []
+
+
+@pytest.mark.parametrize("step", ["rebooting", "booting", "verifying"])
+def test_rebooted_device_is_only_verified(fake, fleet, host, image, state_file, step):
+    write_state(state_file, host, step=step, offline=None)
+    fake.status["imageversion"] = NEW
+    summary = rollout(fleet, image, state_file).run()
+    assert summary["steps"]["done"] == 1
+    assert fake.uploads == []
+
+
+def test_device_still_flashing_is_waited_for(fake, listener, fleet, host, image, state_file):
+    write_state(state_file, host, step="rebooting", offline=None)
+    # flashing ends after the first check has found the old version
+    thread = flash(fake, listener, delay=1.0)
+    summary = rollout(fleet, image, state_file).run()
+    thread.join()
+    assert summary["steps"]["done"] == 1
+    assert fake.uploads == []
+
+
+def test_failed_device_is_left_alone(fake, fleet, host, image, state_file):
+    write_state(state_file, host, step="failed", error="TimeoutError: boot")
+    summary = rollout(fleet, image, state_file).run()
+    assert summary["errors"] == {host: "TimeoutError: boot"}
+    assert sum(fake.calls.values()) == 0
@@ -0,0 +1,68 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+import collections
+import time
+
+import jsonrpcdevice
+
+
+def test_polls_follow_the_grid(dev):
+    started = collections.defaultdict(list)
+
+    def poll(name, device):
+        started[name].append(time.time())
+        device.status("boot_finished")
+
+    devices = {"a": dev, "b": dev}
+    scheduler = jsonrpcdevice.PollScheduler(devices, poll, interval=0.2)
+    scheduler.run(duration=1.0)
+    for name in devices:
+        phase = scheduler.phase(name)
+        assert 0 <= phase < 0.2
+        assert 4 <= len(started[name]) <= 5
+        for t in started[name]:
+            assert (t - phase) % 0.2 < 0.05
+        stats = scheduler.stats()[name]
+        assert (stats.polls, stats.skipped, stats.errors) == (len(started[name]), 0, 0)
+        assert stats.max_lag < 0.05
+
+
+def test_phases_are_stable_and_spread():
+    names = [f"10.0.0.{i}" for i in range(100)]
+    first = jsonrpcdevice.PollScheduler(dict.fromkeys(names), None, interval=10, jitter=5)
+    second = jsonrpcdevice.PollScheduler(dict.fromkeys(names), None, interval=10, jitter=5)
+    phases = [first.phase(name) for name in names]
+    assert phases == [second.phase(name) for name in names]
+    assert all(0 <= p < 5 for p in phases)
+    assert max(phases) - min(phases) > 4
+
+
+def test_busy_device_skips_ticks(dev):
+    def poll(name, device):
+        time.sleep(0.5)
+
+    scheduler = jsonrpcdevice.PollScheduler({"slow": dev}, poll, interval=0.2)
+    scheduler.run(duration=1.0)
+    stats = scheduler.stats()["slow"]
+    assert stats.polls == 2
+    assert stats.skipped >= 2
+    assert 0.5 <= stats.duration < 0.6
+
+
+def test_errors_are_counted_per_device(fake, fleet):
+    fake.inject("connect")
+    polls = []
+
+    def poll(name, device):
+        polls.append(name)
+        device.status("boot_finished")
+        if len(polls) == 3:
+            scheduler.stop()
+
+    scheduler = jsonrpcdevice.PollScheduler(fleet, poll, interval=0.1)
+    scheduler.run(duration=5.0)
+    assert polls == ["fake"] * 3
+    stats = scheduler.stats()["fake"]
+    assert (stats.polls, stats.errors) == (3, 1)
+    assert isinstance(stats.last_error, jsonrpcdevice.TransportError)
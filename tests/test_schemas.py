@@ -0,0 +1,96 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+import os
+import shutil
+
+import pytest
+
+import jsonrpcdevice
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    directory = tmp_path / "schemas"
+    directory.mkdir()
+    shutil.copy(os.path.join(jsonrpcdevice.SchemaRegistry.schema_dir, "IRF3821.schema.json"),
+                directory)
+    parsed = []
+    parse = jsonrpcdevice.ProductSchema._parse
+
+    def counting(self):
+        parsed.append(self.product)
+        parse(self)
+
+    monkeypatch.setattr(jsonrpcdevice.ProductSchema, "_parse", counting)
+    registry = jsonrpcdevice.SchemaRegistry(str(directory), cache_dir=str(tmp_path / "cache"))
+    registry.parsed = parsed
+    return registry
+
+
+def reload(registry):
+    fresh = jsonrpcdevice.SchemaRegistry(registry.directory, cache_dir=registry.cache_dir)
+    return fresh.get("IRF3821")
+
+
+def test_cache_is_written_and_used(registry):
+    description = registry.get("IRF3821").properties["comsrv"]["description"]
+    cache_file = registry.cache_file("IRF3821")
+    assert os.path.exists(cache_file)
+    assert registry.parsed == ["IRF3821"]
+    schema = reload(registry)
+    assert schema.properties["comsrv"]["description"] == description
+    assert schema.rules and schema.version
+    assert registry.parsed == ["IRF3821"]
+
+
+def test_touched_file_keeps_the_cache(registry):
+    registry.get("IRF3821").properties
+    path = registry.get("IRF3821").path
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    assert reload(registry).properties
+    assert registry.parsed == ["IRF3821"]
+
+
+def test_changed_file_invalidates_the_cache(registry):
+    registry.get("IRF3821").properties
+    path = registry.get("IRF3821").path
+    st = os.stat(path)
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data.replace(b'"Serial COM server"', b'"Serial COM server (RS-232)"'))
+    # an editor that keeps the modification time does not hide the change
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert reload(registry).properties["comsrv"]["description"] == "Serial COM server (RS-232)"
+    assert registry.parsed == ["IRF3821"] * 2
+    assert reload(registry).properties["comsrv"]["description"] == "Serial COM server (RS-232)"
+    assert registry.parsed == ["IRF3821"] * 2
+
+
+@pytest.mark.parametrize("content", [b"", b"ADSC\xff\xff\x00\x00garbage", b"PK\x03\x04"])
+def test_broken_cache_is_ignored(registry, content):
+    registry.get("IRF3821").properties
+    with open(registry.cache_file("IRF3821"), "wb") as f:
+        f.write(content)
+    assert reload(registry).properties["comsrv"]
+    assert registry.parsed == ["IRF3821"] * 2
+
+
+def test_cache_can_be_disabled_or_unwritable(registry, tmp_path):
+    plain = jsonrpcdevice.SchemaRegistry(registry.directory, cache_dir=False)
+    assert plain.cache_file("IRF3821") is None
+    assert plain.get("IRF3821").properties
+    blocked = tmp_path / "blocked"
+    blocked.write_text("not a directory")
+    unwritable = jsonrpcdevice.SchemaRegistry(registry.directory, cache_dir=str(blocked / "x"))
+    assert unwritable.get("IRF3821").properties
+    assert registry.parsed == ["IRF3821"] * 2
+
+
+def test_schema_for_device(fake, dev):
+    schema = jsonrpcdevice.SchemaRegistry(cache_dir=False).for_device(dev)
+    assert schema.product == fake.product
+    with pytest.raises(ValueError):
+        jsonrpcdevice.SchemaRegistry(cache_dir=False).get("NOPE")
@@ -0,0 +1,72 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+import threading
+
+import pytest
+
+import jsonrpcdevice
+from jsonrpcdevice_fake import FakeDevice
+
+
+class Forgetful(FakeDevice):
+    """Fake device that answers an unknown SID with "Session not found"."""
+
+    def rpc(self, request, failure=None):
+        response = super().rpc(request, failure)
+        if response.get("error", {}).get("code") == -32002:
+            response["error"] = {"code": -32001, "message": "Session not found"}
+        return response
+
+
+def test_threads_share_one_session(dev):
+    start = threading.Barrier(8)
+    sessions = []
+
+    def use():
+        start.wait()
+        sessions.append(dev.session)
+
+    threads = [threading.Thread(target=use) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(session) for session in sessions}) == 1
+
+
+def test_expired_session_logs_in_again(fake, dev):
+    dev.status("boot_finished")
+    fake.sessions.clear()    # the device dropped the SID, e.g. after its idle timeout
+    assert dev.status("boot_finished") == "yes"
+    assert fake.calls["session", "create"] == 2
+
+
+class TestSessionNotFound:
+
+    @pytest.fixture
+    def fake(self):
+        return Forgetful("IRF3821", seed=1)
+
+    def test_call_logs_in_again(self, fake, dev):
+        dev.status("boot_finished")
+        fake.sessions.clear()
+        assert dev.status("boot_finished") == "yes"
+        assert fake.calls["session", "create"] == 2
+
+    def test_batch_logs_in_again(self, fake, dev):
+        dev.status("boot_finished")
+        fake.sessions.clear()
+        with dev.batch() as b:
+            futures = [b.call("status", "get", function=name, parameters=["", ""])
+                       for name in ("boot_finished", "product")]
+        assert [f.result() for f in futures] == [{"boot_finished": "yes"}, {"product": "IRF3821"}]
+        assert fake.calls["session", "create"] == 2
+
+    def test_file_read_logs_in_again(self, fake, dev, tmp_path):
+        fake.files["/tmp/settings.cf2"] = b"settings"
+        dev.status("boot_finished")
+        fake.sessions.clear()
+        result = dev.file_read("/tmp/settings.cf2", str(tmp_path / "settings.cf2"))
+        assert result.size == 8
+        assert fake.calls["session", "create"] == 2
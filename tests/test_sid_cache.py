@@ -0,0 +1,93 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+import multiprocessing
+import os
+import stat
+import time
+
+import pytest
+
+import jsonrpcdevice
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return jsonrpcdevice.SIDCache(str(tmp_path / "cache" / "sids.json"))
+
+
+def device(fake, cache):
+    return jsonrpcdevice.AdstecJSONRPCDevice("fake", "admin", "admin", transport=fake,
+                                             sid_cache=cache)
+
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_files_are_private(cache):
+    cache.store("10.0.0.1", "admin", "sid", time.time() + 60)
+    assert mode(os.path.dirname(cache.filename)) == 0o700
+    assert mode(cache.filename) == 0o600
+    assert mode(cache.filename + ".lock") == 0o600
+
+
+def test_entries_expire_and_are_removed(cache):
+    cache.store("10.0.0.1", "admin", "old", time.time() - 1)
+    cache.store("10.0.0.2", "admin", "new", time.time() + 60)
+    assert cache.get("10.0.0.1", "admin") is None
+    assert cache.get("10.0.0.2", "admin")[0] == "new"
+    assert cache.get("10.0.0.2", "root") is None
+    cache.remove("10.0.0.2", "admin")
+    assert cache.get("10.0.0.2", "admin") is None
+
+
+def test_broken_file_is_empty(cache):
+    cache.store("10.0.0.1", "admin", "sid", time.time() + 60)
+    with open(cache.filename, "w") as f:
+        f.write("{not json")
+    assert cache.get("10.0.0.1", "admin") is None
+    cache.store("10.0.0.1", "admin", "sid", time.time() + 60)
+    assert cache.get("10.0.0.1", "admin")[0] == "sid"
+
+
+def store_many(filename, worker):
+    cache = jsonrpcdevice.SIDCache(filename)
+    for i in range(20):
+        cache.store(f"10.0.{worker}.{i}", "admin", f"sid{worker}.{i}", time.time() + 60)
+
+
+@pytest.mark.skipif(jsonrpcdevice.fcntl is None, reason="needs fcntl")
+def test_concurrent_processes_keep_every_entry(cache):
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=store_many, args=(cache.filename, w)) for w in range(6)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert all(worker.exitcode == 0 for worker in workers)
+    for w in range(6):
+        for i in range(20):
+            assert cache.get(f"10.0.{w}.{i}", "admin")[0] == f"sid{w}.{i}"
+
+
+def test_devices_share_the_session(fake, cache):
+    first = device(fake, cache)
+    first.status("boot_finished")
+    first.close()
+    second = device(fake, cache)
+    assert second.status("boot_finished") == "yes"
+    assert second.sid == first.sid
+    assert fake.calls["session", "create"] == 1
+    second.logout()
+    assert cache.get("fake", "admin") is None
+
+
+def test_rejected_sid_is_replaced(fake, cache):
+    first = device(fake, cache)
+    first.status("boot_finished")
+    fake.sessions.clear()
+    second = device(fake, cache)
+    assert second.status("boot_finished") == "yes"
+    assert fake.calls["session", "create"] == 2
+    assert cache.get("fake", "admin")[0] == second.sid != first.sid
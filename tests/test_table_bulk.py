@@ -0,0 +1,36 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+import pytest
+
+
+def groups(*names):
+    return [{"name": name, "network": f"10.0.{i}.0/24"} for i, name in enumerate(names)]
+
+
+def test_deletes_and_updates_use_a_session(fake, dev):
+    fake.tables["ipgroups"] = groups("a", "b", "c")
+    dev.table_bulk("ipgroups",
+                   deletes=[{"name": "a"}],
+                   updates=[({"name": "b"}, {"network": "10.1.0.0/16"})],
+                   inserts=[["d", "10.2.0.0/16"]])
+    assert [(row["name"], row["network"]) for row in fake.tables["ipgroups"]] == [
+        ("b", "10.1.0.0/16"), ("c", "10.0.2.0/24"), ("d", "10.2.0.0/16")]
+    assert fake.calls[("config", "sess_commit")] == 1
+    assert fake.calls[("config", "import_config")] == 1
+
+
+def test_flush_replaces_the_table(fake, dev):
+    fake.tables["ipgroups"] = groups("a", "b")
+    dev.table_bulk("ipgroups", inserts=groups("x"), flush=True)
+    assert [row["name"] for row in fake.tables["ipgroups"]] == ["x"]
+
+
+def test_too_large_payload_needs_split(fake, dev):
+    rows = groups(*(f"group{i}" for i in range(50)))
+    with pytest.raises(ValueError):
+        dev.table_bulk("ipgroups", inserts=rows, max_bytes=1024)
+    assert not fake.calls[("config", "import_config")]
+    results = dev.table_bulk("ipgroups", inserts=rows, max_bytes=1024, split=True)
+    assert len(results) > 1
+    assert len(fake.tables["ipgroups"]) == 50
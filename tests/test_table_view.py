@@ -0,0 +1,66 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+import pytest
+
+import jsonrpcdevice
+
+
+@pytest.fixture
+def view(fake, dev):
+    fake.tables["ipgroups"] = [{"name": f"group{i}", "network": f"10.0.{i % 3}.0/24"}
+                               for i in range(6)]
+    return jsonrpcdevice.TableView(dev, "ipgroups", index=["name"])
+
+
+def names(rows):
+    return [row["name"] for row in rows]
+
+
+def test_queries_read_the_table_once(fake, view):
+    assert names(view.find(network="10.0.1.0/24")) == ["group1", "group4"]
+    assert view.get(name="group4")["network"] == "10.0.1.0/24"
+    assert view.get(name="nope") is None
+    assert view.count(lambda row: row["name"] > "group2", network="10.0.2.0/24") == 1
+    view.add_index("network")
+    assert names(view.find(network="10.0.0.0/24", name="group3")) == ["group3"]
+    assert len(view) == 6
+    assert (view.fetches, fake.calls["config", "export_pages"]) == (1, 1)
+
+
+def test_committed_changes_are_applied(fake, dev, view):
+    len(view)
+    cfg = dev.sess_start()
+    dev.table_insert("ipgroups", cfg, ["group6", "10.0.9.0/24"])
+    dev.table_up("ipgroups", cfg, {"name": "group1"}, {"network": "10.1.0.0/16"})
+    dev.table_del("ipgroups", cfg, {"name": "group2"})
+    assert view.get(name="group2") is not None   # not before the commit
+    dev.sess_commit(cfg)
+    assert view.get(name="group1")["network"] == "10.1.0.0/16"
+    assert view.get(name="group2") is None
+    assert names(view.find(network="10.0.9.0/24")) == ["group6"]
+    assert list(view) == fake.tables["ipgroups"]
+    assert view.fetches == 1
+
+
+def test_aborted_session_is_dropped(dev, view):
+    len(view)
+    cfg = dev.sess_start()
+    dev.table_del("ipgroups", cfg, {"name": "group0"})
+    dev.call("config", "sess_abort", cfg_session_id=cfg)
+    assert len(view) == 6 and view.fetches == 1
+
+
+def test_import_makes_the_view_stale(fake, dev, view):
+    len(view)
+    dev.table_bulk("ipgroups", inserts=[["group6", "10.0.9.0/24"]])
+    assert view.stale
+    assert len(view) == 7 and view.fetches == 2
+
+
+def test_update_without_table_name_makes_the_view_stale(view):
+    len(view)
+    view.track("table_up", {"cfg_session_id": "1", "values": {"x": "1"}, "condition": {}})
+    assert not view.stale
+    view.track("sess_commit", {"cfg_session_id": "1"})
+    assert view.stale
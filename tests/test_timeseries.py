@@ -0,0 +1,67 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+import pytest
+
+import jsonrpcdevice
+
+from conftest import T0
+
+np = pytest.importorskip("numpy")
+
+
+def table(*points):
+    return {"result": {"system.cpu": [{"ts": ts, "val": val} for ts, val in points]}}
+
+
+def test_stream_polls_are_summed_per_slot(dev, clock):
+    stream = jsonrpcdevice.MetricStream(dev, ["ETH1.rx_bytes"])
+    store = jsonrpcdevice.TimeSeriesStore(retention=600, step=60, agg="sum")
+    for _ in range(3):
+        store.add(stream.poll(now=clock.now), source="fake")
+        clock.now += 10
+    ts, val = store.series(("fake", "ETH1.rx_bytes"))
+    samples = list(stream.history["ETH1.rx_bytes"])
+    assert ts[-1] == samples[-1][0] - samples[-1][0] % 60
+    assert val[-1] == sum(v for t, v in samples if t >= ts[-1])
+    # the store keeps 10 whole minutes, the oldest partial one has rolled out
+    assert val.sum() == sum(v for t, v in samples if t >= ts[0])
+
+
+@pytest.mark.parametrize("agg, expected", [("last", 2.0), ("sum", 6.0), ("mean", 2.0)])
+def test_samples_in_one_slot(agg, expected):
+    store = jsonrpcdevice.TimeSeriesStore(retention=600, step=60, agg=agg)
+    store.add(table((T0, 1.0), (T0 + 20, 3.0)))
+    store.add(table((T0 + 30, 2.0), (T0 + 35, None)))
+    assert store.last("system.cpu")[0] == expected
+
+
+def test_old_slots_roll_out():
+    store = jsonrpcdevice.TimeSeriesStore(retention=300, step=60)
+    store.add(table((T0, 1.0)), source="a")
+    store.add(table((T0, 2.0)), source="b")
+    store.add(table((T0 + 300, 3.0)), source="a")
+    # the slot was reused for a later time, so b's old value is gone as well
+    assert np.isnan(store.last(("b", "system.cpu"))[0])
+    ts, _ = store.frame()
+    assert len(ts) == 5 and ts[-1] == T0 + 300 - (T0 + 300) % 60
+    store.add(table((T0, 4.0)), source="b")   # too old for any slot
+    assert np.isnan(store.last(("b", "system.cpu"))[0])
+
+
+def test_sources_share_the_grid():
+    store = jsonrpcdevice.TimeSeriesStore(retention=600, step=10, capacity=1)
+    for i, source in enumerate("abc"):
+        store.add(table((T0 - 25, 10.0 * i), (T0 - 5, 30.0 * i)), source=source)
+    assert len(store.values) >= 3 and list(store.keys) == [(s, "system.cpu") for s in "abc"]
+    ts, values = store.frame(start=T0 - 30)
+    assert list(ts) == [T0 - 35, T0 - 25, T0 - 15, T0 - 5]
+    assert np.isnan(values[:, [0, 2]]).all()
+    assert np.array_equal(store.last(), [0.0, 30.0, 60.0])
+    ts, rates = store.derivative()
+    assert np.array_equal(rates[:, -1], [0.0, 1.0, 2.0])   # bridges the empty slot
+    assert np.allclose(store.rate(window=30), [0.0, 40.0 / 30, 80.0 / 30])
+    ts, means = store.resample(60, how="sum")
+    assert np.array_equal(np.nansum(means, axis=1), [0.0, 40.0, 80.0])
+    with pytest.raises(ValueError):
+        store.resample(15)
@@ -0,0 +1,134 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+import hashlib
+import os
+
+import pytest
+
+import jsonrpcdevice
+from jsonrpcdevice_fake import FakeDevice
+
+
+class Cutting(FakeDevice):
+    """
+    Fake device whose downloads break off after ``cut`` bytes ``cuts`` times,
+    optionally without Range support or with the file changing meanwhile.
+    """
+
+    cut = 70000
+    cuts = 0
+    ranges = True
+    replacement = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ranges_asked = []
+
+    def _download(self, name, headers):
+        self.ranges_asked.append(headers.get("Range"))
+        if not self.ranges:
+            headers = {}
+        status, headers, content = super()._download(name, headers)
+        if self.cuts:
+            self.cuts -= 1
+            content = content[:self.cut]
+            if self.replacement is not None:
+                self.files[name] = self.replacement
+        return status, headers, content
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = tmp_path / "firmware.bin"
+    path.write_bytes(os.urandom(200000))
+    return str(path)
+
+
+@pytest.fixture
+def verified(dev):
+    dev.ensure_sid(verified=True)
+    return dev
+
+
+@pytest.mark.parametrize("kind", ["connect", "timeout", "unavailable"])
+def test_upload_is_restarted(fake, verified, image, kind):
+    sent = []
+    fake.inject(kind, 2)
+    result = verified.upload_file("firmware", image, backoff=0,
+                                  progress=lambda done, total: sent.append(done))
+    assert result.attempts == 3 and result.status_code == 200
+    with open(image, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    assert fake.uploads == [("firmware", 200000, digest)]
+    assert sent[-1] == result.bytes_sent
+
+
+def test_upload_gives_up_after_the_retries(fake, verified, image):
+    fake.inject("unavailable", 2)
+    with pytest.raises(jsonrpcdevice.DeviceBusy):
+        verified.upload_file("firmware", image, retries=1, backoff=0)
+    fake.inject("connect", 3)
+    with pytest.raises(jsonrpcdevice.TransportError) as info:
+        verified.upload_file("firmware", image, retries=2, backoff=0)
+    assert info.value.connect
+    assert fake.uploads == []
+
+
+def test_upload_is_not_restarted_after_a_client_error(fake, verified, image):
+    fake.sessions.clear()
+    with pytest.raises(jsonrpcdevice.AuthError):
+        verified.upload_file("firmware", image, backoff=0)
+    assert fake.uploads == []
+
+
+def test_upload_checks_its_arguments(dev, image):
+    with pytest.raises(Exception, match="Invalid file type"):
+        dev.upload_file("kernel", image)
+    with pytest.raises(Exception, match="does not exist"):
+        dev.upload_file("firmware", image + ".missing")
+
+
+class TestDownloadResume:
+
+    @pytest.fixture
+    def fake(self):
+        fake = Cutting("IRF3821", seed=1)
+        fake.files["diag.tar.gz"] = os.urandom(200000)
+        return fake
+
+    def download(self, dev, tmp_path, **kwargs):
+        return dev.download_file("diag.tar.gz", str(tmp_path / "diag.tar.gz"), checksum=True,
+                                 backoff=0, **kwargs)
+
+    def test_continues_with_a_range_request(self, fake, dev, tmp_path):
+        fake.cuts = 2
+        result = self.download(dev, tmp_path)
+        data = fake.files["diag.tar.gz"]
+        assert fake.ranges_asked == [None, "bytes=70000-", "bytes=140000-"]
+        assert (result.size, result.attempts) == (200000, 3)
+        assert result.sha256 == hashlib.sha256(data).hexdigest()
+        assert (tmp_path / "diag.tar.gz").read_bytes() == data
+        assert os.listdir(tmp_path) == ["diag.tar.gz"]
+
+    def test_starts_over_without_range_support(self, fake, dev, tmp_path):
+        fake.cuts = 1
+        fake.ranges = False
+        result = self.download(dev, tmp_path)
+        assert result.size == 200000
+        assert result.sha256 == hashlib.sha256(fake.files["diag.tar.gz"]).hexdigest()
+
+    def test_starts_over_when_the_file_changed(self, fake, dev, tmp_path):
+        fake.cuts = 1
+        fake.replacement = os.urandom(150000)
+        result = self.download(dev, tmp_path)
+        assert fake.ranges_asked == [None, "bytes=70000-"]
+        assert result.size == 150000
+        assert result.sha256 == hashlib.sha256(fake.replacement).hexdigest()
+        assert (tmp_path / "diag.tar.gz").read_bytes() == fake.replacement
+
+    def test_gives_up_without_leaving_a_file(self, fake, dev, tmp_path):
+        fake.cuts, fake.cut = 3, 10000
+        with pytest.raises(jsonrpcdevice.TransportError):
+            self.download(dev, tmp_path)
+        assert os.listdir(tmp_path) == []
@@ -0,0 +1,57 @@
+# Copyright (c) 2026 ads-tec Industrial IT GmbH, Germany
+# Licensed under the BSD 2-Clause License. See LICENSE file for details.
+
+import pytest
+
+import jsonrpcdevice
+
+
+@pytest.fixture
+def validator(fake):
+    return fake.schema.validator()
+
+
+def test_every_invalid_value_is_reported(validator):
+    issues = validator.validate_config({"sc_pin": "12", "comsrv": "on", "save_now": "1"})
+    assert sorted(issue.key for issue in issues) == ["comsrv", "sc_pin"]
+
+
+def test_trailing_newline_is_rejected(validator):
+    assert validator.validate_config({"sc_pin": "1234"}) == []
+    assert [issue.key for issue in validator.validate_config({"sc_pin": "1234\n"})] == ["sc_pin"]
+
+
+def test_dollar_in_a_character_class_stays_literal():
+    assert jsonrpcdevice._end_anchor(r"^[#$%]{1,4}$|^\$$") == r"^[#$%]{1,4}\Z|^\$\Z"
+
+
+def test_patterns_are_compiled_up_front_and_shared(fake):
+    first = fake.schema.validator()
+    assert first.patterns
+    assert fake.schema.validator().patterns is first.patterns
+
+
+def test_strict_reports_unknown_names(fake):
+    validator = jsonrpcdevice.ConfigValidator(fake.schema, strict=True)
+    issues = validator.validate_config({"no_such_variable": "1"})
+    assert [issue.message for issue in issues] == ["Unknown variable."]
+    issues = validator.validate_row("no_such_table", ["1"])
+    assert [issue.message for issue in issues] == ["Unknown table."]
+
+
+def test_rows_and_imports(validator):
+    issues = validator.validate_row("ipgroups", ["lan"])
+    assert issues[0].message == "Expected 2 columns, got 1."
+    issues = validator.validate_import({"configdata": {"sc_pin": "x"},
+                                        "tableinsert": [{"tablename": "ipgroups",
+                                                         "data": [["lan"]]}]})
+    assert [(issue.table, issue.key) for issue in issues][:2] == [(None, "sc_pin"), ("ipgroups", None)]
+
+
+def test_device_checks_before_sending(fake, dev, validator):
+    dev.validator = validator
+    cfg = dev.sess_start()
+    with pytest.raises(jsonrpcdevice.ValidationError) as info:
+        dev.config_set(cfg, {"sc_pin": "12", "comsrv": "on"})
+    assert sorted(info.value.errors) == ["comsrv", "sc_pin"]
+    assert fake.calls["config", "set"] == 0